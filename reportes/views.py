@@ -1,8 +1,12 @@
 # reportes/views.py
+from datetime import timedelta
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.db.models import Avg, Count, Q
 from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+from soporte.calendario import obtener_indice_laboral
 from soporte.models import Ticket
 from django.contrib.auth.models import User
 
@@ -26,6 +30,23 @@ def dashboard_reportes(request):
     if avg_resolution_time_global is not None:
         avg_resolution_time_global = str(avg_resolution_time_global).split(".")[0]
 
+    # 1b. Tiempo promedio en horario laboral (últimos 30 días), si hay calendario activo
+    avg_resolution_time_laboral = None
+    indice_laboral = obtener_indice_laboral()
+    if indice_laboral is not None:
+        cierres_recientes = Ticket.objects.filter(
+            estado__in=['resuelto', 'cerrado'],
+            fecha_cierre__gte=timezone.now() - timedelta(days=30),
+        ).values_list('fecha_creacion', 'fecha_cierre')
+        minutos_laborales = [
+            indice_laboral.minutos_entre(creacion, cierre)
+            for creacion, cierre in cierres_recientes.iterator()
+        ]
+        if minutos_laborales:
+            promedio = sum(minutos_laborales) // len(minutos_laborales)
+            horas, minutos = divmod(promedio, 60)
+            avg_resolution_time_laboral = f"{horas} horas {minutos} minutos"
+
     # 2. Tiempo Promedio de Resolución POR TÉCNICO
     resolution_by_tech = User.objects.filter(
         is_staff=True,
@@ -149,6 +170,7 @@ def dashboard_reportes(request):
 
     context = {
         'avg_resolution_time_global': avg_resolution_time_global,
+        'avg_resolution_time_laboral': avg_resolution_time_laboral,
         'resolution_by_tech': resolution_by_tech,
         'tickets_por_categoria': tickets_por_categoria,
         'total_tickets': total_tickets,
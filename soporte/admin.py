@@ -1,13 +1,22 @@
 from django.contrib import admin
+from django.db.models import Q
 
+from .busqueda import filtrar_por_texto
 from .models import (
+    CalendarioLaboral,
+    CargaTecnico,
+    Feriado,
+    HorarioLaboral,
     Notification,
+    NotificacionDifundida,
+    PosprocesoTicket,
     Prioridad,
     SLARegla,
     SLACalculo,
     Ticket,
     TicketHistory,
 )
+from .tasks import encolar_recalculo_sla
 
 
 @admin.register(Ticket)
@@ -22,7 +31,19 @@ class TicketAdmin(admin.ModelAdmin):
         'tecnico_asignado',
     )
     list_filter = ('estado', 'prioridad', 'estado_sla', 'tipo_ticket')
-    search_fields = ('titulo', 'descripcion', 'solicitante__username')
+    # Título y descripción se buscan con el índice de texto completo.
+    search_fields = ('solicitante__username',)
+    search_help_text = 'Busca en título y descripción, por número de ticket o por usuario solicitante.'
+
+    def get_search_results(self, request, queryset, search_term):
+        resultados, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if not search_term.strip():
+            return resultados, may_have_duplicates
+        coincidencias = filtrar_por_texto(queryset, search_term).values('id')
+        filtro = Q(id__in=coincidencias)
+        if search_term.strip().isdigit():
+            filtro |= Q(id=int(search_term.strip()))
+        return resultados | queryset.filter(filtro), may_have_duplicates
 
 
 @admin.register(SLARegla)
@@ -31,6 +52,25 @@ class SLAReglaAdmin(admin.ModelAdmin):
     list_filter = ('prioridad', 'tipo_ticket')
     search_fields = ('prioridad__nombre', 'tipo_ticket')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if form.changed_data:
+            prioridad_ids = {obj.prioridad_id}
+            prioridad_anterior = form.initial.get('prioridad')
+            if prioridad_anterior:
+                prioridad_ids.add(getattr(prioridad_anterior, 'pk', prioridad_anterior))
+            encolar_recalculo_sla(prioridad_ids)
+
+    def delete_model(self, request, obj):
+        prioridad_id = obj.prioridad_id
+        super().delete_model(request, obj)
+        encolar_recalculo_sla([prioridad_id])
+
+    def delete_queryset(self, request, queryset):
+        prioridad_ids = set(queryset.values_list('prioridad_id', flat=True))
+        super().delete_queryset(request, queryset)
+        encolar_recalculo_sla(prioridad_ids)
+
 
 @admin.register(SLACalculo)
 class SLACalculoAdmin(admin.ModelAdmin):
@@ -45,6 +85,11 @@ class PrioridadAdmin(admin.ModelAdmin):
     search_fields = ('nombre', 'clave')
     ordering = ('orden', 'nombre')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'minutos_resolucion' in form.changed_data:
+            encolar_recalculo_sla([obj.id])
+
 
 @admin.register(TicketHistory)
 class TicketHistoryAdmin(admin.ModelAdmin):
@@ -67,3 +112,48 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('type', 'is_read', 'created_at')
     search_fields = ('message', 'user__username', 'actor__username')
 
+
+@admin.register(NotificacionDifundida)
+class NotificacionDifundidaAdmin(admin.ModelAdmin):
+    list_display = ('message', 'audiencia', 'grupo', 'type', 'created_at')
+    list_filter = ('audiencia', 'type', 'created_at')
+    search_fields = ('message', 'actor__username')
+
+
+
+class HorarioLaboralInline(admin.TabularInline):
+    model = HorarioLaboral
+    extra = 0
+
+
+class FeriadoInline(admin.TabularInline):
+    model = Feriado
+    extra = 0
+
+
+@admin.register(CalendarioLaboral)
+class CalendarioLaboralAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'zona_horaria', 'activo', 'fecha_actualizacion')
+    list_filter = ('activo',)
+    inlines = [HorarioLaboralInline, FeriadoInline]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        encolar_recalculo_sla()
+
+
+@admin.register(CargaTecnico)
+class CargaTecnicoAdmin(admin.ModelAdmin):
+    list_display = ('tecnico', 'tickets_abiertos', 'carga', 'ultima_asignacion', 'disponible', 'atiende_todas_las_areas')
+    list_filter = ('disponible', 'atiende_todas_las_areas')
+    search_fields = ('tecnico__username',)
+    readonly_fields = ('tickets_abiertos', 'carga', 'ultima_asignacion')
+    filter_horizontal = ('areas',)
+
+
+@admin.register(PosprocesoTicket)
+class PosprocesoTicketAdmin(admin.ModelAdmin):
+    list_display = ('ticket', 'estado', 'intentos', 'fecha_creacion', 'fecha_actualizacion')
+    list_filter = ('estado',)
+    search_fields = ('ticket__id', 'ticket__titulo')
+    readonly_fields = ('ticket', 'actor', 'estado', 'intentos', 'tiempos', 'ultimo_error', 'fecha_creacion', 'fecha_actualizacion')
@@ -1,6 +1,21 @@
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class SoporteConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'soporte'
+
+    def ready(self):
+        # Las versiones de la caché (notificaciones, conteos, catálogos) las
+        # escriben varios procesos; una caché en memoria local no las comparte
+        # y los demás procesos no verían los cambios.
+        backend = settings.CACHES['default']['BACKEND']
+        if backend.endswith('.LocMemCache') and (not settings.DEBUG or 'qcluster' in sys.argv):
+            raise ImproperlyConfigured(
+                'La caché en memoria local solo sirve para un único proceso de '
+                'desarrollo: define REDIS_URL para usar Redis.'
+            )
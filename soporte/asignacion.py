@@ -0,0 +1,167 @@
+"""Asignación automática de técnicos según su carga de trabajo.
+
+Cada técnico tiene una fila ``CargaTecnico`` con contadores que se mantienen
+con expresiones F. Elegir técnico es leer la primera fila del índice
+(disponible, carga, ultima_asignacion): el menos cargado y, a igual carga, el
+que lleva más tiempo sin recibir tickets (round-robin ponderado).
+
+Los contadores se ajustan al guardar o borrar un ticket (``Ticket.save``,
+``Ticket.guardar_cambios`` y la señal ``post_delete``), así que también los
+cambios hechos desde el admin quedan contados. Las escrituras que no pasan por
+el modelo (``QuerySet.update``) se corrigen con ``recalcular_cargas``, que
+corre a diario en django_q.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CargaTecnico, Prioridad, Ticket, User
+
+ASIGNACION_PONDERADA = getattr(settings, "TICKETS_ASIGNACION_PONDERADA", True)
+INTENTOS_ASIGNACION = 5
+
+
+def peso_prioridad(prioridad):
+    """Peso que aporta un ticket a la carga del técnico."""
+    if not ASIGNACION_PONDERADA or prioridad is None:
+        return 1
+    return max(prioridad.orden, 1)
+
+
+def huella_carga(ticket, valores=None):
+    """
+    Resume cómo contribuye un ticket a la carga: ``(tecnico_id, peso)`` o ``None``.
+
+    Con ``valores`` (atributos leídos de la base, como ``_valores_cargados``)
+    se calcula la huella guardada en lugar de la actual; los que falten se
+    toman del ticket.
+    """
+    valores = valores or {}
+    tecnico_id, estado, prioridad_id = (
+        valores.get(attname, getattr(ticket, attname))
+        for attname in ("tecnico_asignado_id", "estado", "prioridad_id")
+    )
+    if not tecnico_id or estado not in Ticket.ESTADOS_ABIERTOS:
+        return None
+    if prioridad_id == ticket.prioridad_id:
+        prioridad = ticket.prioridad
+    else:
+        prioridad = Prioridad.objects.filter(pk=prioridad_id).first()
+    return tecnico_id, peso_prioridad(prioridad)
+
+
+def _sumar_carga(tecnico_id, peso, tickets, asignado_en=None):
+    valores = {
+        "tickets_abiertos": Greatest(F("tickets_abiertos") + tickets, Value(0)),
+        "carga": Greatest(F("carga") + peso, Value(0)),
+    }
+    if asignado_en is not None:
+        valores["ultima_asignacion"] = asignado_en
+    CargaTecnico.objects.filter(tecnico_id=tecnico_id).update(**valores)
+
+
+def asignar_tecnico(ticket):
+    """
+    Elige el técnico con menor carga elegible para el área del ticket.
+
+    Debe llamarse dentro de la transacción que guarda el ticket: en bases que
+    lo soportan la fila elegida queda bloqueada y las creaciones concurrentes
+    saltan a la siguiente. Donde no hay bloqueo de filas (SQLite), la elección
+    se confirma con un compare-and-swap sobre ``ultima_asignacion`` y, si otra
+    asignación tomó al mismo técnico entretanto, se vuelve a elegir. Deja el
+    técnico en ``ticket.tecnico_asignado`` (ya contado en su carga) y devuelve
+    el usuario, o ``None`` si no hay técnicos disponibles.
+    """
+    candidatos = CargaTecnico.objects.filter(
+        disponible=True,
+        tecnico__is_active=True,
+        tecnico__is_staff=True,
+    )
+    if ticket.area_funcional_id:
+        candidatos = candidatos.filter(
+            Q(atiende_todas_las_areas=True) | Q(areas=ticket.area_funcional_id)
+        )
+    candidatos = candidatos.order_by(
+        "carga",
+        F("ultima_asignacion").asc(nulls_first=True),
+        "tecnico_id",
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        candidatos = candidatos.select_for_update(skip_locked=True, of=("self",))
+
+    peso = peso_prioridad(ticket.prioridad)
+    for _ in range(INTENTOS_ASIGNACION):
+        with transaction.atomic():
+            fila = candidatos.values_list("tecnico_id", "ultima_asignacion").first()
+            if fila is None:
+                return None
+            elegido, ultima_asignacion = fila
+            confirmado = CargaTecnico.objects.filter(
+                tecnico_id=elegido,
+                ultima_asignacion=ultima_asignacion,
+            ).update(
+                tickets_abiertos=F("tickets_abiertos") + 1,
+                carga=F("carga") + peso,
+                ultima_asignacion=timezone.now(),
+            )
+        if confirmado:
+            break
+    else:
+        # Contención sostenida: se queda con la última elección.
+        _sumar_carga(elegido, peso, 1, asignado_en=timezone.now())
+
+    ticket.tecnico_asignado = User.objects.get(pk=elegido)
+    # El guardado del ticket no vuelve a sumar lo que ya se contó aquí.
+    ticket._huella_carga = (elegido, peso)
+    return ticket.tecnico_asignado
+
+
+def actualizar_carga(anterior, actual):
+    """
+    Ajusta los contadores cuando cambia la huella de carga de un ticket.
+
+    ``anterior`` y ``actual`` son valores devueltos por ``huella_carga``.
+    """
+    if anterior == actual:
+        return
+    if anterior is not None:
+        _sumar_carga(anterior[0], -anterior[1], -1)
+    if actual is not None:
+        _sumar_carga(actual[0], actual[1], 1)
+
+
+def recalcular_cargas():
+    """
+    Recalcula todos los contadores desde los tickets abiertos.
+
+    Crea las filas faltantes de técnicos activos y corrige las que derivaron.
+    Devuelve la cantidad de técnicos cuyos contadores cambiaron.
+    """
+    peso = Greatest(F("prioridad__orden"), Value(1)) if ASIGNACION_PONDERADA else Value(1)
+    agregados = {
+        fila["tecnico_asignado_id"]: (fila["abiertos"], fila["carga"])
+        for fila in Ticket.objects.filter(
+            estado__in=Ticket.ESTADOS_ABIERTOS,
+            tecnico_asignado__isnull=False,
+        )
+        .values("tecnico_asignado_id")
+        .annotate(abiertos=Count("id"), carga=Sum(peso))
+        .order_by()
+    }
+
+    with transaction.atomic():
+        tecnicos = User.objects.filter(is_staff=True, is_active=True).values_list("id", flat=True)
+        CargaTecnico.objects.bulk_create(
+            [CargaTecnico(tecnico_id=tecnico_id) for tecnico_id in tecnicos],
+            ignore_conflicts=True,
+        )
+        corregidas = []
+        for carga in CargaTecnico.objects.select_for_update().only("tecnico_id", "tickets_abiertos", "carga"):
+            abiertos, total = agregados.get(carga.tecnico_id, (0, 0))
+            if (carga.tickets_abiertos, carga.carga) != (abiertos, total):
+                carga.tickets_abiertos, carga.carga = abiertos, total
+                corregidas.append(carga)
+        CargaTecnico.objects.bulk_update(corregidas, ["tickets_abiertos", "carga"])
+    return len(corregidas)
@@ -0,0 +1,62 @@
+"""Aviso de cambios en las notificaciones de cada usuario.
+
+Cada usuario tiene una versión de sus notificaciones en la caché compartida,
+que cambia cuando se crea, lee o borra alguna. El stream SSE de
+notificaciones solo lee esa versión en cada vuelta (una lectura de caché, sin
+tocar la base) y consulta las notificaciones únicamente cuando cambió; el
+endpoint de consulta periódica la usa como ETag.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIJO_VERSION_AVISOS = "soporte:notificaciones:version"
+# Segundos entre lecturas de la versión y duración máxima de una conexión SSE;
+# al cerrarse, ``EventSource`` se reconecta solo.
+INTERVALO_AVISOS = getattr(settings, "NOTIFICACIONES_SSE_INTERVALO", 2)
+DURACION_STREAM_AVISOS = getattr(settings, "NOTIFICACIONES_SSE_DURACION", 300)
+LATIDO_AVISOS = 15
+
+
+def clave_version_avisos(user_id):
+    return f"{PREFIJO_VERSION_AVISOS}:{user_id}"
+
+
+def _publicar(user_ids):
+    version = uuid.uuid4().hex
+    cache.set_many({clave_version_avisos(user_id): version for user_id in user_ids}, None)
+
+
+def avisar_cambio_notificaciones(user_ids):
+    """Publica una versión nueva para ``user_ids``, ahora y al confirmar la transacción."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    # Como en los catálogos: un stream que lea entre ambos momentos todavía no
+    # ve las filas nuevas y vuelve a consultar tras la confirmación.
+    _publicar(user_ids)
+    transaction.on_commit(lambda: _publicar(user_ids))
+
+
+def version_avisos(user_id):
+    """Versión vigente de las notificaciones de ``user_id`` (la crea si no existe)."""
+    clave = clave_version_avisos(user_id)
+    version = cache.get(clave)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(clave, version, None):
+            version = cache.get(clave)
+    return version
+
+
+async def aversion_avisos(user_id):
+    """Versión vigente de las notificaciones de ``user_id`` (la crea si no existe)."""
+    clave = clave_version_avisos(user_id)
+    version = await cache.aget(clave)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(clave, version, None):
+            version = await cache.aget(clave)
+    return version
@@ -0,0 +1,227 @@
+"""Búsqueda de texto completo sobre el título y la descripción de los tickets.
+
+El índice vive en una tabla auxiliar mantenida por triggers de la base, así
+que cualquier escritura sobre ``soporte_ticket`` (save, update, bulk_update)
+lo deja al día sin pasar por Python:
+
+* SQLite: tabla virtual FTS5 ``soporte_ticket_fts`` (rowid = id del ticket).
+* PostgreSQL: tabla ``soporte_ticket_busqueda`` con un ``tsvector`` y un
+  índice GIN.
+
+En otros motores se vuelve a ``icontains``. Los fragmentos resaltados se
+devuelven con marcadores de control que ``resaltar_fragmento`` convierte en
+``<mark>`` después de escapar el texto.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Ticket
+
+TABLA_FTS_SQLITE = "soporte_ticket_fts"
+TABLA_BUSQUEDA_PG = "soporte_ticket_busqueda"
+TABLA_TRIGRAMAS_SQLITE = "soporte_ticket_trigramas"
+CONFIGURACION_PG = "spanish"
+TAMANO_LOTE_BUSQUEDA = getattr(settings, "BUSQUEDA_TAMANO_LOTE", 1000)
+
+INICIO_RESALTADO = "\x02"
+FIN_RESALTADO = "\x03"
+PALABRAS_FRAGMENTO = 12
+
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def motor_busqueda():
+    """``'sqlite'``, ``'postgresql'`` o ``None`` si no hay índice para la base actual."""
+    if connection.vendor in ("sqlite", "postgresql"):
+        return connection.vendor
+    return None
+
+
+def consulta_fts5(texto):
+    """
+    Traduce el texto del usuario a una consulta FTS5 segura.
+
+    Cada palabra se cita para que los operadores de FTS5 no tengan efecto y se
+    busca como prefijo, de modo que la búsqueda funcione mientras se escribe.
+    """
+    return " ".join(f'"{termino}"*' for termino in _TERMINO.findall(texto))
+
+
+def _columna_ticket(queryset):
+    """Columna con el id del ticket en la tabla de ``queryset`` (``Ticket`` o ``TicketListado``)."""
+    opts = queryset.model._meta
+    return f"{opts.db_table}.{opts.pk.column}"
+
+
+def _filtro_sqlite(consulta):
+    return Q(pk__in=RawSQL(f"SELECT rowid FROM {TABLA_FTS_SQLITE} WHERE {TABLA_FTS_SQLITE} MATCH %s", [consulta]))
+
+
+def _filtro_postgresql(texto):
+    return Q(
+        pk__in=RawSQL(
+            f"SELECT ticket_id FROM {TABLA_BUSQUEDA_PG} "
+            f"WHERE documento @@ websearch_to_tsquery('{CONFIGURACION_PG}', %s)",
+            [texto],
+        )
+    )
+
+
+def _buscar_sqlite(queryset, texto):
+    consulta = consulta_fts5(texto)
+    if not consulta:
+        return queryset.none()
+    # La tabla FTS5 se une por rowid: un solo MATCH filtra, y la relevancia y
+    # el fragmento salen de la misma fila coincidente, sin subconsultas por fila.
+    queryset = queryset.extra(
+        tables=[TABLA_FTS_SQLITE],
+        where=[f"{TABLA_FTS_SQLITE} MATCH %s", f"{TABLA_FTS_SQLITE}.rowid = {_columna_ticket(queryset)}"],
+        params=[consulta],
+    )
+    return queryset.alias(
+        # bm25 es menor cuanto más relevante; el título pesa más que la descripción.
+        relevancia=RawSQL(f"-bm25({TABLA_FTS_SQLITE}, 4.0, 1.0)", [], output_field=FloatField()),
+    ).annotate(
+        fragmento_busqueda=RawSQL(
+            f"snippet({TABLA_FTS_SQLITE}, -1, %s, %s, '…', %s)",
+            [INICIO_RESALTADO, FIN_RESALTADO, PALABRAS_FRAGMENTO],
+            output_field=TextField(),
+        ),
+    )
+
+
+def _buscar_postgresql(queryset, texto):
+    if not _TERMINO.search(texto):
+        return queryset.none()
+    consulta = f"websearch_to_tsquery('{CONFIGURACION_PG}', %s)"
+    columna = _columna_ticket(queryset)
+    # Como en SQLite, la tabla de búsqueda se une una sola vez: el filtro y
+    # ts_rank usan la misma fila, y ts_headline lee las columnas del ticket ya
+    # presentes en el FROM (el listado no guarda la descripción, así que para
+    # él se une también ``soporte_ticket``).
+    tablas = [TABLA_BUSQUEDA_PG]
+    condiciones = [f"{TABLA_BUSQUEDA_PG}.ticket_id = {columna}", f"{TABLA_BUSQUEDA_PG}.documento @@ {consulta}"]
+    if queryset.model is not Ticket:
+        tablas.append(Ticket._meta.db_table)
+        condiciones.append(f"{Ticket._meta.db_table}.id = {columna}")
+    queryset = queryset.extra(tables=tablas, where=condiciones, params=[texto])
+    return queryset.alias(
+        relevancia=RawSQL(f"ts_rank({TABLA_BUSQUEDA_PG}.documento, {consulta})", [texto], output_field=FloatField()),
+    ).annotate(
+        fragmento_busqueda=RawSQL(
+            f"ts_headline('{CONFIGURACION_PG}', soporte_ticket.titulo || ' — ' || soporte_ticket.descripcion, "
+            f"{consulta}, %s)",
+            [
+                texto,
+                f"StartSel={INICIO_RESALTADO}, StopSel={FIN_RESALTADO}, "
+                f"MaxWords={PALABRAS_FRAGMENTO * 2}, MinWords={PALABRAS_FRAGMENTO}",
+            ],
+            output_field=TextField(),
+        ),
+    )
+
+
+def documento_pg(tabla):
+    """Expresión SQL del ``tsvector`` de una fila; el título pesa más que la descripción."""
+    return (
+        f"setweight(to_tsvector('{CONFIGURACION_PG}', coalesce({tabla}.titulo, '')), 'A') || "
+        f"setweight(to_tsvector('{CONFIGURACION_PG}', coalesce({tabla}.descripcion, '')), 'B')"
+    )
+
+
+def filtrar_por_texto(queryset, texto):
+    """Solo el filtro de ``buscar_tickets``, sin relevancia ni fragmentos (para conteos)."""
+    motor = motor_busqueda()
+    if motor == "sqlite":
+        consulta = consulta_fts5(texto)
+        return queryset.filter(_filtro_sqlite(consulta)) if consulta else queryset.none()
+    if motor == "postgresql":
+        return queryset.filter(_filtro_postgresql(texto)) if _TERMINO.search(texto) else queryset.none()
+    coincidencias = Ticket.objects.filter(Q(titulo__icontains=texto) | Q(descripcion__icontains=texto))
+    return queryset.filter(pk__in=coincidencias.values("id"))
+
+
+def buscar_tickets(queryset, texto):
+    """
+    Filtra ``queryset`` (de ``Ticket`` o ``TicketListado``) por texto completo.
+
+    Agrega el alias ``relevancia`` (mayor es mejor) para ordenar y la anotación
+    ``fragmento_busqueda`` con el extracto que coincide.
+    """
+    motor = motor_busqueda()
+    if motor == "sqlite":
+        return _buscar_sqlite(queryset, texto)
+    if motor == "postgresql":
+        return _buscar_postgresql(queryset, texto)
+    return filtrar_por_texto(queryset, texto).alias(
+        relevancia=Value(0.0, output_field=FloatField()),
+    ).annotate(fragmento_busqueda=Value(None, output_field=TextField()))
+
+
+def resaltar_fragmento(fragmento):
+    """Escapa el fragmento y convierte los marcadores de coincidencia en ``<mark>``."""
+    if not fragmento:
+        return ""
+    html = escape(fragmento).replace(INICIO_RESALTADO, "<mark>").replace(FIN_RESALTADO, "</mark>")
+    return mark_safe(html)
+
+
+def reindexar_busqueda(tamano_lote=None, progreso=None):
+    """
+    Reconstruye el índice de búsqueda por lotes de ids.
+
+    Cada lote borra y vuelve a insertar sus filas en una transacción corta, así
+    que se puede ejecutar con la aplicación en uso y repetir sin duplicar.
+    ``progreso`` recibe ``(procesados, total)`` tras cada lote. Devuelve la
+    cantidad de tickets indexados.
+    """
+    motor = motor_busqueda()
+    if motor is None:
+        return 0
+    tamano_lote = tamano_lote or TAMANO_LOTE_BUSQUEDA
+    if motor == "sqlite":
+        # También la tabla de trigramas de la búsqueda aproximada; en PostgreSQL
+        # esa búsqueda usa un índice sobre ``soporte_ticketlistado``.
+        sentencias = [
+            f"DELETE FROM {TABLA_FTS_SQLITE} WHERE rowid > %s AND rowid <= %s",
+            f"INSERT INTO {TABLA_FTS_SQLITE} (rowid, titulo, descripcion) "
+            "SELECT id, titulo, descripcion FROM soporte_ticket WHERE id > %s AND id <= %s",
+            f"DELETE FROM {TABLA_TRIGRAMAS_SQLITE} WHERE rowid > %s AND rowid <= %s",
+            f"INSERT INTO {TABLA_TRIGRAMAS_SQLITE} (rowid, titulo) "
+            "SELECT id, titulo FROM soporte_ticket WHERE id > %s AND id <= %s",
+        ]
+    else:
+        sentencias = [
+            f"DELETE FROM {TABLA_BUSQUEDA_PG} WHERE ticket_id > %s AND ticket_id <= %s",
+            f"INSERT INTO {TABLA_BUSQUEDA_PG} (ticket_id, documento) "
+            f"SELECT id, {documento_pg('soporte_ticket')} FROM soporte_ticket WHERE id > %s AND id <= %s",
+        ]
+
+    total = Ticket.objects.count()
+    procesados = 0
+    ultimo_id = 0
+    with connection.cursor() as cursor:
+        while True:
+            ids = list(
+                Ticket.objects.filter(id__gt=ultimo_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:tamano_lote]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                for sentencia in sentencias:
+                    cursor.execute(sentencia, [ultimo_id, ids[-1]])
+            procesados += len(ids)
+            ultimo_id = ids[-1]
+            if progreso is not None:
+                progreso(procesados, total)
+            if len(ids) < tamano_lote:
+                break
+    return procesados
@@ -0,0 +1,135 @@
+"""Búsqueda aproximada por trigramas sobre el título de los tickets.
+
+Tolera errores de tipeo ("imprsora" encuentra "Impresora") y palabras a
+medio escribir. Los candidatos salen de un índice de trigramas y se ordenan
+por similitud, al estilo de ``word_similarity`` de ``pg_trgm``: la fracción de
+los trigramas del texto buscado que aparecen en el título.
+
+* SQLite: tabla virtual FTS5 ``soporte_ticket_trigramas`` con el tokenizador
+  ``trigram``, mantenida por triggers sobre ``soporte_ticket``. Una sola
+  consulta une el índice con el listado ya acotado al alcance y los filtros,
+  y devuelve ordenados por bm25 los mejores tickets que comparten algún
+  trigrama con el texto; solo sobre esos se calcula la similitud.
+* PostgreSQL: extensión ``pg_trgm`` con un índice GIN sobre
+  ``soporte_ticketlistado.titulo``; el operador ``<%`` filtra y
+  ``word_similarity`` ordena.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+from .busqueda import TABLA_TRIGRAMAS_SQLITE, _columna_ticket, motor_busqueda
+
+# Igual al ``pg_trgm.word_similarity_threshold`` por defecto que usa ``<%``.
+UMBRAL_SIMILITUD = getattr(settings, "BUSQUEDA_UMBRAL_SIMILITUD", 0.6)
+LARGO_MINIMO = 3
+# Candidatos por resultado pedido que se traen del índice antes de calcular la similitud.
+FACTOR_CANDIDATOS = 5
+
+_PALABRA = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalizar(texto):
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def trigramas(texto):
+    """Trigramas por palabra, con el mismo relleno que ``pg_trgm`` (dos espacios antes y uno después)."""
+    resultado = set()
+    for palabra in _PALABRA.findall(_normalizar(texto)):
+        rellena = f"  {palabra} "
+        resultado.update(rellena[i:i + 3] for i in range(len(rellena) - 2))
+    return resultado
+
+
+def similitud(texto, titulo):
+    """Fracción de los trigramas de ``texto`` presentes en ``titulo`` (0 a 1)."""
+    buscados = trigramas(texto)
+    if not buscados:
+        return 0.0
+    return len(buscados & trigramas(titulo)) / len(buscados)
+
+
+def consulta_trigramas_fts5(texto):
+    """
+    Consulta FTS5 que coincide con cualquier trigrama del texto.
+
+    El tokenizador ``trigram`` indexa subcadenas de tres caracteres del texto
+    en minúsculas, espacios incluidos; cada trigrama se cita por separado.
+    """
+    texto = texto.lower()
+    partes = {texto[i:i + 3] for i in range(len(texto) - 2)}
+    partes = {parte for parte in partes if parte.strip()}
+    return " OR ".join('"{}"'.format(parte.replace('"', '""')) for parte in sorted(partes))
+
+
+def _candidatos_sqlite(queryset, texto):
+    consulta = consulta_trigramas_fts5(texto)
+    if not consulta:
+        return queryset.none()
+    # La tabla de trigramas se une por rowid a ``queryset``: un solo MATCH, con
+    # el alcance y los filtros aplicados antes de ordenar por bm25 (premia
+    # compartir más trigramas, y los menos frecuentes) y cortar con LIMIT.
+    return (
+        queryset.extra(
+            tables=[TABLA_TRIGRAMAS_SQLITE],
+            where=[
+                f"{TABLA_TRIGRAMAS_SQLITE} MATCH %s",
+                f"{TABLA_TRIGRAMAS_SQLITE}.rowid = {_columna_ticket(queryset)}",
+            ],
+            params=[consulta],
+        )
+        .alias(rango_trigramas=RawSQL(f"bm25({TABLA_TRIGRAMAS_SQLITE})", [], output_field=FloatField()))
+        .order_by("rango_trigramas")
+    )
+
+
+def _candidatos_postgresql(queryset, texto):
+    opts = queryset.model._meta
+    return (
+        queryset.filter(
+            pk__in=RawSQL("SELECT ticket_id FROM soporte_ticketlistado WHERE %s <%% titulo", [texto])
+        )
+        .alias(
+            similitud_pg=RawSQL(
+                f"word_similarity(%s, {opts.db_table}.titulo)", [texto], output_field=FloatField()
+            )
+        )
+        .order_by("-similitud_pg")
+    )
+
+
+def buscar_aproximado(queryset, texto, limite=10, campos=("ticket_id", "titulo")):
+    """
+    Tickets de ``queryset`` (``TicketListado``) cuyo título se parece a ``texto``.
+
+    Devuelve hasta ``limite`` diccionarios con ``campos`` y la clave
+    ``similitud``, de mayor a menor. Textos de menos de tres caracteres no
+    devuelven resultados.
+    """
+    texto = " ".join(texto.split())
+    if len(texto) < LARGO_MINIMO:
+        return []
+    campos = list(dict.fromkeys([*campos, "titulo"]))
+    cantidad = limite * FACTOR_CANDIDATOS
+    motor = motor_busqueda()
+    if motor == "sqlite":
+        candidatos = _candidatos_sqlite(queryset, texto)
+    elif motor == "postgresql":
+        candidatos = _candidatos_postgresql(queryset, texto)
+    else:
+        # Sin índice de trigramas: candidatos que contienen el comienzo del texto.
+        candidatos = queryset.filter(titulo__icontains=texto[:LARGO_MINIMO])
+
+    resultados = []
+    for fila in candidatos.values(*campos)[:cantidad]:
+        fila["similitud"] = round(similitud(texto, fila["titulo"]), 3)
+        if fila["similitud"] >= UMBRAL_SIMILITUD:
+            resultados.append(fila)
+    # A igual similitud, primero los títulos más cortos (más parecidos en total).
+    resultados.sort(key=lambda fila: (-fila["similitud"], len(fila["titulo"])))
+    return resultados[:limite]
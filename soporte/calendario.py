@@ -0,0 +1,165 @@
+"""Calendario laboral y aritmética de minutos hábiles para los SLA.
+
+El calendario activo se transforma en un índice de tramos laborales con sus
+segundos hábiles acumulados. Con ese índice, sumar N minutos hábiles a una
+fecha o medir los minutos hábiles entre dos fechas son búsquedas binarias
+(O(log n)) en lugar de recorrer el calendario minuto a minuto.
+
+El índice se construye una vez por proceso y se reconstruye cuando cambia la
+versión del calendario publicada en la caché compartida.
+"""
+import uuid
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+from zoneinfo import ZoneInfo
+
+from django.core.cache import cache
+from django.utils import timezone
+
+CLAVE_VERSION_CALENDARIO = "soporte:calendario_laboral:version"
+DIAS_HACIA_ATRAS = 366
+DIAS_HACIA_ADELANTE = 730
+
+_indice_local = {"version": None, "indice": None}
+
+
+class IndiceMinutosLaborales:
+    """Tramos laborales ordenados con su tiempo hábil acumulado."""
+
+    def __init__(self, zona_horaria, horarios, feriados, desde, hasta):
+        self.zona = ZoneInfo(zona_horaria)
+        self.horarios = horarios
+        self.feriados = frozenset(feriados)
+        self._construir(desde, hasta)
+
+    def _construir(self, desde, hasta):
+        inicios = []
+        fines = []
+        dia = desde
+        while dia <= hasta:
+            if dia not in self.feriados:
+                for hora_inicio, hora_fin in self.horarios.get(dia.weekday(), ()):
+                    inicio = datetime.combine(dia, hora_inicio, tzinfo=self.zona).timestamp()
+                    fin = datetime.combine(dia, hora_fin, tzinfo=self.zona).timestamp()
+                    if fin > inicio:
+                        inicios.append(inicio)
+                        fines.append(fin)
+            dia += timedelta(days=1)
+        # acumulado[i] son los segundos hábiles transcurridos antes del tramo i.
+        acumulado = [0.0, *accumulate(fin - inicio for inicio, fin in zip(inicios, fines))]
+        # Se reemplaza en una sola asignación para que los lectores concurrentes
+        # nunca vean listas de versiones distintas.
+        self._tramos = (inicios, fines, acumulado)
+        self.desde = desde
+        self.hasta = hasta
+
+    @classmethod
+    def desde_calendario(cls, calendario, hoy=None, dias_atras=DIAS_HACIA_ATRAS, dias_adelante=DIAS_HACIA_ADELANTE):
+        horarios = {}
+        for dia_semana, hora_inicio, hora_fin in calendario.horarios.values_list(
+            "dia_semana", "hora_inicio", "hora_fin"
+        ):
+            horarios.setdefault(dia_semana, []).append((hora_inicio, hora_fin))
+        for tramos in horarios.values():
+            tramos.sort()
+        feriados = calendario.feriados.values_list("fecha", flat=True)
+        hoy = hoy or timezone.localdate()
+        return cls(
+            calendario.zona_horaria,
+            horarios,
+            feriados,
+            hoy - timedelta(days=dias_atras),
+            hoy + timedelta(days=dias_adelante),
+        )
+
+    @property
+    def vacio(self):
+        return not self._tramos[0]
+
+    def _asegurar_rango(self, *instantes):
+        """Amplía el índice en el lugar si algún instante queda fuera de él."""
+        inicios, fines, _ = self._tramos
+        if all(inicios[0] <= t <= fines[-1] for t in instantes):
+            return
+        dias = [datetime.fromtimestamp(t, tz=self.zona).date() for t in instantes]
+        desde = min([self.desde, *dias]) - timedelta(days=7)
+        hasta = max([self.hasta, *dias]) + timedelta(days=DIAS_HACIA_ADELANTE)
+        self._construir(desde, hasta)
+
+    def _segundos_hasta(self, instante):
+        """Segundos hábiles acumulados desde el inicio del índice hasta ``instante``."""
+        inicios, fines, acumulado = self._tramos
+        i = bisect_right(inicios, instante) - 1
+        if i < 0:
+            return 0.0
+        return acumulado[i] + min(instante, fines[i]) - inicios[i]
+
+    def sumar_minutos(self, inicio, minutos):
+        """Fecha en la que se cumplen ``minutos`` hábiles contados desde ``inicio``."""
+        t_inicio = inicio.timestamp()
+        self._asegurar_rango(t_inicio)
+        objetivo = self._segundos_hasta(t_inicio) + minutos * 60
+        while objetivo > self._tramos[2][-1]:
+            # El plazo excede el horizonte precalculado: se amplía hacia el futuro.
+            self._asegurar_rango(self._tramos[1][-1] + max(minutos * 60 * 7, 86400))
+        inicios, _, acumulado = self._tramos
+        # Tramo en el que el acumulado alcanza el objetivo (incluye su cierre).
+        i = max(bisect_left(acumulado, objetivo) - 1, 0)
+        instante = inicios[i] + (objetivo - acumulado[i])
+        return datetime.fromtimestamp(instante, tz=dt_timezone.utc)
+
+    def minutos_entre(self, inicio, fin):
+        """Minutos hábiles transcurridos entre ``inicio`` y ``fin``."""
+        t_inicio, t_fin = inicio.timestamp(), fin.timestamp()
+        if t_fin <= t_inicio:
+            return 0
+        self._asegurar_rango(t_inicio, t_fin)
+        return int((self._segundos_hasta(t_fin) - self._segundos_hasta(t_inicio)) // 60)
+
+
+def invalidar_calendario_laboral():
+    """Publica una nueva versión para que todos los procesos reconstruyan el índice."""
+    cache.set(CLAVE_VERSION_CALENDARIO, uuid.uuid4().hex, None)
+
+
+def obtener_indice_laboral():
+    """
+    Devuelve el índice del calendario activo o ``None`` si no hay uno utilizable.
+
+    Mientras la versión compartida no cambie solo se consulta la caché.
+    """
+    version = cache.get(CLAVE_VERSION_CALENDARIO)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(CLAVE_VERSION_CALENDARIO, version, None):
+            version = cache.get(CLAVE_VERSION_CALENDARIO)
+    if _indice_local["version"] == version:
+        return _indice_local["indice"]
+
+    from .models import CalendarioLaboral
+
+    calendario = CalendarioLaboral.objects.filter(activo=True).first()
+    indice = None
+    if calendario is not None:
+        indice = IndiceMinutosLaborales.desde_calendario(calendario)
+        if indice.vacio:
+            indice = None
+    _indice_local.update(version=version, indice=indice)
+    return indice
+
+
+def sumar_minutos_laborales(inicio, minutos, indice=None):
+    """Suma minutos hábiles si hay calendario activo; si no, minutos corridos."""
+    indice = indice if indice is not None else obtener_indice_laboral()
+    if indice is None:
+        return inicio + timedelta(minutes=minutos)
+    return indice.sumar_minutos(inicio, minutos)
+
+
+def minutos_laborales_entre(inicio, fin, indice=None):
+    """Minutos hábiles entre dos fechas, o minutos corridos sin calendario activo."""
+    indice = indice if indice is not None else obtener_indice_laboral()
+    if indice is None:
+        return max(int((fin - inicio).total_seconds() // 60), 0)
+    return indice.minutos_entre(inicio, fin)
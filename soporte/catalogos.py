@@ -0,0 +1,73 @@
+"""Caché por proceso de los catálogos usados en formularios y filtros.
+
+Prioridades, áreas y usuarios de staff cambian muy poco pero se leen en casi
+cada petición. Cada proceso guarda una copia en memoria junto con la versión
+con la que la cargó; la versión vigente vive en la caché compartida, así que
+un cambio hecho en un worker (señales ``post_save``/``post_delete``) obliga a
+todos los demás a recargar en su siguiente lectura.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_VERSION_CATALOGOS = "soporte:catalogos:version"
+
+_catalogos_local = {"version": None, "datos": None}
+
+
+def invalidar_catalogos():
+    """Publica una nueva versión de los catálogos."""
+    cache.set(CLAVE_VERSION_CATALOGOS, uuid.uuid4().hex, None)
+
+
+def invalidar_catalogos_al_confirmar():
+    # Se invalida ya y otra vez al confirmar: un proceso que recargue entre
+    # ambos momentos todavía no ve el cambio y debe volver a leer después.
+    invalidar_catalogos()
+    transaction.on_commit(invalidar_catalogos)
+
+
+def _version_catalogos():
+    version = cache.get(CLAVE_VERSION_CATALOGOS)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(CLAVE_VERSION_CATALOGOS, version, None):
+            version = cache.get(CLAVE_VERSION_CATALOGOS)
+    return version
+
+
+def _cargar():
+    from django.contrib.auth import get_user_model
+
+    from .models import Area, Prioridad
+
+    User = get_user_model()
+    return {
+        "prioridades": list(Prioridad.objects.order_by("orden", "nombre")),
+        "areas": list(Area.objects.order_by("orden", "nombre")),
+        "staff": list(User.objects.filter(is_staff=True).order_by("first_name", "last_name", "username")),
+    }
+
+
+def obtener_catalogos():
+    """Catálogos vigentes; mientras la versión no cambie solo se consulta la caché."""
+    version = _version_catalogos()
+    if _catalogos_local["version"] != version:
+        _catalogos_local.update(version=version, datos=_cargar())
+    return _catalogos_local["datos"]
+
+
+def prioridades():
+    """Prioridades ordenadas por ``orden`` y nombre."""
+    return obtener_catalogos()["prioridades"]
+
+
+def areas():
+    """Áreas ordenadas por ``orden`` y nombre."""
+    return obtener_catalogos()["areas"]
+
+
+def usuarios_staff():
+    """Usuarios con ``is_staff`` ordenados por nombre."""
+    return obtener_catalogos()["staff"]
@@ -0,0 +1,91 @@
+"""Caché de conteos de tickets para el listado y el dashboard.
+
+Cada conteo se guarda bajo una clave derivada de su alcance (staff o un
+usuario concreto) y de los filtros normalizados, junto con la versión de los
+tickets con la que se calculó. Cualquier escritura de tickets publica una
+versión nueva en la caché compartida (una sola escritura, sin borrar claves).
+
+Con ``TICKETS_CONTEOS_SWR`` activo, un conteo de una versión anterior se
+sirve igualmente y solo la petición que obtiene el candado lo recalcula; las
+demás siguen en O(1) mientras tanto. Sin ese modo, cada lectura obsoleta
+recalcula.
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_VERSION_TICKETS = "soporte:tickets:version"
+PREFIJO_CONTEO = "soporte:conteo"
+DURACION_CONTEO = getattr(settings, "TICKETS_CONTEOS_DURACION", 600)
+MODO_SWR = getattr(settings, "TICKETS_CONTEOS_SWR", True)
+DURACION_CANDADO = 30
+# Filtros cuya consulta no distingue mayúsculas ni espacios (la búsqueda de
+# texto); el resto (estado, técnico, ...) se compara tal cual en el ORM, así
+# que entra en la clave sin normalizar.
+FILTROS_TEXTO = {"search"}
+
+
+def invalidar_conteos_tickets():
+    """Publica una nueva versión de los tickets; los conteos previos quedan obsoletos."""
+    cache.set(CLAVE_VERSION_TICKETS, uuid.uuid4().hex, None)
+
+
+def version_tickets():
+    version = cache.get(CLAVE_VERSION_TICKETS)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(CLAVE_VERSION_TICKETS, version, None):
+            version = cache.get(CLAVE_VERSION_TICKETS)
+    return version
+
+
+def _normalizar_filtro(campo, valor):
+    if campo in FILTROS_TEXTO:
+        return " ".join(str(valor).split()).lower()
+    return str(valor)
+
+
+def clave_conteo(nombre, alcance, filtros=None):
+    """Clave estable para ``nombre`` en ``alcance`` con los ``filtros`` dados."""
+    normalizados = {
+        campo: _normalizar_filtro(campo, valor)
+        for campo, valor in (filtros or {}).items()
+        if valor not in (None, "")
+    }
+    resumen = hashlib.sha1(
+        json.dumps([nombre, alcance, normalizados], sort_keys=True).encode()
+    ).hexdigest()
+    return f"{PREFIJO_CONTEO}:{nombre}:{resumen}"
+
+
+def obtener_conteo(clave, calcular, swr=None):
+    """
+    Devuelve el conteo guardado en ``clave`` o lo calcula con ``calcular()``.
+
+    El valor puede ser cualquier dato serializable (un entero, una tupla o un
+    diccionario de conteos).
+    """
+    swr = MODO_SWR if swr is None else swr
+    version = version_tickets()
+    entrada = cache.get(clave)
+    if entrada is not None and entrada["version"] == version:
+        return entrada["valor"]
+
+    if entrada is not None and swr:
+        # Solo quien obtiene el candado recalcula; el resto sirve el valor anterior.
+        if not cache.add(f"{clave}:candado", 1, DURACION_CANDADO):
+            return entrada["valor"]
+        try:
+            return _calcular_y_guardar(clave, calcular, version)
+        finally:
+            cache.delete(f"{clave}:candado")
+    return _calcular_y_guardar(clave, calcular, version)
+
+
+def _calcular_y_guardar(clave, calcular, version):
+    valor = calcular()
+    cache.set(clave, {"valor": valor, "version": version}, DURACION_CONTEO)
+    return valor
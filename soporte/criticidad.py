@@ -0,0 +1,87 @@
+"""Mantenimiento de ``Ticket.solicitante_critico``.
+
+La marca es una copia de ``PerfilUsuario.es_critico`` para poder ordenar y
+filtrar el listado sin unir con los perfiles. Guardar un ticket no consulta el
+perfil: cuando la marca del perfil cambia, una tarea la propaga por lotes a los
+tickets abiertos del usuario, y ``reconciliar_criticidad`` repara desfases.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+
+from .conteos import invalidar_conteos_tickets
+from .models import PerfilUsuario, Ticket, TicketListado
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE_CRITICIDAD = getattr(settings, "CRITICIDAD_TAMANO_LOTE", 1000)
+
+
+def _actualizar_por_lotes(queryset, valor, tamano_lote):
+    """Aplica ``solicitante_critico=valor`` a ``queryset`` en lotes por id."""
+    total = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            queryset.filter(id__gt=ultimo_id).order_by("id").values_list("id", flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            total += Ticket.objects.filter(id__in=ids).update(
+                solicitante_critico=valor, version=F("version") + 1
+            )
+            TicketListado.objects.filter(ticket_id__in=ids).update(solicitante_critico=valor)
+        ultimo_id = ids[-1]
+        if len(ids) < tamano_lote:
+            break
+    if total:
+        transaction.on_commit(invalidar_conteos_tickets)
+    return total
+
+
+def propagar_criticidad(usuario_id, tamano_lote=None):
+    """
+    Copia la marca actual del perfil a los tickets abiertos del usuario.
+
+    Se lee el valor de la base al ejecutar, de modo que cambios rápidos
+    sucesivos terminan en el último. Devuelve la cantidad de tickets cambiados.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_CRITICIDAD
+    es_critico = PerfilUsuario.objects.filter(user_id=usuario_id).values_list("es_critico", flat=True).first()
+    es_critico = bool(es_critico)
+    desfasados = Ticket.objects.filter(
+        solicitante_id=usuario_id,
+        estado__in=Ticket.ESTADOS_ABIERTOS,
+    ).exclude(solicitante_critico=es_critico)
+    total = _actualizar_por_lotes(desfasados, es_critico, tamano_lote)
+    logger.info("Criticidad del usuario %s propagada a %s tickets.", usuario_id, total)
+    return total
+
+
+def reconciliar_criticidad(tamano_lote=None, incluir_cerrados=False):
+    """
+    Corrige los tickets cuya marca no coincide con el perfil del solicitante.
+
+    Por defecto solo revisa tickets abiertos, igual que la propagación.
+    Devuelve la cantidad de tickets corregidos.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_CRITICIDAD
+    tickets = Ticket.objects.all()
+    if not incluir_cerrados:
+        tickets = tickets.filter(estado__in=Ticket.ESTADOS_ABIERTOS)
+    perfil_critico = Exists(
+        PerfilUsuario.objects.filter(user_id=OuterRef("solicitante_id"), es_critico=True)
+    )
+    tickets = tickets.alias(perfil_critico=perfil_critico)
+
+    total = _actualizar_por_lotes(
+        tickets.filter(Q(perfil_critico=True) & Q(solicitante_critico=False)), True, tamano_lote
+    )
+    total += _actualizar_por_lotes(
+        tickets.filter(Q(perfil_critico=False) & Q(solicitante_critico=True)), False, tamano_lote
+    )
+    logger.info("Reconciliación de criticidad: %s tickets corregidos.", total)
+    return total
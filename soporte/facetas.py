@@ -0,0 +1,56 @@
+"""Filtros del listado de tickets y conteos por faceta.
+
+Cada faceta (estado, prioridad, técnico) se cuenta con una sola consulta
+agrupada sobre el conjunto filtrado por los demás filtros activos, de modo que
+cada opción del desplegable muestra cuántos tickets quedarían al elegirla.
+Trabaja sobre ``TicketListado``, así que ni el filtrado ni los conteos unen
+otras tablas. Los resultados se guardan con la versión de tickets de
+``conteos``.
+"""
+from django.db.models import Count
+
+from .busqueda import filtrar_por_texto
+from .conteos import clave_conteo, obtener_conteo
+
+# Parámetro de la URL -> campo por el que se filtra y se agrupa.
+FACETAS = {
+    "estado": "estado",
+    "prioridad": "prioridad_clave",
+    "tecnico": "tecnico_nombre",
+}
+
+
+def filtrar_tickets(queryset, filtros, excluir=()):
+    """Aplica los filtros del listado (``estado``, ``prioridad``, ``tecnico``, ``search``)."""
+    for nombre, campo in FACETAS.items():
+        valor = filtros.get(nombre)
+        if valor and nombre not in excluir:
+            queryset = queryset.filter(**{campo: valor})
+    texto = filtros.get("search")
+    if texto and "search" not in excluir:
+        queryset = filtrar_por_texto(queryset, texto)
+    return queryset
+
+
+def contar_facetas(queryset, filtros, facetas=tuple(FACETAS)):
+    """Devuelve ``{faceta: {valor: total}}`` con una consulta agrupada por faceta."""
+    resultado = {}
+    for nombre in facetas:
+        agrupar = FACETAS[nombre]
+        filas = (
+            filtrar_tickets(queryset, filtros, excluir=(nombre,))
+            .exclude(**{agrupar: ""})
+            .values_list(agrupar)
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        resultado[nombre] = dict(filas)
+    return resultado
+
+
+def facetas_cacheadas(queryset, alcance, filtros, facetas=tuple(FACETAS)):
+    """``contar_facetas`` a través de la caché de conteos versionada."""
+    return obtener_conteo(
+        clave_conteo("facetas", alcance, {**filtros, "_facetas": ",".join(facetas)}),
+        lambda: contar_facetas(queryset, filtros, facetas),
+    )
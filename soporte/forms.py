@@ -6,6 +6,7 @@ from django.core.exceptions import ValidationError
 from django.utils.safestring import mark_safe
 from django.utils.text import slugify
 
+from . import catalogos
 from .models import Adjunto, Area, Comment, PerfilUsuario, Prioridad, RoleInfo, Ticket
 from .validators import IMAGE_ACCEPT_ATTR, image_file_validator
 
@@ -13,6 +14,48 @@ STAFF_ROLE_NAMES = {"tecnico", "técnico", "administrador", "admin"}
 SUPERUSER_ROLE_NAMES = {"administrador", "admin"}
 
 
+class CatalogoChoiceIterator(forms.models.ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.catalogo is None:
+            yield from super().__iter__()
+            return
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.catalogo():
+            yield self.choice(obj)
+
+    def __len__(self):
+        if self.field.catalogo is None:
+            return super().__len__()
+        return len(self.field.catalogo()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        if self.field.catalogo is None:
+            return super().__bool__()
+        return self.field.empty_label is not None or bool(self.field.catalogo())
+
+
+class CatalogoChoiceField(forms.ModelChoiceField):
+    """``ModelChoiceField`` cuyas opciones y validación salen de ``soporte.catalogos``."""
+
+    iterator = CatalogoChoiceIterator
+    catalogo = None
+
+    def to_python(self, value):
+        if self.catalogo is None or value in self.empty_values:
+            return super().to_python(value)
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        for obj in self.catalogo():
+            if str(obj.pk) == str(value):
+                return obj
+        raise ValidationError(
+            self.error_messages["invalid_choice"],
+            code="invalid_choice",
+            params={"value": value},
+        )
+
+
 class TicketForm(forms.ModelForm):
     adjunto = forms.FileField(
         required=False,
@@ -40,25 +83,29 @@ class TicketForm(forms.ModelForm):
             'descripcion': forms.Textarea(attrs={'rows': 6}),
             'fecha_compromiso_respuesta': forms.DateTimeInput(attrs={'readonly': True}),
         }
+        field_classes = {
+            'prioridad': CatalogoChoiceField,
+            'area_funcional': CatalogoChoiceField,
+        }
 
     def __init__(self, *args, user=None, **kwargs):
         self.user = user
         super().__init__(*args, **kwargs)
         self.fields['fecha_compromiso_respuesta'].disabled = True
         self.fields['estado_sla'].disabled = True
-        prioridades_qs = Prioridad.objects.order_by("orden", "nombre")
-        self.fields['prioridad'].queryset = prioridades_qs
+        prioridades = catalogos.prioridades()
+        self.fields['prioridad'].catalogo = catalogos.prioridades
         self.fields['prioridad'].empty_label = None
+        default_prioridad = prioridades[0] if prioridades else None
         if not self.instance.pk and not self.initial.get('prioridad'):
-            default_prioridad = prioridades_qs.first()
             if default_prioridad:
                 self.fields['prioridad'].initial = default_prioridad
 
-        areas_qs = Area.objects.order_by("orden", "nombre")
-        self.fields['area_funcional'].queryset = areas_qs
+        areas = catalogos.areas()
+        self.fields['area_funcional'].catalogo = catalogos.areas
         self.fields['area_funcional'].empty_label = None
+        default_area = areas[0] if areas else None
         if not self.instance.pk and not self.initial.get('area_funcional'):
-            default_area = areas_qs.first()
             if default_area:
                 self.fields['area_funcional'].initial = default_area
 
@@ -77,11 +124,9 @@ class TicketForm(forms.ModelForm):
             if 'categoria' in self.fields and not self.fields['categoria'].initial:
                 self.fields['categoria'].initial = Ticket._meta.get_field('categoria').default
             if 'prioridad' in self.fields and not self.fields['prioridad'].initial:
-                default_prioridad = prioridades_qs.first()
                 if default_prioridad:
                     self.fields['prioridad'].initial = default_prioridad
             if 'area_funcional' in self.fields and not self.fields['area_funcional'].initial:
-                default_area = areas_qs.first()
                 if default_area:
                     self.fields['area_funcional'].initial = default_area
 
@@ -94,17 +139,18 @@ class TicketForm(forms.ModelForm):
                     or Ticket._meta.get_field('categoria').default
                 )
             if 'prioridad' in self.fields:
-                prioridades_qs = self.fields['prioridad'].queryset
+                prioridades = catalogos.prioridades()
                 prioridad_default = (
                     cleaned_data.get('prioridad')
                     or self.fields['prioridad'].initial
-                    or prioridades_qs.first()
+                    or (prioridades[0] if prioridades else None)
                 )
                 cleaned_data['prioridad'] = prioridad_default
             if 'area_funcional' in self.fields and not cleaned_data.get('area_funcional'):
+                areas = catalogos.areas()
                 cleaned_data['area_funcional'] = (
                     self.fields['area_funcional'].initial
-                    or self.fields['area_funcional'].queryset.first()
+                    or (areas[0] if areas else None)
                 )
         return cleaned_data
 
@@ -119,16 +165,18 @@ class TechTicketForm(forms.ModelForm):
             "prioridad",
             "tecnico_asignado",
         ]
+        field_classes = {
+            "prioridad": CatalogoChoiceField,
+            "tecnico_asignado": CatalogoChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['prioridad'].queryset = Prioridad.objects.order_by("orden", "nombre")
+        self.fields['prioridad'].catalogo = catalogos.prioridades
         self.fields['prioridad'].empty_label = None
         User = get_user_model()
-        self.fields['tecnico_asignado'].queryset = (
-            User.objects.filter(is_staff=True)
-            .order_by('first_name', 'last_name', 'username')
-        )
+        self.fields['tecnico_asignado'].queryset = User.objects.filter(is_staff=True)
+        self.fields['tecnico_asignado'].catalogo = catalogos.usuarios_staff
 
 
 class PrioridadForm(forms.ModelForm):
@@ -468,8 +516,8 @@ class UserUpdateForm(forms.ModelForm):
                 perfil.rut = rut
                 perfil_actualizado = True
             if perfil_actualizado:
+                # Si la marca cambió, el perfil encola la propagación a los tickets abiertos.
                 perfil.save(update_fields=['rut', 'es_critico'])
-            Ticket.objects.filter(solicitante=user).update(solicitante_critico=es_critico)
         return user
 
 
@@ -0,0 +1,142 @@
+"""Modelo de lectura ``TicketListado`` para listados y exportaciones.
+
+Las escrituras de tickets llaman a ``sincronizar_listado`` dentro de su
+transacción: ``Ticket.save`` y los comentarios y adjuntos mediante señales,
+``update_ticket`` y las operaciones masivas de SLA y criticidad de forma
+explícita. La fila plana se recalcula con una consulta y se escribe con un
+upsert, así que nunca queda una versión del ticket sin su fila. Los cambios de
+nombre de prioridades, áreas y usuarios se copian con un UPDATE por clave
+foránea.
+
+``reconstruir_listado`` vuelve a generar toda la tabla por lotes de ids, para
+poblarla al desplegar o reparar desfases.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Adjunto, Comment, Ticket, TicketListado
+
+TAMANO_LOTE_LISTADO = getattr(settings, "LISTADO_TAMANO_LOTE", 1000)
+
+CAMPOS_ACTUALIZABLES = [
+    field.name for field in TicketListado._meta.concrete_fields if not field.primary_key
+]
+
+
+def _agregado(modelo, expresion):
+    """Subconsulta correlacionada de un agregado sobre los hijos del ticket."""
+    return Subquery(
+        modelo.objects.filter(ticket=OuterRef("pk"))
+        .order_by()
+        .values("ticket")
+        .annotate(valor=expresion)
+        .values("valor")
+    )
+
+
+def _tickets_con_totales(ids):
+    return (
+        Ticket.objects.filter(id__in=ids)
+        .select_related("solicitante", "tecnico_asignado", "prioridad", "area_funcional")
+        .annotate(
+            total_comentarios=Coalesce(_agregado(Comment, Count("id")), Value(0), output_field=IntegerField()),
+            total_adjuntos=Coalesce(_agregado(Adjunto, Count("id")), Value(0), output_field=IntegerField()),
+            ultimo_comentario=_agregado(Comment, Max("created_at")),
+            ultimo_adjunto=_agregado(Adjunto, Max("fecha_subida")),
+        )
+    )
+
+
+def _fila(ticket):
+    actividad = [
+        fecha
+        for fecha in (ticket.fecha_actualizacion, ticket.ultimo_comentario, ticket.ultimo_adjunto)
+        if fecha is not None
+    ]
+    tecnico = ticket.tecnico_asignado
+    return TicketListado(
+        ticket_id=ticket.id,
+        titulo=ticket.titulo,
+        solicitante_id=ticket.solicitante_id,
+        solicitante_nombre=ticket.solicitante.username,
+        solicitante_critico=ticket.solicitante_critico,
+        tecnico_id=ticket.tecnico_asignado_id,
+        tecnico_nombre=tecnico.username if tecnico else "",
+        prioridad_id=ticket.prioridad_id,
+        prioridad_clave=ticket.prioridad.clave,
+        prioridad_nombre=ticket.prioridad.nombre,
+        prioridad_orden=ticket.prioridad.orden,
+        area_id=ticket.area_funcional_id,
+        area_nombre=ticket.area_funcional.nombre,
+        estado=ticket.estado,
+        categoria=ticket.categoria,
+        tipo_ticket=ticket.tipo_ticket,
+        estado_sla=ticket.estado_sla,
+        fecha_compromiso_respuesta=ticket.fecha_compromiso_respuesta,
+        fecha_creacion=ticket.fecha_creacion,
+        fecha_cierre=ticket.fecha_cierre,
+        tiempo_resolucion=ticket.tiempo_resolucion,
+        total_comentarios=ticket.total_comentarios,
+        total_adjuntos=ticket.total_adjuntos,
+        ultima_actividad=max(actividad),
+    )
+
+
+def sincronizar_listado(ticket_ids):
+    """
+    Recalcula las filas de ``ticket_ids`` desde las tablas de origen.
+
+    Una consulta para leer y un upsert para escribir, sin importar cuántos
+    tickets sean. Devuelve la cantidad de filas escritas.
+    """
+    filas = [_fila(ticket) for ticket in _tickets_con_totales(list(ticket_ids))]
+    if filas:
+        TicketListado.objects.bulk_create(
+            filas,
+            update_conflicts=True,
+            unique_fields=["ticket"],
+            update_fields=CAMPOS_ACTUALIZABLES,
+        )
+    return len(filas)
+
+
+def renombrar_usuario(usuario):
+    """Copia el nombre de usuario a las filas donde figura como solicitante o técnico."""
+    TicketListado.objects.filter(solicitante=usuario).exclude(
+        solicitante_nombre=usuario.username
+    ).update(solicitante_nombre=usuario.username)
+    TicketListado.objects.filter(tecnico=usuario).exclude(
+        tecnico_nombre=usuario.username
+    ).update(tecnico_nombre=usuario.username)
+
+
+def reconstruir_listado(tamano_lote=None, progreso=None):
+    """
+    Regenera ``TicketListado`` completo por lotes de ids.
+
+    Cada lote es una transacción corta, así que se puede ejecutar con la
+    aplicación en uso y repetir sin duplicar. ``progreso`` recibe
+    ``(procesados, total)`` tras cada lote. Devuelve la cantidad de filas.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_LISTADO
+    total = Ticket.objects.count()
+    procesados = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Ticket.objects.filter(id__gt=ultimo_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            procesados += sincronizar_listado(ids)
+        ultimo_id = ids[-1]
+        if progreso is not None:
+            progreso(procesados, total)
+        if len(ids) < tamano_lote:
+            break
+    return procesados
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from soporte.retencion import archivar_notificaciones
+
+
+class Command(BaseCommand):
+    help = "Elimina por lotes las notificaciones leídas más antiguas que el plazo de retención."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias",
+            type=int,
+            default=None,
+            help="Antigüedad mínima en días; por defecto NOTIFICACIONES_RETENCION_DIAS.",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Cantidad de notificaciones eliminadas por transacción.",
+        )
+        parser.add_argument(
+            "--sin-archivo",
+            action="store_true",
+            help="No resumir las notificaciones eliminadas en el archivo.",
+        )
+
+    def handle(self, *args, **options):
+        total = archivar_notificaciones(
+            dias=options["dias"],
+            tamano_lote=options["lote"],
+            archivar=False if options["sin_archivo"] else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Notificaciones eliminadas: {total}."))
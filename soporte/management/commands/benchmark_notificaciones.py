@@ -0,0 +1,116 @@
+import statistics
+import uuid
+from datetime import timedelta
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from soporte.models import Notification
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las consultas de notificaciones de un usuario con muchas filas, "
+        "sin y con los índices de Notification. Todo se revierte al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cantidad", type=int, default=50000, help="Notificaciones del usuario de prueba.")
+        parser.add_argument(
+            "--no-leidas-cada",
+            type=int,
+            default=10,
+            help="Una de cada N notificaciones queda sin leer.",
+        )
+        parser.add_argument("--repeticiones", type=int, default=20, help="Ejecuciones por consulta.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usuario = self._poblar(options["cantidad"], options["no_leidas_cada"])
+            consultas = self._consultas(usuario)
+            indices = Notification._meta.indexes
+
+            self._cambiar_indices(indices, crear=False)
+            antes = self._medir(consultas, options["repeticiones"])
+            self._cambiar_indices(indices, crear=True)
+            despues = self._medir(consultas, options["repeticiones"])
+
+            self.stdout.write(f"{options['cantidad']} notificaciones, mediana de {options['repeticiones']} ejecuciones:")
+            for nombre in consultas:
+                self.stdout.write(
+                    f"  {nombre}: {antes[nombre][0]:.2f} ms -> {despues[nombre][0]:.2f} ms"
+                )
+                self.stdout.write(f"    sin índices: {antes[nombre][1]}")
+                self.stdout.write(f"    con índices: {despues[nombre][1]}")
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("Datos de prueba revertidos."))
+
+    def _poblar(self, cantidad, no_leidas_cada):
+        usuario = get_user_model().objects.create_user(username=f"benchmark-{uuid.uuid4().hex[:12]}")
+        ahora = timezone.now()
+        Notification.objects.bulk_create(
+            (
+                Notification(
+                    user=usuario,
+                    type="benchmark",
+                    message=f"Notificación {i}",
+                    url="/tickets/",
+                    is_read=i % no_leidas_cada != 0,
+                    created_at=ahora - timedelta(minutes=i),
+                )
+                for i in range(cantidad)
+            ),
+            batch_size=1000,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Notification._meta.db_table}")
+        return usuario
+
+    def _consultas(self, usuario):
+        propias = Notification.objects.filter(user=usuario)
+        leida = propias.filter(is_read=True).values_list("id", flat=True).first()
+        return {
+            "no leídas recientes": lambda: list(propias.filter(is_read=False).order_by("-created_at")[:10]),
+            "conteo de no leídas": lambda: propias.filter(is_read=False).count(),
+            "lista (primera página)": lambda: list(propias.order_by("-created_at")[:20]),
+            "marcar leída": lambda: propias.filter(id__in=[leida], is_read=False).update(is_read=True),
+        }
+
+    def _cambiar_indices(self, indices, crear):
+        # SQL directo: el schema editor de SQLite no puede abrirse dentro de una transacción.
+        editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for indice in indices:
+                if crear:
+                    cursor.execute(str(indice.create_sql(Notification, editor)))
+                else:
+                    cursor.execute(f"DROP INDEX {editor.quote_name(indice.name)}")
+
+    def _medir(self, consultas, repeticiones):
+        resultados = {}
+        for nombre, consulta in consultas.items():
+            tiempos = []
+            for _ in range(repeticiones):
+                inicio = perf_counter()
+                consulta()
+                tiempos.append((perf_counter() - inicio) * 1000)
+            resultados[nombre] = (statistics.median(tiempos), self._plan(consulta))
+        return resultados
+
+    def _plan(self, consulta):
+        capturadas = []
+
+        def capturar(execute, sql, params, many, context):
+            capturadas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capturar):
+            consulta()
+        sql, params = capturadas[-1]
+        with connection.cursor() as cursor:
+            prefijo = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+            cursor.execute(prefijo + sql, params)
+            return " | ".join(str(fila[-1]) for fila in cursor.fetchall())
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from soporte.asignacion import recalcular_cargas
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de carga de los técnicos desde los tickets abiertos."
+
+    def handle(self, *args, **options):
+        corregidas = recalcular_cargas()
+        self.stdout.write(self.style.SUCCESS(f"Contadores corregidos: {corregidas} técnicos."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from soporte.utils.notifications import reconcile_unread_counts
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de notificaciones sin leer desde las notificaciones."
+
+    def handle(self, *args, **options):
+        corregidos = reconcile_unread_counts()
+        self.stdout.write(self.style.SUCCESS(f"Contadores corregidos: {corregidos} usuarios."))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from soporte.models import Prioridad
+from soporte.sla import recalcular_sla
+
+
+class Command(BaseCommand):
+    help = "Recalcula el compromiso y el estado del SLA de los tickets abiertos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--prioridad",
+            action="append",
+            dest="prioridades",
+            metavar="CLAVE",
+            help="Clave de la prioridad a recalcular. Puede repetirse; por defecto se recalculan todas.",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Cantidad de tickets actualizados por sentencia.",
+        )
+
+    def handle(self, *args, **options):
+        prioridad_ids = None
+        claves = options["prioridades"]
+        if claves:
+            encontradas = dict(Prioridad.objects.filter(clave__in=claves).values_list("clave", "id"))
+            faltantes = sorted(set(claves) - set(encontradas))
+            if faltantes:
+                raise CommandError(f"Prioridades inexistentes: {', '.join(faltantes)}")
+            prioridad_ids = list(encontradas.values())
+
+        def progreso(procesados, total):
+            self.stdout.write(f"{procesados}/{total} tickets recalculados")
+
+        total = recalcular_sla(
+            prioridad_ids=prioridad_ids,
+            tamano_lote=options["lote"],
+            progreso=progreso,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Recálculo terminado: {total} tickets."))
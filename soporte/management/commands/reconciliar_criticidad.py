@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from soporte.criticidad import reconciliar_criticidad
+
+
+class Command(BaseCommand):
+    help = "Corrige la marca de solicitante crítico de los tickets según el perfil de cada solicitante."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incluir-cerrados",
+            action="store_true",
+            help="Revisa también los tickets resueltos y cerrados.",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Cantidad de tickets actualizados por sentencia.",
+        )
+
+    def handle(self, *args, **options):
+        total = reconciliar_criticidad(
+            tamano_lote=options["lote"],
+            incluir_cerrados=options["incluir_cerrados"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Reconciliación terminada: {total} tickets corregidos."))
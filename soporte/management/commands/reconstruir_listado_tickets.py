@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from soporte.listado import reconstruir_listado
+
+
+class Command(BaseCommand):
+    help = "Regenera por lotes la tabla plana de listado de tickets (TicketListado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Cantidad de tickets reescritos por transacción.",
+        )
+
+    def handle(self, *args, **options):
+        def progreso(procesados, total):
+            self.stdout.write(f"{procesados}/{total} tickets procesados")
+
+        total = reconstruir_listado(tamano_lote=options["lote"], progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f"Listado reconstruido: {total} tickets."))
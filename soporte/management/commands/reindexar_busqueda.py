@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from soporte.busqueda import motor_busqueda, reindexar_busqueda
+
+
+class Command(BaseCommand):
+    help = "Reconstruye por lotes el índice de texto completo de los tickets."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Cantidad de tickets indexados por transacción.",
+        )
+
+    def handle(self, *args, **options):
+        if motor_busqueda() is None:
+            self.stdout.write(self.style.WARNING("La base de datos actual no tiene índice de texto completo."))
+            return
+
+        def progreso(procesados, total):
+            self.stdout.write(f"{procesados}/{total} tickets indexados")
+
+        total = reindexar_busqueda(tamano_lote=options["lote"], progreso=progreso)
+        self.stdout.write(self.style.SUCCESS(f"Reindexación terminada: {total} tickets."))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:31
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+NOMBRE_TAREA_BARRIDO = "Barrido de SLA vencidos"
+
+
+def programar_barrido_sla(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        name=NOMBRE_TAREA_BARRIDO,
+        defaults={
+            "func": "soporte.tasks.barrido_sla",
+            "schedule_type": "H",
+            "repeats": -1,
+            "next_run": timezone.now(),
+        },
+    )
+
+
+def eliminar_barrido_sla(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(name=NOMBRE_TAREA_BARRIDO).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0016_alter_adjunto_archivo_alter_comment_adjunto'),
+        ('django_q', '0013_task_attempt_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tickethistory',
+            name='action',
+            field=models.CharField(choices=[('CREATED', 'Creación'), ('STATUS', 'Estado'), ('PRIORITY', 'Prioridad'), ('ASSIGNEE', 'Técnico'), ('TITLE', 'Título'), ('DESCRIPTION', 'Descripción'), ('CATEGORY', 'Categoría'), ('AREA', 'Área'), ('ATTACH_ADD', 'Adjunto agregado'), ('ATTACH_DEL', 'Adjunto eliminado'), ('COMMENT', 'Comentario')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['estado_sla', 'fecha_compromiso_respuesta'], name='soporte_tic_estado__29b0ae_idx'),
+        ),
+        migrations.RunPython(programar_barrido_sla, eliminar_barrido_sla),
+    ]
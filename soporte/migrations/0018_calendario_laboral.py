@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:34
+
+import django.db.models.deletion
+import soporte.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0017_sla_barrido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioLaboral',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('zona_horaria', models.CharField(default='America/Santiago', help_text='Zona horaria IANA en la que se interpretan los horarios y feriados.', max_length=64, validators=[soporte.validators.time_zone_validator], verbose_name='Zona horaria')),
+                ('activo', models.BooleanField(default=False, help_text='Solo el calendario activo se usa para calcular los SLA. Sin calendario activo se usan minutos corridos.', verbose_name='Activo')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Calendario laboral',
+                'verbose_name_plural': 'Calendarios laborales',
+                'constraints': [models.UniqueConstraint(condition=models.Q(('activo', True)), fields=('activo',), name='calendario_laboral_unico_activo')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HorarioLaboral',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(choices=[(0, 'Lunes'), (1, 'Martes'), (2, 'Miércoles'), (3, 'Jueves'), (4, 'Viernes'), (5, 'Sábado'), (6, 'Domingo')], verbose_name='Día')),
+                ('hora_inicio', models.TimeField(verbose_name='Hora de inicio')),
+                ('hora_fin', models.TimeField(verbose_name='Hora de término')),
+                ('calendario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='horarios', to='soporte.calendariolaboral', verbose_name='Calendario')),
+            ],
+            options={
+                'verbose_name': 'Horario laboral',
+                'verbose_name_plural': 'Horarios laborales',
+                'ordering': ['dia_semana', 'hora_inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('descripcion', models.CharField(blank=True, default='', max_length=100, verbose_name='Descripción')),
+                ('calendario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feriados', to='soporte.calendariolaboral', verbose_name='Calendario')),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['fecha'],
+                'unique_together': {('calendario', 'fecha')},
+            },
+        ),
+    ]
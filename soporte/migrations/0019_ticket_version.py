@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0018_calendario_laboral'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Se incrementa en cada modificación para detectar ediciones concurrentes.', verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Greatest
+
+
+def poblar_cargas(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Ticket = apps.get_model('soporte', 'Ticket')
+    CargaTecnico = apps.get_model('soporte', 'CargaTecnico')
+    agregados = {
+        fila['tecnico_asignado_id']: fila
+        for fila in Ticket.objects.filter(estado__in=['abierto', 'progreso'], tecnico_asignado__isnull=False)
+        .values('tecnico_asignado_id')
+        .annotate(abiertos=models.Count('id'), carga=models.Sum(Greatest('prioridad__orden', models.Value(1))))
+        .order_by()
+    }
+    cargas = []
+    for tecnico_id in User.objects.filter(is_staff=True).values_list('id', flat=True):
+        fila = agregados.get(tecnico_id, {})
+        cargas.append(
+            CargaTecnico(
+                tecnico_id=tecnico_id,
+                tickets_abiertos=fila.get('abiertos', 0),
+                carga=fila.get('carga') or 0,
+            )
+        )
+    CargaTecnico.objects.bulk_create(cargas, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('soporte', '0019_ticket_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaTecnico',
+            fields=[
+                ('tecnico', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='carga', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Técnico')),
+                ('tickets_abiertos', models.PositiveIntegerField(default=0, verbose_name='Tickets abiertos')),
+                ('carga', models.PositiveIntegerField(default=0, help_text='Suma de los pesos de sus tickets abiertos (orden de la prioridad si la ponderación está activa).', verbose_name='Carga ponderada')),
+                ('ultima_asignacion', models.DateTimeField(blank=True, null=True, verbose_name='Última asignación')),
+                ('disponible', models.BooleanField(default=True, help_text='Desmarca para excluir al técnico de la asignación automática.', verbose_name='Disponible')),
+                ('atiende_todas_las_areas', models.BooleanField(default=True, verbose_name='Atiende todas las áreas')),
+                ('areas', models.ManyToManyField(blank=True, help_text='Solo se consideran si el técnico no atiende todas las áreas.', related_name='tecnicos', to='soporte.area', verbose_name='Áreas atendidas')),
+            ],
+            options={
+                'verbose_name': 'Carga de técnico',
+                'verbose_name_plural': 'Cargas de técnicos',
+                'indexes': [models.Index(fields=['disponible', 'carga', 'ultima_asignacion'], name='soporte_car_disponi_55d5b8_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_cargas, migrations.RunPython.noop),
+    ]
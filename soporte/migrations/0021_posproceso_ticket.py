@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0020_carga_tecnico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PosprocesoTicket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('tiempos', models.JSONField(blank=True, default=dict, help_text='Milisegundos por etapa completada; las etapas presentes no se repiten al reintentar.')),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='posproceso', to='soporte.ticket')),
+            ],
+            options={
+                'verbose_name': 'Posproceso de ticket',
+                'verbose_name_plural': 'Posprocesos de tickets',
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='soporte_pos_estado_8c00db_idx')],
+            },
+        ),
+    ]
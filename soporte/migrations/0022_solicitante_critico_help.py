@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0021_posproceso_ticket'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='solicitante_critico',
+            field=models.BooleanField(db_index=True, default=False, help_text='Copia de la marca del perfil del solicitante. Se fija al registrar el ticket y se actualiza en los tickets abiertos cuando cambia el perfil.', verbose_name='Solicitante crítico'),
+        ),
+    ]
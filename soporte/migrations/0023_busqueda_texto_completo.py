@@ -0,0 +1,99 @@
+from django.db import migrations
+
+TAMANO_LOTE = 1000
+
+SQLITE_CREAR = [
+    "CREATE VIRTUAL TABLE soporte_ticket_fts USING fts5("
+    "titulo, descripcion, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER soporte_ticket_fts_ai AFTER INSERT ON soporte_ticket BEGIN "
+    "INSERT INTO soporte_ticket_fts (rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion); "
+    "END",
+    "CREATE TRIGGER soporte_ticket_fts_au AFTER UPDATE OF titulo, descripcion ON soporte_ticket BEGIN "
+    "DELETE FROM soporte_ticket_fts WHERE rowid = old.id; "
+    "INSERT INTO soporte_ticket_fts (rowid, titulo, descripcion) VALUES (new.id, new.titulo, new.descripcion); "
+    "END",
+    "CREATE TRIGGER soporte_ticket_fts_ad AFTER DELETE ON soporte_ticket BEGIN "
+    "DELETE FROM soporte_ticket_fts WHERE rowid = old.id; "
+    "END",
+]
+SQLITE_ELIMINAR = [
+    "DROP TRIGGER IF EXISTS soporte_ticket_fts_ai",
+    "DROP TRIGGER IF EXISTS soporte_ticket_fts_au",
+    "DROP TRIGGER IF EXISTS soporte_ticket_fts_ad",
+    "DROP TABLE IF EXISTS soporte_ticket_fts",
+]
+SQLITE_POBLAR = (
+    "INSERT INTO soporte_ticket_fts (rowid, titulo, descripcion) "
+    "SELECT id, titulo, descripcion FROM soporte_ticket WHERE id > %s AND id <= %s"
+)
+
+DOCUMENTO_PG = (
+    "setweight(to_tsvector('spanish', coalesce({t}.titulo, '')), 'A') || "
+    "setweight(to_tsvector('spanish', coalesce({t}.descripcion, '')), 'B')"
+)
+PG_CREAR = [
+    "CREATE TABLE soporte_ticket_busqueda ("
+    "ticket_id bigint PRIMARY KEY REFERENCES soporte_ticket (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "documento tsvector NOT NULL)",
+    "CREATE INDEX soporte_ticket_busqueda_gin ON soporte_ticket_busqueda USING gin (documento)",
+    "CREATE FUNCTION soporte_ticket_busqueda_actualizar() RETURNS trigger AS $$ "
+    "BEGIN "
+    "INSERT INTO soporte_ticket_busqueda (ticket_id, documento) VALUES (NEW.id, " + DOCUMENTO_PG.format(t="NEW") + ") "
+    "ON CONFLICT (ticket_id) DO UPDATE SET documento = EXCLUDED.documento; "
+    "RETURN NULL; "
+    "END $$ LANGUAGE plpgsql",
+    "CREATE TRIGGER soporte_ticket_busqueda_aiu AFTER INSERT OR UPDATE OF titulo, descripcion ON soporte_ticket "
+    "FOR EACH ROW EXECUTE FUNCTION soporte_ticket_busqueda_actualizar()",
+]
+PG_ELIMINAR = [
+    "DROP TRIGGER IF EXISTS soporte_ticket_busqueda_aiu ON soporte_ticket",
+    "DROP FUNCTION IF EXISTS soporte_ticket_busqueda_actualizar()",
+    "DROP TABLE IF EXISTS soporte_ticket_busqueda",
+]
+PG_POBLAR = (
+    "INSERT INTO soporte_ticket_busqueda (ticket_id, documento) "
+    "SELECT id, " + DOCUMENTO_PG.format(t="soporte_ticket") + " FROM soporte_ticket WHERE id > %s AND id <= %s "
+    "ON CONFLICT (ticket_id) DO NOTHING"
+)
+
+
+def crear_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        sentencias, poblar = SQLITE_CREAR, SQLITE_POBLAR
+    elif vendor == "postgresql":
+        sentencias, poblar = PG_CREAR, PG_POBLAR
+    else:
+        return
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+    # Poblado inicial por rangos de id; ``manage.py reindexar_busqueda`` lo repite si hace falta.
+    Ticket = apps.get_model("soporte", "Ticket")
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Ticket.objects.filter(id__gt=ultimo_id).order_by("id").values_list("id", flat=True)[:TAMANO_LOTE]
+        )
+        if not ids:
+            break
+        schema_editor.execute(poblar, [ultimo_id, ids[-1]])
+        ultimo_id = ids[-1]
+
+
+def eliminar_indice_busqueda(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = {"sqlite": SQLITE_ELIMINAR, "postgresql": PG_ELIMINAR}.get(vendor, [])
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("soporte", "0022_solicitante_critico_help"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_busqueda, eliminar_indice_busqueda),
+    ]
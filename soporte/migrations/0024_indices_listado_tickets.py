@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0023_busqueda_texto_completo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['solicitante', 'estado', 'fecha_creacion'], name='soporte_tic_solicit_e834a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['tecnico_asignado', 'estado'], name='soporte_tic_tecnico_b02aba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='soporte_tic_estado_2242c9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['estado', 'fecha_cierre'], name='soporte_tic_estado_f44a76_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['fecha_creacion'], name='soporte_tic_fecha_c_c50e7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['categoria'], name='soporte_tic_categor_aca922_idx'),
+        ),
+    ]
@@ -0,0 +1,125 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+TAMANO_LOTE = 1000
+
+
+def poblar_listado(apps, schema_editor):
+    Ticket = apps.get_model('soporte', 'Ticket')
+    Comment = apps.get_model('soporte', 'Comment')
+    Adjunto = apps.get_model('soporte', 'Adjunto')
+    TicketListado = apps.get_model('soporte', 'TicketListado')
+
+    def agregado(modelo, expresion):
+        return models.Subquery(
+            modelo.objects.filter(ticket=models.OuterRef('pk'))
+            .order_by()
+            .values('ticket')
+            .annotate(valor=expresion)
+            .values('valor')
+        )
+
+    ultimo_id = 0
+    while True:
+        tickets = list(
+            Ticket.objects.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .select_related('solicitante', 'tecnico_asignado', 'prioridad', 'area_funcional')
+            .annotate(
+                total_comentarios=Coalesce(agregado(Comment, models.Count('id')), 0),
+                total_adjuntos=Coalesce(agregado(Adjunto, models.Count('id')), 0),
+                ultimo_comentario=agregado(Comment, models.Max('created_at')),
+                ultimo_adjunto=agregado(Adjunto, models.Max('fecha_subida')),
+            )[:TAMANO_LOTE]
+        )
+        if not tickets:
+            break
+        filas = []
+        for ticket in tickets:
+            actividad = [
+                fecha
+                for fecha in (ticket.fecha_actualizacion, ticket.ultimo_comentario, ticket.ultimo_adjunto)
+                if fecha is not None
+            ]
+            filas.append(
+                TicketListado(
+                    ticket_id=ticket.id,
+                    titulo=ticket.titulo,
+                    solicitante_id=ticket.solicitante_id,
+                    solicitante_nombre=ticket.solicitante.username,
+                    solicitante_critico=ticket.solicitante_critico,
+                    tecnico_id=ticket.tecnico_asignado_id,
+                    tecnico_nombre=ticket.tecnico_asignado.username if ticket.tecnico_asignado_id else '',
+                    prioridad_id=ticket.prioridad_id,
+                    prioridad_clave=ticket.prioridad.clave,
+                    prioridad_nombre=ticket.prioridad.nombre,
+                    prioridad_orden=ticket.prioridad.orden,
+                    area_id=ticket.area_funcional_id,
+                    area_nombre=ticket.area_funcional.nombre,
+                    estado=ticket.estado,
+                    categoria=ticket.categoria,
+                    tipo_ticket=ticket.tipo_ticket,
+                    estado_sla=ticket.estado_sla,
+                    fecha_compromiso_respuesta=ticket.fecha_compromiso_respuesta,
+                    fecha_creacion=ticket.fecha_creacion,
+                    fecha_cierre=ticket.fecha_cierre,
+                    tiempo_resolucion=ticket.tiempo_resolucion,
+                    total_comentarios=ticket.total_comentarios,
+                    total_adjuntos=ticket.total_adjuntos,
+                    ultima_actividad=max(actividad),
+                )
+            )
+        TicketListado.objects.bulk_create(filas, ignore_conflicts=True)
+        ultimo_id = tickets[-1].id
+        if len(tickets) < TAMANO_LOTE:
+            break
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0024_indices_listado_tickets'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketListado',
+            fields=[
+                ('ticket', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listado', serialize=False, to='soporte.ticket')),
+                ('titulo', models.CharField(max_length=200)),
+                ('solicitante_nombre', models.CharField(max_length=150)),
+                ('solicitante_critico', models.BooleanField(default=False)),
+                ('tecnico_nombre', models.CharField(blank=True, default='', max_length=150)),
+                ('prioridad_clave', models.SlugField()),
+                ('prioridad_nombre', models.CharField(max_length=100)),
+                ('prioridad_orden', models.PositiveIntegerField(default=0)),
+                ('area_nombre', models.CharField(max_length=100)),
+                ('estado', models.CharField(choices=[('abierto', 'Abierto'), ('progreso', 'En Progreso'), ('resuelto', 'Resuelto'), ('cerrado', 'Cerrado')], max_length=20)),
+                ('categoria', models.CharField(choices=[('soporte', 'Soporte Técnico'), ('consulta', 'Consulta'), ('incidencia', 'Incidencia'), ('solicitud', 'Solicitud')], max_length=50)),
+                ('tipo_ticket', models.CharField(choices=[('incidencia', 'Incidencia'), ('solicitud', 'Solicitud')], max_length=20)),
+                ('estado_sla', models.CharField(choices=[('pendiente', 'Pendiente'), ('vencido', 'Vencido'), ('cumplido', 'Cumplido'), ('sin_regla', 'Sin regla')], max_length=20)),
+                ('fecha_compromiso_respuesta', models.DateTimeField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_cierre', models.DateTimeField(blank=True, null=True)),
+                ('tiempo_resolucion', models.DurationField(blank=True, null=True)),
+                ('total_comentarios', models.PositiveIntegerField(default=0)),
+                ('total_adjuntos', models.PositiveIntegerField(default=0)),
+                ('ultima_actividad', models.DateTimeField(help_text='Lo más reciente entre la última modificación, comentario o adjunto.')),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='soporte.area')),
+                ('prioridad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='soporte.prioridad')),
+                ('solicitante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('tecnico', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ticket (listado)',
+                'verbose_name_plural': 'Tickets (listado)',
+                'indexes': [models.Index(fields=['solicitante', 'estado', 'fecha_creacion'], name='soporte_tic_solicit_0ba2d2_idx'), models.Index(fields=['estado', 'fecha_creacion'], name='soporte_tic_estado_585180_idx'), models.Index(fields=['solicitante_critico', 'prioridad_orden', 'fecha_creacion'], name='soporte_tic_solicit_84a9f3_idx'), models.Index(fields=['tecnico_nombre', 'estado'], name='soporte_tic_tecnico_80b799_idx'), models.Index(fields=['fecha_creacion'], name='soporte_tic_fecha_c_a0d294_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_listado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+TAMANO_LOTE = 1000
+
+SQLITE_CREAR = [
+    "CREATE VIRTUAL TABLE soporte_ticket_trigramas USING fts5(titulo, tokenize = 'trigram')",
+    "CREATE TRIGGER soporte_ticket_trigramas_ai AFTER INSERT ON soporte_ticket BEGIN "
+    "INSERT INTO soporte_ticket_trigramas (rowid, titulo) VALUES (new.id, new.titulo); "
+    "END",
+    "CREATE TRIGGER soporte_ticket_trigramas_au AFTER UPDATE OF titulo ON soporte_ticket BEGIN "
+    "DELETE FROM soporte_ticket_trigramas WHERE rowid = old.id; "
+    "INSERT INTO soporte_ticket_trigramas (rowid, titulo) VALUES (new.id, new.titulo); "
+    "END",
+    "CREATE TRIGGER soporte_ticket_trigramas_ad AFTER DELETE ON soporte_ticket BEGIN "
+    "DELETE FROM soporte_ticket_trigramas WHERE rowid = old.id; "
+    "END",
+]
+SQLITE_ELIMINAR = [
+    "DROP TRIGGER IF EXISTS soporte_ticket_trigramas_ai",
+    "DROP TRIGGER IF EXISTS soporte_ticket_trigramas_au",
+    "DROP TRIGGER IF EXISTS soporte_ticket_trigramas_ad",
+    "DROP TABLE IF EXISTS soporte_ticket_trigramas",
+]
+SQLITE_POBLAR = (
+    "INSERT INTO soporte_ticket_trigramas (rowid, titulo) "
+    "SELECT id, titulo FROM soporte_ticket WHERE id > %s AND id <= %s"
+)
+
+# En PostgreSQL el título ya está en ``soporte_ticketlistado``; basta un índice GIN de trigramas.
+PG_CREAR = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS soporte_ticketlistado_titulo_trgm "
+    "ON soporte_ticketlistado USING gin (titulo gin_trgm_ops)",
+]
+PG_ELIMINAR = [
+    "DROP INDEX IF EXISTS soporte_ticketlistado_titulo_trgm",
+]
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sentencia in PG_CREAR:
+            schema_editor.execute(sentencia)
+        return
+    if vendor != "sqlite":
+        return
+    for sentencia in SQLITE_CREAR:
+        schema_editor.execute(sentencia)
+
+    # Poblado inicial por rangos de id; ``manage.py reindexar_busqueda`` lo repite si hace falta.
+    Ticket = apps.get_model("soporte", "Ticket")
+    ultimo_id = 0
+    while True:
+        ids = list(
+            Ticket.objects.filter(id__gt=ultimo_id).order_by("id").values_list("id", flat=True)[:TAMANO_LOTE]
+        )
+        if not ids:
+            break
+        schema_editor.execute(SQLITE_POBLAR, [ultimo_id, ids[-1]])
+        ultimo_id = ids[-1]
+
+
+def eliminar_indice_trigramas(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = {"sqlite": SQLITE_ELIMINAR, "postgresql": PG_ELIMINAR}.get(vendor, [])
+    for sentencia in sentencias:
+        schema_editor.execute(sentencia)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("soporte", "0025_ticket_listado"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice_trigramas, eliminar_indice_trigramas),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_resumenes(apps, schema_editor):
+    Notification = apps.get_model('soporte', 'Notification')
+    ResumenNotificaciones = apps.get_model('soporte', 'ResumenNotificaciones')
+    conteos = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    ResumenNotificaciones.objects.bulk_create(
+        [ResumenNotificaciones(user_id=fila['user_id'], no_leidas=fila['total']) for fila in conteos],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0027_indice_comentarios_ticket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenNotificaciones',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('no_leidas', models.PositiveIntegerField(default=0, verbose_name='Notificaciones sin leer')),
+            ],
+            options={
+                'verbose_name': 'Resumen de notificaciones',
+                'verbose_name_plural': 'Resúmenes de notificaciones',
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
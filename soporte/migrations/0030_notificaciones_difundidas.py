@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:18
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('soporte', '0029_indices_notificaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CursorNotificaciones',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cursor_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('difundidas_leidas_hasta', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Cursor de notificaciones',
+                'verbose_name_plural': 'Cursores de notificaciones',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificacionDifundida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('audiencia', models.CharField(choices=[('personal', 'Personal de soporte'), ('grupo', 'Rol')], default='personal', max_length=20)),
+                ('type', models.CharField(max_length=50)),
+                ('message', models.CharField(max_length=255)),
+                ('url', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificaciones_difundidas', to=settings.AUTH_USER_MODEL)),
+                ('grupo', models.ForeignKey(blank=True, help_text='Rol destinatario cuando la audiencia es un rol.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_difundidas', to='auth.group')),
+            ],
+            options={
+                'verbose_name': 'Notificación difundida',
+                'verbose_name_plural': 'Notificaciones difundidas',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DifundidaLeida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='difundidas_leidas', to=settings.AUTH_USER_MODEL)),
+                ('notificacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lecturas', to='soporte.notificaciondifundida')),
+            ],
+            options={
+                'verbose_name': 'Notificación difundida leída',
+                'verbose_name_plural': 'Notificaciones difundidas leídas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificaciondifundida',
+            index=models.Index(fields=['audiencia', '-created_at'], name='soporte_not_audienc_523066_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificaciondifundida',
+            index=models.Index(fields=['grupo', '-created_at'], name='soporte_not_grupo_i_910f4a_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='difundidaleida',
+            unique_together={('user', 'notificacion')},
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+NOMBRE_TAREA_RETENCION = "Retención de notificaciones"
+
+
+def programar_retencion(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        name=NOMBRE_TAREA_RETENCION,
+        defaults={
+            "func": "soporte.tasks.retencion_notificaciones",
+            "schedule_type": "D",
+            "repeats": -1,
+            "next_run": timezone.now(),
+        },
+    )
+
+
+def eliminar_retencion(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(name=NOMBRE_TAREA_RETENCION).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0030_notificaciones_difundidas'),
+        ('django_q', '0013_task_attempt_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoNotificaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes en que se crearon.')),
+                ('type', models.CharField(max_length=50)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Archivo de notificaciones',
+                'verbose_name_plural': 'Archivo de notificaciones',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', True)), fields=['created_at', 'id'], name='notif_leidas_fecha'),
+        ),
+        migrations.AddField(
+            model_name='archivonotificaciones',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivo_notificaciones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='archivonotificaciones',
+            unique_together={('user', 'mes', 'type')},
+        ),
+        migrations.RunPython(programar_retencion, eliminar_retencion),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+NOMBRE_TAREA_CARGAS = "Recálculo de carga de técnicos"
+
+
+def programar_recalculo(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.get_or_create(
+        name=NOMBRE_TAREA_CARGAS,
+        defaults={
+            "func": "soporte.tasks.recalculo_carga_tecnicos",
+            "schedule_type": "D",
+            "repeats": -1,
+            "next_run": timezone.now(),
+        },
+    )
+
+
+def eliminar_recalculo(apps, schema_editor):
+    Schedule = apps.get_model("django_q", "Schedule")
+    Schedule.objects.filter(name=NOMBRE_TAREA_CARGAS).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soporte', '0031_retencion_notificaciones'),
+        ('django_q', '0013_task_attempt_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(programar_recalculo, eliminar_recalculo),
+    ]
@@ -1,16 +1,21 @@
 """Modelos de la aplicación de soporte."""
 import os
-from datetime import timedelta
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.db import models
-from django.db.models.signals import post_save
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .validators import ALLOWED_IMAGE_EXTENSIONS, image_file_validator
+from .calendario import invalidar_calendario_laboral, sumar_minutos_laborales
+from .avisos import avisar_cambio_notificaciones
+from .catalogos import invalidar_catalogos_al_confirmar
+from .conteos import invalidar_conteos_tickets
+from .validators import ALLOWED_IMAGE_EXTENSIONS, image_file_validator, time_zone_validator
 
 User = get_user_model()
 
@@ -43,6 +48,16 @@ class PerfilUsuario(models.Model):
     def __str__(self):
         return f"Perfil de {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valor leído, para propagar a los tickets solo cuando la marca cambia.
+        instance._es_critico_cargado = dict(zip(field_names, values)).get("es_critico")
+        return instance
+
+    def criticidad_cambiada(self):
+        return self.es_critico != getattr(self, "_es_critico_cargado", None)
+
 
 class Prioridad(models.Model):
     """Nivel de prioridad disponible para los tickets."""
@@ -104,6 +119,143 @@ class Area(models.Model):
         return self.nombre
 
 
+class CalendarioLaboral(models.Model):
+    """Calendario de atención usado para medir los plazos de SLA."""
+
+    nombre = models.CharField(max_length=100, unique=True, verbose_name="Nombre")
+    zona_horaria = models.CharField(
+        max_length=64,
+        default="America/Santiago",
+        validators=[time_zone_validator],
+        verbose_name="Zona horaria",
+        help_text="Zona horaria IANA en la que se interpretan los horarios y feriados.",
+    )
+    activo = models.BooleanField(
+        default=False,
+        verbose_name="Activo",
+        help_text="Solo el calendario activo se usa para calcular los SLA. Sin calendario activo se usan minutos corridos.",
+    )
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Calendario laboral"
+        verbose_name_plural = "Calendarios laborales"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["activo"],
+                condition=models.Q(activo=True),
+                name="calendario_laboral_unico_activo",
+            ),
+        ]
+
+    def __str__(self):
+        return self.nombre
+
+
+class HorarioLaboral(models.Model):
+    """Tramo de atención de un día de la semana."""
+
+    DIA_SEMANA_CHOICES = [
+        (0, "Lunes"),
+        (1, "Martes"),
+        (2, "Miércoles"),
+        (3, "Jueves"),
+        (4, "Viernes"),
+        (5, "Sábado"),
+        (6, "Domingo"),
+    ]
+
+    calendario = models.ForeignKey(
+        CalendarioLaboral,
+        on_delete=models.CASCADE,
+        related_name="horarios",
+        verbose_name="Calendario",
+    )
+    dia_semana = models.PositiveSmallIntegerField(choices=DIA_SEMANA_CHOICES, verbose_name="Día")
+    hora_inicio = models.TimeField(verbose_name="Hora de inicio")
+    hora_fin = models.TimeField(verbose_name="Hora de término")
+
+    class Meta:
+        ordering = ["dia_semana", "hora_inicio"]
+        verbose_name = "Horario laboral"
+        verbose_name_plural = "Horarios laborales"
+
+    def __str__(self):
+        return f"{self.get_dia_semana_display()} {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M}"
+
+    def clean(self):
+        if self.hora_inicio and self.hora_fin and self.hora_fin <= self.hora_inicio:
+            raise ValidationError({"hora_fin": "La hora de término debe ser posterior a la de inicio."})
+
+
+class Feriado(models.Model):
+    """Día completo sin atención dentro de un calendario."""
+
+    calendario = models.ForeignKey(
+        CalendarioLaboral,
+        on_delete=models.CASCADE,
+        related_name="feriados",
+        verbose_name="Calendario",
+    )
+    fecha = models.DateField(verbose_name="Fecha")
+    descripcion = models.CharField(max_length=100, blank=True, default="", verbose_name="Descripción")
+
+    class Meta:
+        ordering = ["fecha"]
+        unique_together = ("calendario", "fecha")
+        verbose_name = "Feriado"
+        verbose_name_plural = "Feriados"
+
+    def __str__(self):
+        return f"{self.fecha:%d/%m/%Y} {self.descripcion}".strip()
+
+
+class CargaTecnico(models.Model):
+    """Carga de trabajo de un técnico usada por la asignación automática."""
+
+    tecnico = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="carga",
+        verbose_name="Técnico",
+    )
+    tickets_abiertos = models.PositiveIntegerField(default=0, verbose_name="Tickets abiertos")
+    carga = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Carga ponderada",
+        help_text="Suma de los pesos de sus tickets abiertos (orden de la prioridad si la ponderación está activa).",
+    )
+    ultima_asignacion = models.DateTimeField(null=True, blank=True, verbose_name="Última asignación")
+    disponible = models.BooleanField(
+        default=True,
+        verbose_name="Disponible",
+        help_text="Desmarca para excluir al técnico de la asignación automática.",
+    )
+    atiende_todas_las_areas = models.BooleanField(default=True, verbose_name="Atiende todas las áreas")
+    areas = models.ManyToManyField(
+        Area,
+        blank=True,
+        related_name="tecnicos",
+        verbose_name="Áreas atendidas",
+        help_text="Solo se consideran si el técnico no atiende todas las áreas.",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["disponible", "carga", "ultima_asignacion"]),
+        ]
+        verbose_name = "Carga de técnico"
+        verbose_name_plural = "Cargas de técnicos"
+
+    def __str__(self):
+        return f"{self.tecnico.username}: {self.tickets_abiertos} abiertos (carga {self.carga})"
+
+
+class TicketVersionConflict(Exception):
+    """El ticket fue modificado por otra persona desde que se cargó."""
+
+
 class Ticket(models.Model):
     """Ticket de soporte con información de SLA."""
 
@@ -125,6 +277,7 @@ class Ticket(models.Model):
         ('resuelto', 'Resuelto'),
         ('cerrado', 'Cerrado'),
     ]
+    ESTADOS_ABIERTOS = ['abierto', 'progreso']
 
     SLA_ESTADO_PENDIENTE = 'pendiente'
     SLA_ESTADO_VENCIDO = 'vencido'
@@ -145,7 +298,10 @@ class Ticket(models.Model):
         default=False,
         db_index=True,
         verbose_name="Solicitante crítico",
-        help_text="Indica si el solicitante es marcado como crítico al momento de registrar el ticket.",
+        help_text=(
+            "Copia de la marca del perfil del solicitante. Se fija al registrar el ticket "
+            "y se actualiza en los tickets abiertos cuando cambia el perfil."
+        ),
     )
     tecnico_asignado = models.ForeignKey(
         User,
@@ -195,10 +351,145 @@ class Ticket(models.Model):
         default=SLA_ESTADO_SIN_REGLA,
         verbose_name="Estado del SLA",
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Versión",
+        help_text="Se incrementa en cada modificación para detectar ediciones concurrentes.",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado_sla', 'fecha_compromiso_respuesta']),
+            # Listado del solicitante (home sin permisos de staff), con o sin filtro de estado.
+            models.Index(fields=['solicitante', 'estado', 'fecha_creacion']),
+            # Cola del técnico, recálculo de cargas y rendimiento por técnico en reportes.
+            models.Index(fields=['tecnico_asignado', 'estado']),
+            # Filtro por estado del listado y conteos por estado del dashboard.
+            models.Index(fields=['estado', 'fecha_creacion']),
+            # Tickets cerrados por día y tiempos de resolución en reportes.
+            models.Index(fields=['estado', 'fecha_cierre']),
+            # Tickets recientes, mapa de calor por hora y orden por fecha.
+            models.Index(fields=['fecha_creacion']),
+            models.Index(fields=['categoria']),
+        ]
+
+    # Campos que ``save`` recalcula y que deben persistirse aunque el llamador
+    # indique ``update_fields`` parciales.
+    CAMPOS_DERIVADOS = (
+        'fecha_cierre',
+        'tiempo_resolucion',
+        'fecha_compromiso_respuesta',
+        'estado_sla',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores tal como se leyeron, para escribir solo lo que cambió.
+        instance._valores_cargados = dict(zip(field_names, values))
+        return instance
 
     def save(self, *args, **kwargs):
-        if self.solicitante_id:
-            self.solicitante_critico = self._obtener_estado_critico_solicitante()
+        regla, minutos_objetivo = self._preparar_guardado()
+        if not self._state.adding:
+            self.version += 1
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CAMPOS_DERIVADOS) | {'version'}
+
+        carga_anterior = self.huella_carga_guardada()
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            self._guardar_sla_calculo(regla, minutos_objetivo)
+            self._ajustar_carga(carga_anterior)
+        self._valores_cargados = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
+
+    def campos_modificados(self):
+        """Nombres de atributo cuyo valor difiere del leído desde la base de datos."""
+        cargados = getattr(self, '_valores_cargados', None)
+        if cargados is None:
+            return None
+        return {
+            attname for attname, valor in cargados.items()
+            if getattr(self, attname) != valor
+        }
+
+    def guardar_cambios(self, version_esperada=None):
+        """
+        Persiste solo los campos modificados si la versión no cambió en la base.
+
+        Es un compare-and-swap: el UPDATE filtra por ``version`` y la
+        incrementa. Si otra persona guardó antes, no se actualiza ninguna fila
+        y se lanza ``TicketVersionConflict``. Devuelve los campos escritos.
+        """
+        cargados = getattr(self, '_valores_cargados', {})
+        if version_esperada is None:
+            version_esperada = cargados.get('version', self.version)
+        regla, minutos_objetivo = self._preparar_guardado()
+        campos = self.campos_modificados()
+        if campos is None:
+            campos = {field.attname for field in self._meta.concrete_fields if not field.primary_key}
+        campos -= {'version', 'fecha_actualizacion'}
+        if not campos:
+            return set()
+
+        ahora = timezone.now()
+        valores = {attname: getattr(self, attname) for attname in campos}
+        carga_anterior = self.huella_carga_guardada()
+        with transaction.atomic():
+            actualizados = Ticket.objects.filter(pk=self.pk, version=version_esperada).update(
+                version=models.F('version') + 1,
+                fecha_actualizacion=ahora,
+                **valores,
+            )
+            if not actualizados:
+                raise TicketVersionConflict(
+                    f"El ticket #{self.pk} fue modificado por otra persona."
+                )
+            self._guardar_sla_calculo(regla, minutos_objetivo)
+            self._ajustar_carga(carga_anterior)
+            transaction.on_commit(invalidar_conteos_tickets)
+
+        self.version = version_esperada + 1
+        self.fecha_actualizacion = ahora
+        cargados.update(valores, version=self.version, fecha_actualizacion=ahora)
+        self._valores_cargados = cargados
+        return campos
+
+    def huella_carga_guardada(self):
+        """
+        Huella de carga que los contadores de ``CargaTecnico`` ya incluyen.
+
+        Es la de los valores leídos de la base (``None`` para un ticket nuevo),
+        salvo que ``asignar_tecnico`` ya haya contado la asignación. Devuelve
+        ``False`` si no se conoce (una instancia que no salió de la base).
+        """
+        from .asignacion import huella_carga
+
+        if hasattr(self, '_huella_carga'):
+            return self._huella_carga
+        if self._state.adding:
+            return None
+        cargados = getattr(self, '_valores_cargados', None)
+        if cargados is None:
+            return False
+        return huella_carga(self, cargados)
+
+    def _ajustar_carga(self, anterior):
+        from .asignacion import actualizar_carga, huella_carga
+
+        if anterior is False:
+            return
+        actual = huella_carga(self)
+        actualizar_carga(anterior, actual)
+        self._huella_carga = actual
+
+    def _preparar_guardado(self):
+        """Calcula los campos derivados y devuelve ``(regla, minutos_objetivo)`` del SLA."""
         if self.estado in ['resuelto', 'cerrado'] and not self.fecha_cierre:
             self.fecha_cierre = timezone.now()
             if self.fecha_creacion:
@@ -207,29 +498,12 @@ class Ticket(models.Model):
             self.fecha_cierre = None
             self.tiempo_resolucion = None
 
-        super().save(*args, **kwargs)
-
+        # El SLA se resuelve antes de escribir la fila para que cada guardado
+        # sea un único INSERT/UPDATE seguido de un único upsert de SLACalculo.
         regla, minutos_objetivo, fecha_compromiso, estado_sla = self._calcular_datos_sla()
-        needs_update = False
-        if self.fecha_compromiso_respuesta != fecha_compromiso:
-            self.fecha_compromiso_respuesta = fecha_compromiso
-            needs_update = True
-        if self.estado_sla != estado_sla:
-            self.estado_sla = estado_sla
-            needs_update = True
-
-        if needs_update:
-            super().save(update_fields=['fecha_compromiso_respuesta', 'estado_sla'])
-
-        SLACalculo.objects.update_or_create(
-            ticket=self,
-            defaults={
-                'regla': regla,
-                'minutos_objetivo': minutos_objetivo,
-                'fecha_compromiso': fecha_compromiso,
-                'estado': estado_sla,
-            },
-        )
+        self.fecha_compromiso_respuesta = fecha_compromiso
+        self.estado_sla = estado_sla
+        return regla, minutos_objetivo
 
     def __str__(self):
         return f"[{self.prioridad}] {self.titulo}"
@@ -245,17 +519,30 @@ class Ticket(models.Model):
 
         if not minutos_objetivo:
             return None, None, None, self.SLA_ESTADO_SIN_REGLA
+        # En tickets nuevos ``fecha_creacion`` aún no existe: se usa el instante
+        # actual, que coincide con el que asignará ``auto_now_add`` al insertar.
         base_datetime = self.fecha_creacion or timezone.now()
-        fecha_compromiso = base_datetime + timedelta(minutes=minutos_objetivo)
+        fecha_compromiso = sumar_minutos_laborales(base_datetime, minutos_objetivo)
         estado_sla = self._determinar_estado_sla(fecha_compromiso)
         return regla, minutos_objetivo, fecha_compromiso, estado_sla
 
-    def _obtener_estado_critico_solicitante(self):
-        try:
-            return self.solicitante.perfil.es_critico
-        except (AttributeError, PerfilUsuario.DoesNotExist):
-            perfil, _ = PerfilUsuario.objects.get_or_create(user=self.solicitante)
-            return perfil.es_critico
+    def _guardar_sla_calculo(self, regla, minutos_objetivo):
+        """Sincroniza ``SLACalculo`` con una sola sentencia INSERT ... ON CONFLICT."""
+        SLACalculo.objects.bulk_create(
+            [
+                SLACalculo(
+                    ticket=self,
+                    regla=regla,
+                    minutos_objetivo=minutos_objetivo,
+                    fecha_compromiso=self.fecha_compromiso_respuesta,
+                    estado=self.estado_sla,
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=['ticket'],
+            update_fields=['regla', 'minutos_objetivo', 'fecha_compromiso', 'estado', 'fecha_actualizacion'],
+        )
+        self._state.fields_cache.pop('sla_calculo', None)
 
     def _obtener_regla_sla(self):
         if not self.prioridad or not self.tipo_ticket:
@@ -339,6 +626,11 @@ class Comment(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['ticket', 'created_at']),
+        ]
+
     def __str__(self):
         return f"Comentario de {self.author.username} en {self.ticket.titulo}"
 
@@ -410,6 +702,196 @@ class TicketHistory(models.Model):
         verbose_name_plural = "Historial de tickets"
 
 
+class PosprocesoTicket(models.Model):
+    """Trabajo diferido tras crear un ticket (avisos y correo) y sus tiempos por etapa."""
+
+    class Estado(models.TextChoices):
+        PENDIENTE = "pendiente", _("Pendiente")
+        COMPLETADO = "completado", _("Completado")
+        FALLIDO = "fallido", _("Fallido")
+
+    ticket = models.OneToOneField(Ticket, on_delete=models.CASCADE, related_name='posproceso')
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    estado = models.CharField(max_length=20, choices=Estado.choices, default=Estado.PENDIENTE)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    tiempos = models.JSONField(
+        blank=True,
+        default=dict,
+        help_text="Milisegundos por etapa completada; las etapas presentes no se repiten al reintentar.",
+    )
+    ultimo_error = models.TextField(blank=True, default="")
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
+        verbose_name = "Posproceso de ticket"
+        verbose_name_plural = "Posprocesos de tickets"
+
+    def __str__(self):
+        return f"Ticket #{self.ticket_id}: {self.get_estado_display()}"
+
+
+class TicketListado(models.Model):
+    """
+    Fila plana de un ticket para listados y exportaciones.
+
+    Guarda ya resueltos los nombres de prioridad, área y usuarios junto con los
+    contadores de comentarios y adjuntos, de modo que los listados leen una
+    sola tabla. Se mantiene en la misma transacción que las escrituras del
+    ticket (ver ``soporte.listado``) y se reconstruye con
+    ``reconstruir_listado_tickets``.
+    """
+
+    ticket = models.OneToOneField(
+        Ticket,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='listado',
+    )
+    titulo = models.CharField(max_length=200)
+    solicitante = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    solicitante_nombre = models.CharField(max_length=150)
+    solicitante_critico = models.BooleanField(default=False)
+    tecnico = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    tecnico_nombre = models.CharField(max_length=150, blank=True, default="")
+    prioridad = models.ForeignKey(Prioridad, on_delete=models.CASCADE, related_name='+')
+    prioridad_clave = models.SlugField(max_length=50)
+    prioridad_nombre = models.CharField(max_length=100)
+    prioridad_orden = models.PositiveIntegerField(default=0)
+    area = models.ForeignKey(Area, on_delete=models.CASCADE, related_name='+')
+    area_nombre = models.CharField(max_length=100)
+    estado = models.CharField(max_length=20, choices=Ticket.ESTADO_CHOICES)
+    categoria = models.CharField(max_length=50, choices=Ticket.CATEGORIA_CHOICES)
+    tipo_ticket = models.CharField(max_length=20, choices=Ticket.TIPO_CHOICES)
+    estado_sla = models.CharField(max_length=20, choices=Ticket.SLA_ESTADO_CHOICES)
+    fecha_compromiso_respuesta = models.DateTimeField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField()
+    fecha_cierre = models.DateTimeField(null=True, blank=True)
+    tiempo_resolucion = models.DurationField(null=True, blank=True)
+    total_comentarios = models.PositiveIntegerField(default=0)
+    total_adjuntos = models.PositiveIntegerField(default=0)
+    ultima_actividad = models.DateTimeField(
+        help_text="Lo más reciente entre la última modificación, comentario o adjunto.",
+    )
+
+    class Meta:
+        indexes = [
+            # Listado del solicitante y listado completo con o sin filtro de estado.
+            models.Index(fields=['solicitante', 'estado', 'fecha_creacion']),
+            models.Index(fields=['estado', 'fecha_creacion']),
+            # Orden por defecto del listado: críticos primero, luego prioridad y fecha.
+            models.Index(fields=['solicitante_critico', 'prioridad_orden', 'fecha_creacion']),
+            models.Index(fields=['tecnico_nombre', 'estado']),
+            models.Index(fields=['fecha_creacion']),
+        ]
+        verbose_name = "Ticket (listado)"
+        verbose_name_plural = "Tickets (listado)"
+
+    def __str__(self):
+        return f"#{self.ticket_id} {self.titulo}"
+
+    @property
+    def id(self):
+        return self.ticket_id
+
+
+@receiver(post_save, sender=Ticket)
+@receiver(post_delete, sender=Ticket)
+def invalidar_conteos(sender, **kwargs):
+    transaction.on_commit(invalidar_conteos_tickets)
+
+
+@receiver(post_delete, sender=Ticket)
+def descontar_carga_ticket(sender, instance, **kwargs):
+    from .asignacion import actualizar_carga
+
+    anterior = instance.huella_carga_guardada()
+    if anterior:
+        actualizar_carga(anterior, None)
+
+
+@receiver(post_save, sender=Ticket)
+def sincronizar_listado_ticket(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .listado import sincronizar_listado
+
+    sincronizar_listado([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Adjunto)
+@receiver(post_delete, sender=Adjunto)
+def sincronizar_listado_hijos(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .listado import sincronizar_listado
+
+    sincronizar_listado([instance.ticket_id])
+
+
+@receiver(post_save, sender=Prioridad)
+def renombrar_prioridad_listado(sender, instance, created, **kwargs):
+    if not created:
+        TicketListado.objects.filter(prioridad=instance).update(
+            prioridad_clave=instance.clave,
+            prioridad_nombre=instance.nombre,
+            prioridad_orden=instance.orden,
+        )
+
+
+@receiver(post_save, sender=Area)
+def renombrar_area_listado(sender, instance, created, **kwargs):
+    if not created:
+        TicketListado.objects.filter(area=instance).update(area_nombre=instance.nombre)
+
+
+@receiver(post_save, sender=User)
+def renombrar_usuario_listado(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    from .listado import renombrar_usuario
+
+    renombrar_usuario(instance)
+
+
+@receiver(post_delete, sender=User)
+def quitar_tecnico_listado(sender, instance, **kwargs):
+    # ``tecnico`` ya quedó en NULL por SET_NULL; falta el nombre copiado.
+    TicketListado.objects.filter(tecnico__isnull=True, tecnico_nombre=instance.username).update(tecnico_nombre="")
+
+
+@receiver(post_save, sender=Prioridad)
+@receiver(post_delete, sender=Prioridad)
+@receiver(post_save, sender=Area)
+@receiver(post_delete, sender=Area)
+@receiver(post_delete, sender=User)
+def invalidar_catalogos_cambiados(sender, **kwargs):
+    invalidar_catalogos_al_confirmar()
+
+
+@receiver(post_save, sender=User)
+def invalidar_catalogo_staff(sender, instance, update_fields=None, **kwargs):
+    # El inicio de sesión solo guarda ``last_login``: no afecta al catálogo.
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidar_catalogos_al_confirmar()
+
+
+@receiver(post_save, sender=CalendarioLaboral)
+@receiver(post_delete, sender=CalendarioLaboral)
+@receiver(post_save, sender=HorarioLaboral)
+@receiver(post_delete, sender=HorarioLaboral)
+@receiver(post_save, sender=Feriado)
+@receiver(post_delete, sender=Feriado)
+def invalidar_indice_laboral(sender, **kwargs):
+    transaction.on_commit(invalidar_calendario_laboral)
+
+
 @receiver(post_save, sender=User)
 def crear_perfil_usuario(sender, instance, created, **kwargs):
     if created:
@@ -418,6 +900,26 @@ def crear_perfil_usuario(sender, instance, created, **kwargs):
         PerfilUsuario.objects.get_or_create(user=instance)
 
 
+@receiver(post_save, sender=PerfilUsuario)
+def propagar_criticidad_perfil(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'es_critico' not in update_fields:
+        return
+    if created and not instance.es_critico:
+        instance._es_critico_cargado = False
+        return
+    if instance.criticidad_cambiada():
+        from .tasks import encolar_propagacion_criticidad
+
+        instance._es_critico_cargado = instance.es_critico
+        encolar_propagacion_criticidad(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def crear_carga_tecnico(sender, instance, created, **kwargs):
+    if instance.is_staff:
+        CargaTecnico.objects.get_or_create(tecnico=instance)
+
+
 class RoleInfo(models.Model):
     group = models.OneToOneField(
         Group,
@@ -460,6 +962,191 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Listado completo del usuario, ya ordenado.
+            models.Index(fields=['user', '-created_at'], name='notif_usuario_fecha'),
+            # Solo las no leídas (badge, stream, marcar todas): pequeño aunque el
+            # usuario acumule miles de leídas. En motores sin índices parciales
+            # Django lo omite y las consultas usan el anterior.
+            models.Index(
+                fields=['user', '-created_at'],
+                condition=models.Q(is_read=False),
+                name='notif_no_leidas_fecha',
+            ),
+            # Recorrido de la retención: leídas más antiguas primero.
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_read=True),
+                name='notif_leidas_fecha',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.message} -> {self.user.username}"
+
+
+class ResumenNotificaciones(models.Model):
+    """Contador de notificaciones sin leer de un usuario, mantenido con expresiones F."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen_notificaciones',
+        verbose_name='Usuario',
+    )
+    no_leidas = models.PositiveIntegerField(default=0, verbose_name='Notificaciones sin leer')
+
+    class Meta:
+        verbose_name = 'Resumen de notificaciones'
+        verbose_name_plural = 'Resúmenes de notificaciones'
+
+    def __str__(self):
+        return f"{self.user.username}: {self.no_leidas} sin leer"
+
+
+class ArchivoNotificaciones(models.Model):
+    """Notificaciones leídas ya eliminadas por la retención, resumidas por usuario, mes y tipo."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archivo_notificaciones')
+    mes = models.DateField(help_text='Primer día del mes en que se crearon.')
+    type = models.CharField(max_length=50)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'mes', 'type')
+        verbose_name = 'Archivo de notificaciones'
+        verbose_name_plural = 'Archivo de notificaciones'
+
+    def __str__(self):
+        return f"{self.user.username} {self.mes:%Y-%m} {self.type}: {self.cantidad}"
+
+
+class NotificacionDifundida(models.Model):
+    """
+    Notificación dirigida a una audiencia completa con una sola fila.
+
+    Cada usuario de la audiencia la ve en sus notificaciones; lo que leyó se
+    registra con su ``CursorNotificaciones`` y, por encima del cursor, con
+    filas ``DifundidaLeida`` sueltas.
+    """
+
+    class Audiencia(models.TextChoices):
+        PERSONAL = "personal", _("Personal de soporte")
+        GRUPO = "grupo", _("Rol")
+
+    audiencia = models.CharField(max_length=20, choices=Audiencia.choices, default=Audiencia.PERSONAL)
+    grupo = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='notificaciones_difundidas',
+        help_text='Rol destinatario cuando la audiencia es un rol.',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notificaciones_difundidas',
+    )
+    type = models.CharField(max_length=50)
+    message = models.CharField(max_length=255)
+    url = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['audiencia', '-created_at']),
+            models.Index(fields=['grupo', '-created_at']),
+        ]
+        verbose_name = 'Notificación difundida'
+        verbose_name_plural = 'Notificaciones difundidas'
+
+    def __str__(self):
+        return f"{self.message} -> {self.get_audiencia_display()}"
+
+
+class CursorNotificaciones(models.Model):
+    """Id más alto hasta el cual el usuario leyó todas las notificaciones difundidas de su audiencia."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='cursor_notificaciones',
+        verbose_name='Usuario',
+    )
+    difundidas_leidas_hasta = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Cursor de notificaciones'
+        verbose_name_plural = 'Cursores de notificaciones'
+
+
+class DifundidaLeida(models.Model):
+    """Notificación difundida leída por encima del cursor del usuario."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='difundidas_leidas')
+    notificacion = models.ForeignKey(NotificacionDifundida, on_delete=models.CASCADE, related_name='lecturas')
+
+    class Meta:
+        unique_together = ('user', 'notificacion')
+        verbose_name = 'Notificación difundida leída'
+        verbose_name_plural = 'Notificaciones difundidas leídas'
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def avisar_notificacion_cambiada(sender, instance, **kwargs):
+    avisar_cambio_notificaciones([instance.user_id])
+
+
+@receiver(post_delete, sender=Notification)
+def descontar_notificacion_borrada(sender, instance, **kwargs):
+    if not instance.is_read:
+        ResumenNotificaciones.objects.filter(user_id=instance.user_id).update(
+            no_leidas=Greatest(models.F('no_leidas') - 1, models.Value(0))
+        )
+
+
+@receiver(post_save, sender=User)
+def crear_cursor_notificaciones(sender, instance, created, raw=False, **kwargs):
+    # Los usuarios nuevos no heredan como pendientes las difusiones anteriores.
+    if created and not raw:
+        ultima = NotificacionDifundida.objects.aggregate(ultima=models.Max('id'))['ultima']
+        CursorNotificaciones.objects.get_or_create(
+            user=instance, defaults={'difundidas_leidas_hasta': ultima or 0}
+        )
+
+
+@receiver(pre_save, sender=User)
+def recordar_personal_anterior(sender, instance, raw=False, update_fields=None, **kwargs):
+    # El inicio de sesión solo guarda ``last_login``: no hace falta leer nada.
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not {'is_staff', 'is_superuser'} & set(update_fields):
+        return
+    anterior = User.objects.filter(pk=instance.pk).values_list('is_staff', 'is_superuser').first()
+    instance._era_personal = any(anterior) if anterior else None
+
+
+@receiver(post_save, sender=User)
+def sincronizar_cursor_personal(sender, instance, created, raw=False, **kwargs):
+    # Al entrar o salir del personal cambia la audiencia de las difundidas:
+    # quien entra arranca con el cursor al día, como una cuenta nueva, y en
+    # ambos casos el contador de no leídas se recalcula.
+    era_personal = instance.__dict__.pop('_era_personal', None)
+    if created or raw or era_personal is None:
+        return
+    es_personal = instance.is_staff or instance.is_superuser
+    if es_personal == era_personal:
+        return
+    from .utils.notifications import recount_unread, reset_broadcast_cursor
+
+    if es_personal:
+        reset_broadcast_cursor(instance)
+    else:
+        recount_unread(instance)
@@ -0,0 +1,166 @@
+"""Paginación por cursor (keyset) para listados grandes.
+
+En lugar de ``OFFSET`` cada página se pide con los valores de orden de la
+última fila vista: ``WHERE (k1, k2, ..., id) > (v1, v2, ..., vid)``. El costo
+de traer una página no depende de su profundidad. El orden debe terminar en
+una columna única (el id) para que los cursores sean estables.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+
+LIMITE_CONTEO = 1000
+
+
+def _a_json(valor):
+    if isinstance(valor, (datetime, date, time)):
+        # Precisión completa: el cursor debe coincidir exactamente con la fila.
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(valores):
+    datos = json.dumps([_a_json(valor) for valor in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor, campos):
+    """Valores del cursor convertidos con ``campos``; ``None`` si no es válido."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != len(campos):
+            return None
+        return [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+
+class PaginaKeyset:
+    """Página de resultados con los cursores para moverse a las vecinas."""
+
+    def __init__(self, object_list, cursor_siguiente, cursor_anterior):
+        self.object_list = object_list
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class PaginadorConConteo(Paginator):
+    """``Paginator`` que recibe el total ya calculado (por ejemplo, desde la caché)."""
+
+    def __init__(self, object_list, per_page, conteo, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._conteo = conteo
+
+    @cached_property
+    def count(self):
+        return self._conteo
+
+
+def _condicion_posterior(nombres, descendentes, valores):
+    """``Q`` de las filas que van después de ``valores`` en el orden dado."""
+    condicion = Q()
+    for i, (nombre, descendente) in enumerate(zip(nombres, descendentes)):
+        paso = Q(**{f"{nombre}__{'lt' if descendente else 'gt'}": valores[i]})
+        for anterior, valor in zip(nombres[:i], valores[:i]):
+            paso &= Q(**{anterior: valor})
+        condicion |= paso
+    return condicion
+
+
+def paginar_keyset(queryset, orden, tamano, despues=None, antes=None):
+    """
+    Devuelve una ``PaginaKeyset`` de ``queryset``.
+
+    ``orden`` es una lista de ``(expresion, descendente)``; las expresiones no
+    deben producir NULL (usa ``Coalesce``) y la última debe ser única. Con
+    ``despues`` se trae la página que sigue a ese cursor; con ``antes``, la que
+    lo precede. Un cursor inválido se trata como la primera página. Acepta
+    también querysets de ``values()``; cada fila trae entonces las claves
+    ``_clave_N`` del orden.
+    """
+    nombres = [f"_clave_{i}" for i in range(len(orden))]
+    queryset = queryset.annotate(
+        **{nombre: expresion if hasattr(expresion, "resolve_expression") else F(expresion)
+           for nombre, (expresion, _) in zip(nombres, orden)}
+    )
+    descendentes = [descendente for _, descendente in orden]
+    campos = [queryset.query.annotations[nombre].output_field for nombre in nombres]
+
+    retroceder = False
+    cursor = None
+    if antes:
+        cursor = decodificar_cursor(antes, campos)
+        retroceder = cursor is not None
+    if cursor is None and despues:
+        cursor = decodificar_cursor(despues, campos)
+
+    # Hacia atrás se recorre el orden invertido y luego se da vuelta la página.
+    sentido = [descendente != retroceder for descendente in descendentes]
+    if cursor is not None:
+        queryset = queryset.filter(_condicion_posterior(nombres, sentido, cursor))
+    queryset = queryset.order_by(
+        *[F(nombre).desc() if descendente else F(nombre).asc() for nombre, descendente in zip(nombres, sentido)]
+    )
+    filas = list(queryset[: tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if retroceder:
+        filas.reverse()
+
+    def cursor_de(fila):
+        if isinstance(fila, dict):
+            return codificar_cursor([fila[nombre] for nombre in nombres])
+        return codificar_cursor([getattr(fila, nombre) for nombre in nombres])
+
+    if retroceder:
+        siguiente = cursor_de(filas[-1]) if filas else None
+        anterior = cursor_de(filas[0]) if filas and hay_mas else None
+    else:
+        siguiente = cursor_de(filas[-1]) if filas and hay_mas else None
+        anterior = cursor_de(filas[0]) if filas and cursor is not None else None
+    return PaginaKeyset(filas, siguiente, anterior)
+
+
+def contar_aproximado(queryset, limite=LIMITE_CONTEO):
+    """
+    Devuelve ``(total, exacto)`` sin recorrer más de ``limite`` filas.
+
+    Hasta el límite el conteo es exacto. Por encima, en PostgreSQL se usa la
+    estimación del planificador y en otros motores se devuelve el límite.
+    """
+    total = queryset.order_by()[: limite + 1].count()
+    if total <= limite:
+        return total, True
+    if connection.vendor == "postgresql":
+        sql, params = queryset.order_by().values("pk").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return max(int(plan[0]["Plan"]["Plan Rows"]), limite), False
+    return limite, False
@@ -0,0 +1,137 @@
+"""Trabajo diferido tras la creación de un ticket.
+
+La vista solo guarda el ticket, su adjunto y el historial de creación. Los
+avisos al personal, al solicitante y al técnico, y el correo de asignación se
+ejecutan después del commit en el clúster de django_q, etapa por etapa. Cada
+etapa completada guarda su duración en ``PosprocesoTicket.tiempos`` y no se
+repite si un intento posterior reanuda el trabajo.
+"""
+import logging
+from time import perf_counter
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.urls import reverse
+
+from .models import PosprocesoTicket
+from .utils.notifications import create_broadcast, create_notification
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = getattr(settings, "TICKETS_POSPROCESO_REINTENTOS", 5)
+CORREO_ASIGNACION = getattr(settings, "TICKETS_CORREO_ASIGNACION", False)
+
+
+def _milisegundos_desde(inicio):
+    return round((perf_counter() - inicio) * 1000, 1)
+
+
+def _avisar_personal(ticket, actor):
+    create_broadcast(
+        'ticket_created',
+        f"Se ha levantado un nuevo ticket #{ticket.id}: {ticket.titulo}",
+        reverse('detalle_ticket', args=[ticket.id]),
+        actor=actor,
+    )
+
+
+def _avisar_solicitante(ticket, actor):
+    create_notification(
+        'ticket_created',
+        ticket.solicitante,
+        f"Tu ticket #{ticket.id} fue creado correctamente.",
+        reverse('detalle_ticket', args=[ticket.id]),
+        actor=actor,
+    )
+
+
+def _avisar_tecnico(ticket, actor):
+    create_notification(
+        'ticket_assigned',
+        ticket.tecnico_asignado,
+        f"Se te asignó el ticket #{ticket.id}: {ticket.titulo}",
+        reverse('detalle_ticket', args=[ticket.id]),
+        actor=actor,
+    )
+
+
+def _enviar_correo_tecnico(ticket, actor):
+    tecnico = ticket.tecnico_asignado
+    if not CORREO_ASIGNACION or tecnico is None or not tecnico.email:
+        return
+    send_mail(
+        f"Ticket #{ticket.id} asignado",
+        f"Se te asignó el ticket #{ticket.id}: {ticket.titulo}\n\n{ticket.descripcion}",
+        settings.EMAIL_HOST_USER,
+        [tecnico.email],
+        fail_silently=False,
+    )
+
+
+ETAPAS = (
+    ("aviso_personal", _avisar_personal),
+    ("aviso_solicitante", _avisar_solicitante),
+    ("aviso_tecnico", _avisar_tecnico),
+    ("correo_tecnico", _enviar_correo_tecnico),
+)
+
+
+def registrar_posproceso(ticket, actor, duracion_nucleo_ms=None):
+    """Crea el registro del trabajo diferido; llamar dentro de la transacción del ticket."""
+    tiempos = {"nucleo": duracion_nucleo_ms} if duracion_nucleo_ms is not None else {}
+    return PosprocesoTicket.objects.create(ticket=ticket, actor=actor, tiempos=tiempos)
+
+
+def ejecutar_posproceso(posproceso_id):
+    """
+    Ejecuta las etapas pendientes del posproceso indicado.
+
+    Si una etapa falla, se registra el error y el intento; el registro queda
+    ``pendiente`` mientras queden intentos y ``fallido`` cuando se agotan, en
+    cuyo caso se propaga la excepción. Devuelve el ``PosprocesoTicket``.
+    """
+    posproceso = PosprocesoTicket.objects.select_related(
+        "ticket__solicitante", "ticket__tecnico_asignado", "actor"
+    ).get(pk=posproceso_id)
+    if posproceso.estado != PosprocesoTicket.Estado.PENDIENTE:
+        return posproceso
+
+    for nombre, etapa in ETAPAS:
+        if nombre in posproceso.tiempos:
+            continue
+        inicio = perf_counter()
+        try:
+            with transaction.atomic():
+                etapa(posproceso.ticket, posproceso.actor)
+                posproceso.tiempos[nombre] = _milisegundos_desde(inicio)
+                posproceso.save(update_fields=["tiempos", "fecha_actualizacion"])
+        except Exception as exc:
+            posproceso.tiempos.pop(nombre, None)
+            posproceso.intentos += 1
+            posproceso.ultimo_error = f"{nombre}: {exc}"
+            agotado = posproceso.intentos >= MAX_INTENTOS
+            if agotado:
+                posproceso.estado = PosprocesoTicket.Estado.FALLIDO
+            posproceso.save(update_fields=["estado", "intentos", "ultimo_error", "fecha_actualizacion"])
+            if agotado:
+                logger.exception(
+                    "Posproceso del ticket #%s fallido tras %s intentos.",
+                    posproceso.ticket_id,
+                    posproceso.intentos,
+                )
+                raise
+            logger.warning(
+                "Posproceso del ticket #%s: la etapa %s falló (intento %s): %s",
+                posproceso.ticket_id,
+                nombre,
+                posproceso.intentos,
+                exc,
+            )
+            return posproceso
+
+    posproceso.estado = PosprocesoTicket.Estado.COMPLETADO
+    posproceso.ultimo_error = ""
+    posproceso.save(update_fields=["estado", "ultimo_error", "fecha_actualizacion"])
+    logger.info("Posproceso del ticket #%s completado: %s", posproceso.ticket_id, posproceso.tiempos)
+    return posproceso
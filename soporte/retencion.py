@@ -0,0 +1,84 @@
+"""Retención de notificaciones leídas.
+
+Las notificaciones leídas más antiguas que ``NOTIFICACIONES_RETENCION_DIAS``
+se eliminan por lotes, recorriendo el índice parcial de leídas por fecha.
+Con ``NOTIFICACIONES_ARCHIVAR`` activo, antes de borrar cada lote se suma a
+``ArchivoNotificaciones`` cuántas había por usuario, mes y tipo. Las no
+leídas nunca se tocan, así que los contadores de no leídas no cambian.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, DateField, F
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .avisos import avisar_cambio_notificaciones
+from .models import ArchivoNotificaciones, Notification
+
+logger = logging.getLogger(__name__)
+
+DIAS_RETENCION = getattr(settings, "NOTIFICACIONES_RETENCION_DIAS", 180)
+ARCHIVAR = getattr(settings, "NOTIFICACIONES_ARCHIVAR", True)
+TAMANO_LOTE_RETENCION = getattr(settings, "NOTIFICACIONES_TAMANO_LOTE", 1000)
+
+
+def _archivar(ids):
+    resumen = list(
+        Notification.objects.filter(id__in=ids)
+        .annotate(mes=TruncMonth("created_at", output_field=DateField()))
+        .values("user_id", "mes", "type")
+        .annotate(cantidad=Count("id"))
+        .order_by()
+    )
+    ArchivoNotificaciones.objects.bulk_create(
+        [ArchivoNotificaciones(user_id=fila["user_id"], mes=fila["mes"], type=fila["type"]) for fila in resumen],
+        ignore_conflicts=True,
+    )
+    for fila in resumen:
+        ArchivoNotificaciones.objects.filter(user_id=fila["user_id"], mes=fila["mes"], type=fila["type"]).update(
+            cantidad=F("cantidad") + fila["cantidad"]
+        )
+
+
+def _borrar(ids):
+    # DELETE directo: con ``QuerySet.delete`` cada fila emitiría post_delete,
+    # y las señales de Notification solo importan para las no leídas.
+    tabla = connection.ops.quote_name(Notification._meta.db_table)
+    marcadores = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({marcadores})", ids)
+
+
+def archivar_notificaciones(dias=None, tamano_lote=None, archivar=None, ahora=None):
+    """
+    Elimina por lotes las notificaciones leídas anteriores al corte de retención.
+
+    Cada lote es una transacción corta. Devuelve la cantidad de notificaciones
+    eliminadas.
+    """
+    dias = DIAS_RETENCION if dias is None else dias
+    tamano_lote = tamano_lote or TAMANO_LOTE_RETENCION
+    archivar = ARCHIVAR if archivar is None else archivar
+    corte = (ahora or timezone.now()) - timedelta(days=dias)
+    antiguas = Notification.objects.filter(is_read=True, created_at__lt=corte).order_by("created_at", "id")
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            filas = list(antiguas.values_list("id", "user_id")[:tamano_lote])
+            if not filas:
+                break
+            ids = [notificacion_id for notificacion_id, _ in filas]
+            if archivar:
+                _archivar(ids)
+            _borrar(ids)
+            avisar_cambio_notificaciones(user_id for _, user_id in filas)
+        total += len(filas)
+        if len(filas) < tamano_lote:
+            break
+
+    logger.info("Retención de notificaciones: %s notificaciones leídas eliminadas.", total)
+    return total
@@ -1,15 +1,51 @@
-from datetime import timedelta
+from contextlib import contextmanager
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
 
-from .models import TicketHistory
+from .calendario import sumar_minutos_laborales
+from .listado import sincronizar_listado
+from .models import Ticket, TicketHistory
 
 User = get_user_model()
 
 
-def log_history(ticket, actor, action, field="", old=None, new=None, metadata=None):
-    TicketHistory.objects.create(
+class HistoryBatch:
+    """Acumula entradas de TicketHistory para insertarlas con un único bulk_create."""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, entry):
+        self.entries.append(entry)
+
+    def flush(self):
+        if self.entries:
+            TicketHistory.objects.bulk_create(self.entries)
+            self.entries = []
+
+
+@contextmanager
+def history_batch(batch=None):
+    """
+    Agrupa los registros de historial de un conjunto de cambios.
+
+    Abre una transacción y al salir inserta todas las entradas juntas. Si se
+    recibe un ``batch`` existente se reutiliza sin vaciarlo, para que quien lo
+    creó controle la escritura.
+    """
+    if batch is not None:
+        yield batch
+        return
+    batch = HistoryBatch()
+    with transaction.atomic():
+        yield batch
+        batch.flush()
+
+
+def log_history(ticket, actor, action, field="", old=None, new=None, metadata=None, batch=None):
+    entry = TicketHistory(
         ticket=ticket,
         actor=actor,
         action=action,
@@ -18,6 +54,10 @@ def log_history(ticket, actor, action, field="", old=None, new=None, metadata=No
         new_value="" if new is None else str(new),
         metadata=metadata or {},
     )
+    if batch is not None:
+        batch.add(entry)
+    else:
+        entry.save()
 
 
 def recalc_sla_for_priority(ticket):
@@ -30,7 +70,7 @@ def recalc_sla_for_priority(ticket):
     minutes = prioridad.minutos_resolucion if prioridad else 0
     new_deadline = None
     if minutes:
-        new_deadline = timezone.now() + timedelta(minutes=minutes)
+        new_deadline = sumar_minutos_laborales(timezone.now(), minutes)
     ticket.fecha_compromiso_respuesta = new_deadline
     if hasattr(ticket, "_determinar_estado_sla"):
         ticket.estado_sla = ticket._determinar_estado_sla(new_deadline)
@@ -44,11 +84,27 @@ def _display_from_choices(choices, value):
     return mapping.get(value, value)
 
 
-def update_ticket(ticket, actor, changes: dict, comment: str = None):
+def update_ticket(ticket, actor, changes: dict, comment: str = None, batch=None, expected_version=None):
     """
     Cambia campos del ticket en bloque y registra 1..n entradas en TicketHistory.
     changes: diccionario con posibles claves: 'status','priority','assignee','title','description','category','area'
+    batch: HistoryBatch opcional; sin él, el historial se inserta en un solo
+    bulk_create dentro de la misma transacción que el guardado del ticket.
+    expected_version: versión que el usuario tenía a la vista. Solo se escriben
+    los campos modificados y, si el ticket cambió entretanto, se lanza
+    TicketVersionConflict sin guardar nada.
     """
+    with history_batch(batch) as batch:
+        _apply_changes(ticket, actor, changes, comment, batch)
+        if not ticket.guardar_cambios(expected_version):
+            # Sin cambios de campos (p. ej. solo un comentario): se registra la
+            # actividad sin consumir versión para no invalidar otros formularios.
+            ticket.fecha_actualizacion = timezone.now()
+            Ticket.objects.filter(pk=ticket.pk).update(fecha_actualizacion=ticket.fecha_actualizacion)
+        sincronizar_listado([ticket.pk])
+
+
+def _apply_changes(ticket, actor, changes, comment, batch):
     # STATUS
     if 'status' in changes:
         old, new = ticket.estado, changes['status']
@@ -60,6 +116,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
                 'estado',
                 _display_from_choices(ticket.ESTADO_CHOICES, old),
                 _display_from_choices(ticket.ESTADO_CHOICES, new),
+                batch=batch,
             )
             ticket.estado = new
 
@@ -80,6 +137,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
                     'deadline_old': str(deadline_old) if deadline_old else None,
                     'deadline_new': str(deadline_new) if deadline_new else None,
                 },
+                batch=batch,
             )
 
     # ASSIGNEE
@@ -93,6 +151,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
                 'tecnico_asignado',
                 getattr(old, 'username', old),
                 getattr(new, 'username', new),
+                batch=batch,
             )
             ticket.tecnico_asignado = new
 
@@ -100,7 +159,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
     if 'title' in changes:
         old, new = ticket.titulo, changes['title']
         if old != new:
-            log_history(ticket, actor, TicketHistory.Action.TITLE, 'titulo', old, new)
+            log_history(ticket, actor, TicketHistory.Action.TITLE, 'titulo', old, new, batch=batch)
             ticket.titulo = new
 
     # DESCRIPTION (log solo resumen)
@@ -109,7 +168,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
         if old != new:
             def short(s):
                 return "" if s is None else (s[:140] + ('…' if len(s) > 140 else ''))
-            log_history(ticket, actor, TicketHistory.Action.DESCRIPTION, 'descripcion', short(old), short(new))
+            log_history(ticket, actor, TicketHistory.Action.DESCRIPTION, 'descripcion', short(old), short(new), batch=batch)
             ticket.descripcion = new
 
     # CATEGORY / AREA
@@ -123,6 +182,7 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
                 'categoria',
                 _display_from_choices(ticket.CATEGORIA_CHOICES, old),
                 _display_from_choices(ticket.CATEGORIA_CHOICES, new),
+                batch=batch,
             )
             ticket.categoria = new
     if 'area' in changes:
@@ -135,17 +195,16 @@ def update_ticket(ticket, actor, changes: dict, comment: str = None):
                 'area_funcional',
                 getattr(old, 'nombre', old),
                 getattr(new, 'nombre', new),
+                batch=batch,
             )
             ticket.area_funcional = new
 
     # COMMENT
     if comment:
-        log_history(ticket, actor, TicketHistory.Action.COMMENT, 'comentario', new=comment)
-
-    ticket.save(update_fields=None)
+        log_history(ticket, actor, TicketHistory.Action.COMMENT, 'comentario', new=comment, batch=batch)
 
 
-def log_attachment(ticket, actor, file_obj, added=True):
+def log_attachment(ticket, actor, file_obj, added=True, batch=None):
     """
     Registrar adjuntos agregados/eliminados.
     file_obj: usar su nombre/size para metadata.
@@ -156,4 +215,4 @@ def log_attachment(ticket, actor, file_obj, added=True):
         'size': getattr(file_obj, 'size', None),
         'content_type': getattr(file_obj, 'content_type', None),
     }
-    log_history(ticket, actor, action, 'attachment', new=meta['filename'], metadata=meta)
+    log_history(ticket, actor, action, 'attachment', new=meta['filename'], metadata=meta, batch=batch)
@@ -0,0 +1,225 @@
+"""Operaciones masivas sobre el SLA de los tickets.
+
+Las funciones de este módulo trabajan con sentencias UPDATE por lotes para no
+materializar tickets en Python; solo se leen los identificadores de cada lote.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .calendario import obtener_indice_laboral
+from .conteos import invalidar_conteos_tickets
+from .listado import sincronizar_listado
+from .models import Prioridad, SLACalculo, SLARegla, Ticket, TicketListado
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ABIERTOS = Ticket.ESTADOS_ABIERTOS
+TAMANO_LOTE_SLA = getattr(settings, 'SLA_TAMANO_LOTE', 1000)
+
+
+def barrer_sla_vencidos(tamano_lote=None, ahora=None):
+    """
+    Marca como vencidos los tickets abiertos cuyo compromiso ya pasó.
+
+    Recorre el índice (estado_sla, fecha_compromiso_respuesta) en lotes
+    acotados y sincroniza los ``SLACalculo`` correspondientes. Devuelve la
+    cantidad de tickets que cambiaron de estado.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_SLA
+    ahora = ahora or timezone.now()
+    vencidos_qs = Ticket.objects.filter(
+        estado_sla=Ticket.SLA_ESTADO_PENDIENTE,
+        fecha_compromiso_respuesta__lt=ahora,
+        estado__in=ESTADOS_ABIERTOS,
+    ).order_by('fecha_compromiso_respuesta', 'id')
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(vencidos_qs.values_list('id', flat=True)[:tamano_lote])
+            if not ids:
+                break
+            actualizados = Ticket.objects.filter(
+                id__in=ids,
+                estado_sla=Ticket.SLA_ESTADO_PENDIENTE,
+            ).update(
+                estado_sla=Ticket.SLA_ESTADO_VENCIDO,
+                fecha_actualizacion=ahora,
+                # Los formularios abiertos antes del barrido ya no pisan el SLA.
+                version=F('version') + 1,
+            )
+            SLACalculo.objects.filter(ticket_id__in=ids).update(
+                estado=Ticket.SLA_ESTADO_VENCIDO,
+                fecha_actualizacion=ahora,
+            )
+            # El barrido no es actividad del ticket: ``ultima_actividad`` no cambia.
+            TicketListado.objects.filter(ticket_id__in=ids).update(estado_sla=Ticket.SLA_ESTADO_VENCIDO)
+        total += actualizados
+        if len(ids) < tamano_lote:
+            break
+
+    if total:
+        transaction.on_commit(invalidar_conteos_tickets)
+    logger.info("Barrido de SLA: %s tickets marcados como vencidos.", total)
+    return total
+
+
+def _objetivos_sla(prioridad_ids=None):
+    """
+    Devuelve ``{(prioridad_id, tipo_ticket): (regla_id, minutos)}``.
+
+    Replica la precedencia de ``Ticket._calcular_datos_sla``: la regla
+    específica gana sobre el tiempo por defecto de la prioridad.
+    """
+    prioridades = Prioridad.objects.all()
+    reglas = SLARegla.objects.all()
+    if prioridad_ids is not None:
+        prioridades = prioridades.filter(id__in=prioridad_ids)
+        reglas = reglas.filter(prioridad_id__in=prioridad_ids)
+
+    objetivos = {}
+    for prioridad_id, minutos in prioridades.values_list('id', 'minutos_resolucion'):
+        for tipo, _ in Ticket.TIPO_CHOICES:
+            objetivos[(prioridad_id, tipo)] = (None, minutos or None)
+    for regla_id, prioridad_id, tipo, minutos in reglas.values_list(
+        'id', 'prioridad_id', 'tipo_ticket', 'minutos_objetivo'
+    ):
+        objetivos[(prioridad_id, tipo)] = (regla_id, minutos or None)
+    return objetivos
+
+
+def _expresiones_sla(objetivos, ahora):
+    """Construye los CASE que calculan compromiso y estado dentro del UPDATE."""
+    compromisos = []
+    estados = []
+    for (prioridad_id, tipo), (_, minutos) in objetivos.items():
+        combinacion = Q(prioridad_id=prioridad_id, tipo_ticket=tipo)
+        if not minutos:
+            estados.append(When(combinacion, then=Value(Ticket.SLA_ESTADO_SIN_REGLA)))
+            continue
+        plazo = timedelta(minutes=minutos)
+        compromisos.append(When(combinacion, then=F('fecha_creacion') + plazo))
+        estados.append(
+            When(
+                combinacion & Q(fecha_creacion__lt=ahora - plazo),
+                then=Value(Ticket.SLA_ESTADO_VENCIDO),
+            )
+        )
+        estados.append(When(combinacion, then=Value(Ticket.SLA_ESTADO_PENDIENTE)))
+
+    compromiso = Case(*compromisos, default=Value(None), output_field=Ticket._meta.get_field('fecha_compromiso_respuesta'))
+    estado = Case(*estados, default=Value(Ticket.SLA_ESTADO_SIN_REGLA), output_field=Ticket._meta.get_field('estado_sla'))
+    return compromiso, estado
+
+
+def _actualizar_lote_laboral(ids, objetivos, indice, ahora):
+    """Calcula compromisos en minutos hábiles y los escribe con un solo UPDATE."""
+    filas = Ticket.objects.filter(id__in=ids).values_list(
+        'id', 'prioridad_id', 'tipo_ticket', 'fecha_creacion'
+    )
+    tickets = []
+    for ticket_id, prioridad_id, tipo, creacion in filas:
+        _, minutos = objetivos.get((prioridad_id, tipo), (None, None))
+        ticket = Ticket(id=ticket_id, fecha_actualizacion=ahora, version=F('version') + 1)
+        if minutos:
+            ticket.fecha_compromiso_respuesta = indice.sumar_minutos(creacion, minutos)
+            vencido = ahora > ticket.fecha_compromiso_respuesta
+            ticket.estado_sla = Ticket.SLA_ESTADO_VENCIDO if vencido else Ticket.SLA_ESTADO_PENDIENTE
+        else:
+            ticket.fecha_compromiso_respuesta = None
+            ticket.estado_sla = Ticket.SLA_ESTADO_SIN_REGLA
+        tickets.append(ticket)
+    Ticket.objects.bulk_update(
+        tickets, ['fecha_compromiso_respuesta', 'estado_sla', 'fecha_actualizacion', 'version']
+    )
+
+
+def _sincronizar_calculos(ids, objetivos):
+    """Upsert de ``SLACalculo`` para un lote con los valores ya persistidos."""
+    filas = Ticket.objects.filter(id__in=ids).values_list(
+        'id', 'prioridad_id', 'tipo_ticket', 'fecha_compromiso_respuesta', 'estado_sla'
+    )
+    calculos = []
+    for ticket_id, prioridad_id, tipo, compromiso, estado in filas:
+        regla_id, minutos = objetivos.get((prioridad_id, tipo), (None, None))
+        calculos.append(
+            SLACalculo(
+                ticket_id=ticket_id,
+                regla_id=regla_id,
+                minutos_objetivo=minutos,
+                fecha_compromiso=compromiso,
+                estado=estado,
+            )
+        )
+    SLACalculo.objects.bulk_create(
+        calculos,
+        update_conflicts=True,
+        unique_fields=['ticket'],
+        update_fields=['regla', 'minutos_objetivo', 'fecha_compromiso', 'estado', 'fecha_actualizacion'],
+    )
+
+
+def recalcular_sla(prioridad_ids=None, tamano_lote=None, progreso=None, ahora=None):
+    """
+    Recalcula compromiso y estado del SLA de los tickets abiertos.
+
+    ``prioridad_ids`` limita el proceso a las prioridades afectadas por un
+    cambio; sin él se recalculan todos los tickets abiertos. Cada lote se
+    resuelve con un único UPDATE con expresiones CASE y un único upsert de
+    ``SLACalculo``; con calendario laboral activo los compromisos se calculan
+    con el índice de minutos hábiles y se escriben con un único
+    ``bulk_update`` por lote. ``progreso`` recibe ``(procesados, total)`` tras cada lote.
+    Devuelve la cantidad de tickets recalculados.
+    """
+    tamano_lote = tamano_lote or TAMANO_LOTE_SLA
+    ahora = ahora or timezone.now()
+    objetivos = _objetivos_sla(prioridad_ids)
+    if not objetivos:
+        return 0
+    indice = obtener_indice_laboral()
+    if indice is None:
+        compromiso, estado = _expresiones_sla(objetivos, ahora)
+
+    abiertos_qs = Ticket.objects.filter(estado__in=ESTADOS_ABIERTOS)
+    if prioridad_ids is not None:
+        abiertos_qs = abiertos_qs.filter(prioridad_id__in=prioridad_ids)
+    total = abiertos_qs.count()
+
+    procesados = 0
+    ultimo_id = 0
+    while True:
+        ids = list(
+            abiertos_qs.filter(id__gt=ultimo_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:tamano_lote]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            if indice is None:
+                Ticket.objects.filter(id__in=ids).update(
+                    fecha_compromiso_respuesta=compromiso,
+                    estado_sla=estado,
+                    fecha_actualizacion=ahora,
+                    version=F('version') + 1,
+                )
+            else:
+                _actualizar_lote_laboral(ids, objetivos, indice, ahora)
+            _sincronizar_calculos(ids, objetivos)
+            sincronizar_listado(ids)
+        procesados += len(ids)
+        ultimo_id = ids[-1]
+        if progreso:
+            progreso(procesados, total)
+        if len(ids) < tamano_lote:
+            break
+
+    if procesados:
+        transaction.on_commit(invalidar_conteos_tickets)
+    logger.info("Recálculo de SLA: %s tickets actualizados.", procesados)
+    return procesados
@@ -0,0 +1,86 @@
+"""Tareas ejecutadas por el clúster de django_q."""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django_q.models import Schedule
+from django_q.tasks import async_task, schedule
+
+from .asignacion import recalcular_cargas
+from .criticidad import propagar_criticidad
+from .models import PosprocesoTicket
+from .posproceso import ejecutar_posproceso
+from .retencion import archivar_notificaciones
+from .sla import barrer_sla_vencidos, recalcular_sla
+
+ESPERA_REINTENTO_POSPROCESO = getattr(settings, "TICKETS_POSPROCESO_ESPERA", 60)
+
+logger = logging.getLogger(__name__)
+
+
+def barrido_sla():
+    """Tarea programada: marca como vencidos los SLA expirados."""
+    return barrer_sla_vencidos()
+
+
+def retencion_notificaciones():
+    """Tarea programada: elimina (y archiva) las notificaciones leídas antiguas."""
+    return archivar_notificaciones()
+
+
+def recalculo_carga_tecnicos():
+    """Tarea programada: corrige los contadores de carga que no pasaron por el modelo."""
+    return recalcular_cargas()
+
+
+def recalculo_sla(prioridad_ids=None):
+    """Tarea: recalcula el SLA de los tickets abiertos de las prioridades indicadas."""
+
+    def registrar_progreso(procesados, total):
+        logger.info("Recálculo de SLA: %s/%s tickets.", procesados, total)
+
+    return recalcular_sla(prioridad_ids=prioridad_ids, progreso=registrar_progreso)
+
+
+def encolar_recalculo_sla(prioridad_ids=None):
+    """Encola ``recalculo_sla`` cuando la transacción actual se confirma."""
+    prioridad_ids = sorted(set(prioridad_ids)) if prioridad_ids is not None else None
+    transaction.on_commit(
+        lambda: async_task('soporte.tasks.recalculo_sla', prioridad_ids)
+    )
+
+
+def propagacion_criticidad(usuario_id):
+    """Tarea: copia la marca de usuario crítico a sus tickets abiertos."""
+    return propagar_criticidad(usuario_id)
+
+
+def encolar_propagacion_criticidad(usuario_id):
+    """Encola ``propagacion_criticidad`` cuando la transacción actual se confirma."""
+    transaction.on_commit(
+        lambda: async_task('soporte.tasks.propagacion_criticidad', usuario_id)
+    )
+
+
+def posproceso_ticket(posproceso_id):
+    """Tarea: avisos y correo de un ticket recién creado; se reprograma si falla una etapa."""
+    posproceso = ejecutar_posproceso(posproceso_id)
+    if posproceso.estado == PosprocesoTicket.Estado.PENDIENTE:
+        # Espera creciente entre intentos para no insistir contra un servicio caído.
+        espera = ESPERA_REINTENTO_POSPROCESO * posproceso.intentos
+        schedule(
+            'soporte.tasks.posproceso_ticket',
+            posproceso_id,
+            schedule_type=Schedule.ONCE,
+            next_run=timezone.now() + timedelta(seconds=espera),
+        )
+    return posproceso.tiempos
+
+
+def encolar_posproceso_ticket(posproceso):
+    """Encola ``posproceso_ticket`` cuando la transacción actual se confirma."""
+    transaction.on_commit(
+        lambda: async_task('soporte.tasks.posproceso_ticket', posproceso.pk)
+    )
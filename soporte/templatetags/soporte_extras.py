@@ -3,6 +3,8 @@ from datetime import timedelta
 from django import template
 from django.utils import timezone
 
+from soporte.busqueda import resaltar_fragmento
+
 register = template.Library()
 
 
@@ -30,3 +32,17 @@ def countdown(value):
         parts.append(f"{hours}h")
     parts.append(f"{minutes}m")
     return sign + " ".join(parts)
+
+
+@register.filter
+def resaltar_busqueda(fragmento):
+    """Muestra el extracto de la búsqueda con las coincidencias marcadas."""
+    return resaltar_fragmento(fragmento)
+
+
+@register.filter
+def conteo_faceta(conteos, valor):
+    """Total de tickets para ``valor`` dentro de los conteos de una faceta."""
+    if not conteos:
+        return 0
+    return conteos.get(valor, 0)
@@ -1,14 +1,85 @@
+import re
+import tempfile
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache, caches
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.forms import MultiWidget
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
+from . import catalogos, posproceso, views
+from .avisos import clave_version_avisos
+from .asignacion import asignar_tecnico, recalcular_cargas
+from .busqueda import buscar_tickets, reindexar_busqueda
+from .busqueda_aproximada import buscar_aproximado
+from .calendario import invalidar_calendario_laboral, minutos_laborales_entre, sumar_minutos_laborales
+from .conteos import clave_conteo, obtener_conteo, version_tickets
+from .criticidad import propagar_criticidad, reconciliar_criticidad
+from .facetas import contar_facetas
+from .listado import reconstruir_listado
+from .paginacion import paginar_keyset
+from .retencion import archivar_notificaciones
 from .forms import CommentForm, TicketForm
-from .models import Area, Prioridad
+from .models import (
+    ArchivoNotificaciones,
+    Area,
+    CalendarioLaboral,
+    CargaTecnico,
+    Comment,
+    CursorNotificaciones,
+    DifundidaLeida,
+    Feriado,
+    HorarioLaboral,
+    NotificacionDifundida,
+    Notification,
+    PerfilUsuario,
+    PosprocesoTicket,
+    Prioridad,
+    ResumenNotificaciones,
+    SLACalculo,
+    SLARegla,
+    Ticket,
+    TicketHistory,
+    TicketListado,
+    TicketVersionConflict,
+)
+from .services import update_ticket
+from .utils.notifications import create_broadcast, create_notification, reconcile_unread_counts
+from .sla import barrer_sla_vencidos, recalcular_sla
+
+
+def _crear_usuario(username, **campos):
+    return get_user_model().objects.create_user(username=username, password="segura123!", **campos)
+
+
+def _crear_ticket(solicitante, prioridad="media", **campos):
+    """Crea un ticket en la primera área; ``campos`` completa o reemplaza los datos por defecto."""
+
+    datos = {"titulo": "Ticket", "descripcion": "Detalle"}
+    datos.update(campos)
+    return Ticket.objects.create(
+        solicitante=solicitante,
+        prioridad=Prioridad.objects.get(clave=prioridad),
+        area_funcional=Area.objects.order_by("orden").first(),
+        **datos,
+    )
 
 
 class AttachmentValidationTests(TestCase):
     def setUp(self):
-        self.user = get_user_model().objects.create_user(username="usuario", password="segura123!")
+        self.user = _crear_usuario("usuario")
         self.prioridad = Prioridad.objects.create(
             nombre="Alta",
             clave="alta",
@@ -70,3 +141,1128 @@ class AttachmentValidationTests(TestCase):
         form = CommentForm(data={"text": "Comentario con imagen"}, files={"adjunto": archivo})
 
         self.assertTrue(form.is_valid())
+
+
+class TicketSlaSaveTests(TestCase):
+    def setUp(self):
+        self.user = _crear_usuario("solicitante")
+        self.prioridad = Prioridad.objects.get(clave="alta")
+        self.area = Area.objects.order_by("orden").first()
+
+    def _escrituras(self, queries):
+        return [
+            q["sql"] for q in queries
+            if q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE"))
+        ]
+
+    def test_save_writes_ticket_once_and_upserts_sla(self):
+        ticket = Ticket(
+            titulo="Impresora",
+            descripcion="No imprime",
+            solicitante=self.user,
+            prioridad=self.prioridad,
+            area_funcional=self.area,
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            ticket.save()
+
+        escrituras = self._escrituras(ctx.captured_queries)
+        self.assertEqual(len(escrituras), 3)
+        self.assertIn("soporte_ticket", escrituras[0])
+        self.assertIn("soporte_ticketlistado", escrituras[1])
+        self.assertIn("soporte_slacalculo", escrituras[2])
+        self.assertEqual(ticket.estado_sla, Ticket.SLA_ESTADO_PENDIENTE)
+        calculo = SLACalculo.objects.get(ticket=ticket)
+        self.assertEqual(calculo.fecha_compromiso, ticket.fecha_compromiso_respuesta)
+
+    def test_partial_update_persists_derived_sla_fields(self):
+        ticket = _crear_ticket(self.user, prioridad="alta", titulo="Correo", descripcion="No llega")
+        ticket.estado = "cerrado"
+        with CaptureQueriesContext(connection) as ctx:
+            ticket.save(update_fields=["estado"])
+
+        self.assertEqual(len(self._escrituras(ctx.captured_queries)), 3)
+        ticket.refresh_from_db()
+        self.assertIsNotNone(ticket.fecha_cierre)
+        self.assertEqual(ticket.estado_sla, Ticket.SLA_ESTADO_CUMPLIDO)
+        self.assertEqual(SLACalculo.objects.get(ticket=ticket).estado, Ticket.SLA_ESTADO_CUMPLIDO)
+
+
+class BarridoSlaTests(TestCase):
+    def setUp(self):
+        self.user = _crear_usuario("solicitante")
+        self.tickets = [_crear_ticket(self.user, prioridad="alta", titulo=f"Ticket {n}") for n in range(3)]
+
+    def test_sweep_marks_overdue_open_tickets_in_batches(self):
+        vencido, vigente, cerrado = self.tickets
+        pasado = timezone.now() - timedelta(hours=1)
+        Ticket.objects.filter(pk__in=[vencido.pk, cerrado.pk]).update(fecha_compromiso_respuesta=pasado)
+        Ticket.objects.filter(pk=cerrado.pk).update(estado="cerrado")
+        extra = _crear_ticket(self.user, prioridad="alta", titulo="Otro")
+        Ticket.objects.filter(pk=extra.pk).update(fecha_compromiso_respuesta=pasado)
+        actividad = TicketListado.objects.get(pk=vencido.pk).ultima_actividad
+        formulario_abierto = Ticket.objects.get(pk=vencido.pk)
+        version_conteos = version_tickets()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(barrer_sla_vencidos(tamano_lote=1), 2)
+        self.assertNotEqual(version_tickets(), version_conteos)
+        formulario_abierto.titulo = "Cambio con la versión anterior al barrido"
+        with self.assertRaises(TicketVersionConflict):
+            formulario_abierto.guardar_cambios()
+
+        estados = dict(Ticket.objects.values_list("pk", "estado_sla"))
+        self.assertEqual(estados[vencido.pk], Ticket.SLA_ESTADO_VENCIDO)
+        self.assertEqual(estados[extra.pk], Ticket.SLA_ESTADO_VENCIDO)
+        self.assertEqual(estados[vigente.pk], Ticket.SLA_ESTADO_PENDIENTE)
+        self.assertEqual(estados[cerrado.pk], Ticket.SLA_ESTADO_PENDIENTE)
+        self.assertEqual(SLACalculo.objects.get(ticket=vencido).estado, Ticket.SLA_ESTADO_VENCIDO)
+        fila = TicketListado.objects.get(pk=vencido.pk)
+        self.assertEqual(fila.estado_sla, Ticket.SLA_ESTADO_VENCIDO)
+        self.assertEqual(fila.ultima_actividad, actividad)
+        self.assertEqual(barrer_sla_vencidos(), 0)
+
+
+class RecalculoSlaTests(TestCase):
+    def setUp(self):
+        self.user = _crear_usuario("solicitante")
+        self.prioridad = Prioridad.objects.get(clave="alta")
+
+    def test_recalculates_open_tickets_without_saving_each_one(self):
+        abiertos = [_crear_ticket(self.user, prioridad="alta") for _ in range(3)]
+        cerrado = _crear_ticket(self.user, prioridad="alta", estado="cerrado")
+        compromiso_cerrado = cerrado.fecha_compromiso_respuesta
+        SLARegla.objects.create(prioridad=self.prioridad, tipo_ticket="incidencia", minutos_objetivo=5)
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        Ticket.objects.filter(pk=abiertos[0].pk).update(fecha_creacion=hace_una_hora)
+        avances = []
+
+        total = recalcular_sla(
+            prioridad_ids=[self.prioridad.id],
+            tamano_lote=2,
+            progreso=lambda procesados, total: avances.append((procesados, total)),
+        )
+
+        self.assertEqual(total, 3)
+        self.assertEqual(avances, [(2, 3), (3, 3)])
+        primero = Ticket.objects.get(pk=abiertos[0].pk)
+        self.assertEqual(primero.fecha_compromiso_respuesta, hace_una_hora + timedelta(minutes=5))
+        self.assertEqual(primero.estado_sla, Ticket.SLA_ESTADO_VENCIDO)
+        segundo = Ticket.objects.get(pk=abiertos[1].pk)
+        self.assertEqual(segundo.estado_sla, Ticket.SLA_ESTADO_PENDIENTE)
+        self.assertEqual(SLACalculo.objects.get(ticket=segundo).minutos_objetivo, 5)
+        cerrado.refresh_from_db()
+        self.assertEqual(cerrado.fecha_compromiso_respuesta, compromiso_cerrado)
+
+
+class CalendarioLaboralTests(TestCase):
+    def setUp(self):
+        self.addCleanup(invalidar_calendario_laboral)
+        self.user = _crear_usuario("solicitante")
+        self.prioridad = Prioridad.objects.get(clave="alta")
+        self.zona = ZoneInfo("America/Santiago")
+        with self.captureOnCommitCallbacks(execute=True):
+            calendario = CalendarioLaboral.objects.create(
+                nombre="Mesa de ayuda",
+                zona_horaria="America/Santiago",
+                activo=True,
+            )
+            for dia in range(5):
+                HorarioLaboral.objects.create(calendario=calendario, dia_semana=dia, hora_inicio=time(9), hora_fin=time(13))
+                HorarioLaboral.objects.create(calendario=calendario, dia_semana=dia, hora_inicio=time(14), hora_fin=time(18))
+            Feriado.objects.create(calendario=calendario, fecha=date(2026, 10, 19), descripcion="Feriado")
+
+    def test_working_minutes_skip_nights_weekends_and_holidays(self):
+        viernes = datetime(2026, 10, 16, 17, 0, tzinfo=self.zona)
+
+        compromiso = sumar_minutos_laborales(viernes, 120)
+
+        self.assertEqual(compromiso, datetime(2026, 10, 20, 10, 0, tzinfo=self.zona))
+        self.assertEqual(minutos_laborales_entre(viernes, compromiso), 120)
+        self.assertEqual(
+            sumar_minutos_laborales(datetime(2026, 10, 16, 12, 30, tzinfo=self.zona), 60),
+            datetime(2026, 10, 16, 14, 30, tzinfo=self.zona),
+        )
+
+    def test_ticket_deadline_uses_active_calendar(self):
+        ticket = _crear_ticket(self.user, prioridad="alta", titulo="VPN", descripcion="No conecta")
+        esperado = sumar_minutos_laborales(ticket.fecha_creacion, self.prioridad.minutos_resolucion)
+        self.assertAlmostEqual(
+            ticket.fecha_compromiso_respuesta.timestamp(), esperado.timestamp(), delta=1
+        )
+
+        version = ticket.version
+        recalcular_sla(prioridad_ids=[self.prioridad.id])
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.fecha_compromiso_respuesta, esperado)
+        self.assertEqual(ticket.version, version + 1)
+
+
+class UpdateTicketHistoryTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.ticket = _crear_ticket(
+            self.solicitante,
+            prioridad="baja",
+            titulo="Pantalla",
+            descripcion="Parpadea",
+        )
+
+    def test_history_for_a_change_set_is_inserted_in_one_statement(self):
+        changes = {
+            "status": "progreso",
+            "priority": Prioridad.objects.get(clave="alta"),
+            "assignee": self.tecnico,
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            update_ticket(self.ticket, self.tecnico, changes, comment="Revisando")
+
+        inserts = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("INSERT") and "soporte_tickethistory" in q["sql"]
+        ]
+        self.assertEqual(len(inserts), 1)
+        acciones = set(self.ticket.historial.values_list("action", flat=True))
+        self.assertEqual(
+            acciones,
+            {
+                TicketHistory.Action.STATUS,
+                TicketHistory.Action.PRIORITY,
+                TicketHistory.Action.ASSIGNEE,
+                TicketHistory.Action.COMMENT,
+            },
+        )
+
+    def test_update_writes_only_changed_columns_and_bumps_version(self):
+        version = self.ticket.version
+        with CaptureQueriesContext(connection) as ctx:
+            update_ticket(self.ticket, self.tecnico, {"title": "Pantalla negra"})
+
+        update_sql = next(
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("UPDATE") and '"soporte_ticket"' in q["sql"]
+        )
+        self.assertIn('"titulo"', update_sql)
+        self.assertNotIn('"descripcion"', update_sql)
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.titulo, "Pantalla negra")
+        self.assertEqual(self.ticket.version, version + 1)
+
+    def test_stale_version_raises_conflict_without_writing(self):
+        otra_copia = Ticket.objects.get(pk=self.ticket.pk)
+        update_ticket(otra_copia, self.tecnico, {"status": "progreso"})
+
+        with self.assertRaises(TicketVersionConflict):
+            update_ticket(self.ticket, self.tecnico, {"title": "Cambio perdido"}, comment="Nota")
+
+        self.ticket.refresh_from_db()
+        self.assertEqual(self.ticket.titulo, "Pantalla")
+        self.assertEqual(self.ticket.estado, "progreso")
+        self.assertFalse(self.ticket.historial.filter(action=TicketHistory.Action.TITLE).exists())
+
+
+class AsignacionTecnicoTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        self.ocupado = _crear_usuario("ocupado", is_staff=True)
+        self.libre = _crear_usuario("libre", is_staff=True)
+        CargaTecnico.objects.exclude(tecnico__in=[self.ocupado, self.libre]).update(disponible=False)
+        self.area = Area.objects.order_by("orden").first()
+
+    def _ticket(self, tecnico=None, prioridad="media"):
+        return _crear_ticket(
+            self.solicitante,
+            prioridad=prioridad,
+            titulo="Impresora",
+            descripcion="No imprime",
+            tecnico_asignado=tecnico,
+        )
+
+    def test_assigns_least_loaded_and_updates_counters(self):
+        self._ticket(self.ocupado, prioridad="alta")
+        recalcular_cargas()
+
+        ticket = Ticket(
+            titulo="Correo",
+            descripcion="No llega",
+            solicitante=self.solicitante,
+            prioridad=Prioridad.objects.get(clave="baja"),
+            area_funcional=self.area,
+        )
+        self.assertEqual(asignar_tecnico(ticket), self.libre)
+        ticket.save()
+
+        carga = CargaTecnico.objects.get(tecnico=self.libre)
+        self.assertEqual(carga.tickets_abiertos, 1)
+        self.assertIsNotNone(carga.ultima_asignacion)
+
+        update_ticket(ticket, self.libre, {"status": "cerrado"})
+        carga.refresh_from_db()
+        self.assertEqual((carga.tickets_abiertos, carga.carga), (0, 0))
+
+    def _contadores(self, tecnico):
+        carga = CargaTecnico.objects.get(tecnico=tecnico)
+        return carga.tickets_abiertos, carga.carga
+
+    def test_admin_reassignment_and_delete_keep_counters_in_sync(self):
+        peso = Prioridad.objects.get(clave="media").orden
+        ticket = self._ticket(self.ocupado)
+        self.assertEqual(self._contadores(self.ocupado), (1, peso))
+
+        admin_user = get_user_model().objects.create_superuser(username="admin", password="segura123!")
+        self.client.force_login(admin_user)
+        url = reverse("admin:soporte_ticket_change", args=[ticket.pk])
+        form = self.client.get(url).context["adminform"].form
+        datos = {}
+        for nombre, campo in form.fields.items():
+            valor = form[nombre].value()
+            if isinstance(campo.widget, MultiWidget):
+                for i, parte in enumerate(campo.widget.decompress(valor)):
+                    datos[f"{nombre}_{i}"] = parte or ""
+            elif valor is not None:
+                datos[nombre] = valor
+        datos["tecnico_asignado"] = self.libre.pk
+        self.assertEqual(self.client.post(url, datos).status_code, 302)
+        self.assertEqual(self._contadores(self.ocupado), (0, 0))
+        self.assertEqual(self._contadores(self.libre), (1, peso))
+
+        self.client.post(
+            reverse("admin:soporte_ticket_changelist"),
+            {"action": "delete_selected", "_selected_action": [ticket.pk], "post": "yes"},
+        )
+        self.assertFalse(Ticket.objects.filter(pk=ticket.pk).exists())
+        self.assertEqual(self._contadores(self.libre), (0, 0))
+
+    def test_concurrent_pick_of_the_same_technician_is_retried(self):
+        simulada = []
+
+        def asignacion_concurrente(execute, sql, params, many, context):
+            resultado = execute(sql, params, many, context)
+            if not simulada and sql.startswith("SELECT") and "soporte_cargatecnico" in sql:
+                # Otra creación elige al mismo técnico entre la lectura y el compare-and-swap.
+                simulada.append(True)
+                CargaTecnico.objects.filter(tecnico=self.ocupado).update(
+                    tickets_abiertos=1, carga=1, ultima_asignacion=timezone.now()
+                )
+            return resultado
+
+        ticket = Ticket(
+            titulo="Correo",
+            descripcion="No llega",
+            solicitante=self.solicitante,
+            prioridad=Prioridad.objects.get(clave="baja"),
+            area_funcional=self.area,
+        )
+        with connection.execute_wrapper(asignacion_concurrente):
+            self.assertEqual(asignar_tecnico(ticket), self.libre)
+        self.assertEqual(self._contadores(self.ocupado), (1, 1))
+        self.assertEqual(self._contadores(self.libre)[0], 1)
+
+    def test_recalculate_fixes_drifted_counters(self):
+        self._ticket(self.ocupado)
+        CargaTecnico.objects.filter(tecnico=self.ocupado).update(tickets_abiertos=7, carga=20)
+
+        self.assertEqual(recalcular_cargas(), 1)
+        carga = CargaTecnico.objects.get(tecnico=self.ocupado)
+        self.assertEqual(carga.tickets_abiertos, 1)
+        self.assertEqual(carga.carga, Prioridad.objects.get(clave="media").orden)
+
+
+class PosprocesoTicketTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.client.force_login(self.solicitante)
+
+    def _crear_ticket(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            respuesta = self.client.post(
+                reverse("crear_ticket"),
+                {
+                    "titulo": "Sin red",
+                    "descripcion": "No hay conexión",
+                    "categoria": "soporte",
+                    "prioridad": Prioridad.objects.get(clave="media").pk,
+                    "area_funcional": Area.objects.order_by("orden").first().pk,
+                },
+            )
+        self.assertEqual(respuesta.status_code, 302)
+        return Ticket.objects.get(titulo="Sin red"), callbacks
+
+    def test_create_defers_notifications_until_after_commit(self):
+        ticket, callbacks = self._crear_ticket()
+
+        self.assertFalse(Notification.objects.exists())
+        with mock.patch("soporte.tasks.async_task") as async_task:
+            for callback in callbacks:
+                callback()
+        async_task.assert_called_once_with("soporte.tasks.posproceso_ticket", ticket.posproceso.pk)
+        self.assertTrue(ticket.historial.filter(action=TicketHistory.Action.CREATED).exists())
+
+        resultado = posproceso.ejecutar_posproceso(ticket.posproceso.pk)
+
+        self.assertEqual(resultado.estado, PosprocesoTicket.Estado.COMPLETADO)
+        self.assertTrue(set(dict(posproceso.ETAPAS)) | {"nucleo"} <= set(resultado.tiempos))
+        self.assertTrue(Notification.objects.filter(user=self.tecnico, type="ticket_assigned").exists())
+        self.assertTrue(Notification.objects.filter(user=self.solicitante, type="ticket_created").exists())
+
+    def test_failed_stage_is_retried_without_repeating_completed_ones(self):
+        ticket, _ = self._crear_ticket()
+        crear = posproceso.create_notification
+
+        def falla_asignacion(tipo, *args, **kwargs):
+            if tipo == "ticket_assigned":
+                raise RuntimeError("sin conexión")
+            return crear(tipo, *args, **kwargs)
+
+        with mock.patch.object(posproceso, "create_notification", side_effect=falla_asignacion):
+            resultado = posproceso.ejecutar_posproceso(ticket.posproceso.pk)
+
+        self.assertEqual(resultado.estado, PosprocesoTicket.Estado.PENDIENTE)
+        self.assertEqual(resultado.intentos, 1)
+        self.assertIn("aviso_tecnico", resultado.ultimo_error)
+
+        resultado = posproceso.ejecutar_posproceso(ticket.posproceso.pk)
+        self.assertEqual(resultado.estado, PosprocesoTicket.Estado.COMPLETADO)
+        self.assertEqual(Notification.objects.filter(user=self.solicitante).count(), 1)
+
+
+class CriticidadSolicitanteTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        self.abierto = self._ticket("abierto")
+        self.cerrado = self._ticket("cerrado")
+
+    def _ticket(self, estado):
+        return _crear_ticket(self.solicitante, titulo="VPN", descripcion="No conecta", estado=estado)
+
+    def test_ticket_save_does_not_read_profile(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.abierto.titulo = "VPN caída"
+            self.abierto.save()
+        self.assertFalse(any("soporte_perfilusuario" in q["sql"] for q in ctx.captured_queries))
+
+    def test_flag_change_propagates_to_open_tickets_only_when_it_flips(self):
+        perfil = PerfilUsuario.objects.get(user=self.solicitante)
+        with self.captureOnCommitCallbacks() as callbacks:
+            perfil.rut = "11111111-1"
+            perfil.save()
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            perfil.es_critico = True
+            perfil.save()
+        self.assertEqual(len(callbacks), 1)
+
+        self.assertEqual(propagar_criticidad(self.solicitante.pk), 1)
+        self.abierto.refresh_from_db()
+        self.cerrado.refresh_from_db()
+        self.assertTrue(self.abierto.solicitante_critico)
+        self.assertFalse(self.cerrado.solicitante_critico)
+
+    def test_reconcile_repairs_drift(self):
+        PerfilUsuario.objects.filter(user=self.solicitante).update(es_critico=True)
+
+        self.assertEqual(reconciliar_criticidad(), 1)
+        self.assertEqual(reconciliar_criticidad(incluir_cerrados=True), 1)
+        self.assertEqual(Ticket.objects.filter(solicitante_critico=True).count(), 2)
+
+
+class BusquedaTextoCompletoTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        self.impresora = self._ticket("Impresora atascada", "La impresora del segundo piso no imprime")
+        self.correo = self._ticket("Correo lento", "Los correos con <adjuntos> tardan en llegar a la impresora")
+
+    def _ticket(self, titulo, descripcion):
+        return _crear_ticket(self.solicitante, titulo=titulo, descripcion=descripcion)
+
+    def test_search_ranks_title_matches_first_and_follows_updates(self):
+        resultados = list(buscar_tickets(Ticket.objects.all(), "impres").order_by("-relevancia"))
+        self.assertEqual(resultados, [self.impresora, self.correo])
+        self.assertIn("\x02", resultados[1].fragmento_busqueda)
+
+        Ticket.objects.filter(pk=self.correo.pk).update(descripcion="Sin novedades")
+        self.assertEqual(list(buscar_tickets(Ticket.objects.all(), "impresora")), [self.impresora])
+        self.assertFalse(buscar_tickets(Ticket.objects.all(), '" OR *').exists())
+
+    def test_rank_and_snippet_come_from_one_match_and_page_by_keyset(self):
+        tickets = buscar_tickets(TicketListado.objects.all(), "impresora")
+        orden = [(F("relevancia"), True), (F("ticket_id"), True)]
+        with CaptureQueriesContext(connection) as ctx:
+            primera = paginar_keyset(tickets, orden, 1)
+        if connection.vendor == "sqlite":
+            self.assertEqual(ctx.captured_queries[-1]["sql"].count("MATCH"), 1)
+        segunda = paginar_keyset(tickets, orden, 1, despues=primera.cursor_siguiente)
+        self.assertEqual(
+            [fila.ticket_id for fila in [*primera.object_list, *segunda.object_list]],
+            [self.impresora.pk, self.correo.pk],
+        )
+        self.assertIsNone(segunda.cursor_siguiente)
+
+    def test_postgresql_search_joins_the_index_once_without_correlated_subqueries(self):
+        with mock.patch("soporte.busqueda.motor_busqueda", return_value="postgresql"):
+            sql = str(buscar_tickets(TicketListado.objects.all(), "impresora").order_by("-relevancia").query)
+        self.assertNotIn("(SELECT", sql)
+        self.assertIn('FROM "soporte_ticketlistado" , "soporte_ticket_busqueda" , "soporte_ticket"', sql)
+
+    def test_reindex_is_batched_and_idempotent(self):
+        self.assertEqual(reindexar_busqueda(tamano_lote=1), 2)
+        self.assertEqual(reindexar_busqueda(tamano_lote=1), 2)
+        self.assertEqual(buscar_tickets(Ticket.objects.all(), "correo").count(), 1)
+
+    def test_home_highlights_snippet_escaping_ticket_text(self):
+        self.client.force_login(self.solicitante)
+        respuesta = self.client.get(reverse("home_tickets"), {"search": "adjuntos"})
+        self.assertContains(respuesta, "&lt;<mark>adjuntos</mark>&gt;")
+        self.assertNotContains(respuesta, "Impresora atascada")
+
+
+class PaginacionKeysetTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante", is_staff=True)
+        creacion = timezone.now()
+        prioridades = list(Prioridad.objects.order_by("orden").values_list("clave", flat=True))
+        for i in range(14):
+            ticket = _crear_ticket(self.solicitante, prioridad=prioridades[i % len(prioridades)], titulo=f"Ticket {i}")
+            # Fechas repetidas para ejercitar el desempate por id.
+            Ticket.objects.filter(pk=ticket.pk).update(fecha_creacion=creacion - timedelta(hours=i // 3))
+        self.client.force_login(self.solicitante)
+
+    def _recorrer(self, params):
+        vistos = []
+        respuesta = self.client.get(reverse("home_tickets"), params)
+        paginas = [respuesta.context["page_obj"]]
+        while True:
+            pagina = paginas[-1]
+            vistos.extend(ticket.id for ticket in pagina)
+            if not pagina.has_next:
+                break
+            respuesta = self.client.get(reverse("home_tickets"), {**params, "cursor": pagina.cursor_siguiente})
+            paginas.append(respuesta.context["page_obj"])
+        return vistos, paginas
+
+    def test_cursor_pages_match_offset_order_for_every_sort(self):
+        for sort in ["", "prioridad", "estado", "solicitante", "tecnico", "fecha_creacion"]:
+            for direccion in ["asc", "desc"]:
+                params = {"sort": sort, "dir": direccion} if sort else {}
+                vistos, paginas = self._recorrer(params)
+                esperados = []
+                for numero in range(1, 4):
+                    respuesta = self.client.get(reverse("home_tickets"), {**params, "page": numero})
+                    esperados.extend(ticket.id for ticket in respuesta.context["page_obj"])
+                self.assertEqual(vistos, esperados, (sort, direccion))
+
+                anterior = self.client.get(
+                    reverse("home_tickets"), {**params, "antes": paginas[-1].cursor_anterior}
+                ).context["page_obj"]
+                self.assertEqual([t.id for t in anterior], [t.id for t in paginas[-2]])
+
+    def test_deep_page_query_does_not_use_offset(self):
+        _, paginas = self._recorrer({})
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse("home_tickets"), {"cursor": paginas[-2].cursor_siguiente})
+        consultas = [q["sql"] for q in ctx.captured_queries if '"soporte_ticketlistado"."titulo"' in q["sql"]]
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn("OFFSET", consultas[0])
+
+
+class PlanConsultasTicketsTests(TestCase):
+    """Las consultas de los listados y reportes deben usar índices sobre los tickets y su listado."""
+
+    URLS = [
+        ("solicitante", "home_tickets", {}),
+        ("solicitante", "home_tickets", {"estado": "abierto"}),
+        ("tecnico", "home_tickets", {"estado": "abierto"}),
+        ("tecnico", "home_tickets", {"tecnico": "tecnico"}),
+        ("tecnico", "home_tickets", {"sort": "fecha_creacion", "dir": "desc"}),
+        ("tecnico", "dashboard_principal", {}),
+        ("tecnico", "dashboard_de_reportes", {}),
+    ]
+
+    def setUp(self):
+        self.usuarios = {
+            "solicitante": _crear_usuario("solicitante"),
+            "tecnico": _crear_usuario("tecnico", is_staff=True, is_superuser=True),
+        }
+        for estado in ["abierto", "progreso", "cerrado"]:
+            _crear_ticket(
+                self.usuarios["solicitante"],
+                titulo="Monitor",
+                descripcion="Sin imagen",
+                tecnico_asignado=self.usuarios["tecnico"],
+                estado=estado,
+            )
+
+    def _escaneos_completos(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("EXPLAIN " + sql)
+                return [fila[0] for fila in cursor.fetchall() if re.search(r"Seq Scan on soporte_ticket(listado)? ", fila[0])]
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [
+                fila[-1] for fila in cursor.fetchall()
+                if re.match(r"SCAN soporte_ticket(?:listado)?(?! USING)\b", fila[-1])
+            ]
+
+    def test_view_queries_do_not_scan_the_ticket_table(self):
+        for usuario, url, params in self.URLS:
+            self.client.force_login(self.usuarios[usuario])
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(reverse(url), params).status_code, 200)
+            consultas = [
+                q["sql"] for q in ctx.captured_queries
+                if q["sql"].startswith("SELECT") and re.search(r'"soporte_ticket(listado)?"', q["sql"])
+            ]
+            self.assertTrue(consultas, url)
+            for sql in consultas:
+                self.assertEqual(self._escaneos_completos(sql), [], f"{url} {params}: {sql}")
+
+
+class ConteosCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.ticket = self._ticket()
+        self.client.force_login(self.tecnico)
+
+    def _ticket(self):
+        return _crear_ticket(self.tecnico, prioridad="baja", titulo="Teclado", descripcion="Teclas pegadas")
+
+    def _consultas_de_conteo(self):
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse("dashboard_principal"))
+        consultas = [q["sql"] for q in ctx.captured_queries if '"en_progreso"' in q["sql"]]
+        return respuesta, consultas
+
+    def test_dashboard_counts_are_cached_until_a_ticket_write(self):
+        respuesta, consultas = self._consultas_de_conteo()
+        self.assertEqual(respuesta.context["total_tickets"], 1)
+        self.assertEqual(len(consultas), 1)
+
+        _, consultas = self._consultas_de_conteo()
+        self.assertEqual(consultas, [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ticket()
+        respuesta, consultas = self._consultas_de_conteo()
+        self.assertEqual(respuesta.context["total_tickets"], 2)
+        self.assertEqual(len(consultas), 1)
+
+    def test_technician_filters_differing_only_in_case_do_not_share_counts(self):
+        mayuscula = _crear_usuario("Juan", is_staff=True)
+        _crear_usuario("juan", is_staff=True)
+        self.ticket.tecnico_asignado = mayuscula
+        self.ticket.save()
+        self.assertNotEqual(
+            clave_conteo("home", "staff", {"tecnico": "Juan"}),
+            clave_conteo("home", "staff", {"tecnico": "juan"}),
+        )
+
+        url = reverse("home_tickets")
+        self.assertEqual(self.client.get(url, {"tecnico": "Juan", "page": 1}).context["total_tickets"], 1)
+        self.assertEqual(self.client.get(url, {"tecnico": "juan", "page": 1}).context["total_tickets"], 0)
+
+    def test_stale_count_is_served_while_another_request_revalidates(self):
+        clave = clave_conteo("prueba", "staff", {"estado": "abierto"})
+        self.assertEqual(clave, clave_conteo("prueba", "staff", {"estado": "abierto", "search": ""}))
+        self.assertNotEqual(clave, clave_conteo("prueba", "staff", {"estado": " abierto "}))
+        self.assertEqual(
+            clave_conteo("prueba", "staff", {"search": "Impresora  Rota"}),
+            clave_conteo("prueba", "staff", {"search": "impresora rota"}),
+        )
+        self.assertEqual(obtener_conteo(clave, Ticket.objects.count, swr=True), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._ticket()
+        cache.add(f"{clave}:candado", 1)
+        self.assertEqual(obtener_conteo(clave, Ticket.objects.count, swr=True), 1)
+        self.assertEqual(obtener_conteo(clave, Ticket.objects.count, swr=False), 2)
+
+
+class FacetasTicketsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.usuario = _crear_usuario("usuario")
+        self.otro = _crear_usuario("otro")
+        self._ticket(self.usuario, "baja", estado="abierto")
+        self._ticket(self.usuario, "alta", estado="en_progreso", tecnico=self.tecnico)
+        self._ticket(self.usuario, "alta", estado="abierto")
+        self._ticket(self.otro, "alta", estado="abierto")
+
+    def _ticket(self, solicitante, prioridad, estado, tecnico=None):
+        return _crear_ticket(
+            solicitante,
+            prioridad=prioridad,
+            titulo="Impresora",
+            descripcion="No imprime",
+            tecnico_asignado=tecnico,
+            estado=estado,
+        )
+
+    def test_each_facet_ignores_its_own_filter_in_one_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            facetas = contar_facetas(TicketListado.objects.all(), {"estado": "abierto", "prioridad": "alta"})
+        self.assertEqual(len(ctx.captured_queries), 3)
+        self.assertEqual(facetas["estado"], {"abierto": 2, "en_progreso": 1})
+        self.assertEqual(facetas["prioridad"], {"baja": 1, "alta": 2})
+        self.assertEqual(facetas["tecnico"], {})
+
+    def test_endpoint_respects_requester_scope_and_is_cached(self):
+        self.client.force_login(self.usuario)
+        respuesta = self.client.get(reverse("facetas_tickets"), {"tecnico": "tecnico"})
+        self.assertEqual(respuesta.json(), {"estado": {"abierto": 2, "en_progreso": 1}, "prioridad": {"baja": 1, "alta": 2}})
+
+        with self.assertNumQueries(2):  # sesión y usuario; los conteos salen de la caché
+            self.client.get(reverse("facetas_tickets"), {"tecnico": "tecnico"})
+
+        self.client.force_login(self.tecnico)
+        respuesta = self.client.get(reverse("home_tickets"), {"prioridad": "alta"})
+        self.assertEqual(respuesta.context["facetas"]["estado"], {"abierto": 2, "en_progreso": 1})
+        self.assertEqual(respuesta.context["facetas"]["tecnico"], {"tecnico": 1})
+
+
+class TicketListadoTests(TestCase):
+    def setUp(self):
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.usuario = _crear_usuario("usuario")
+        self.ticket = _crear_ticket(self.usuario, titulo="Proyector", descripcion="No enciende")
+
+    def test_write_paths_keep_the_row_in_sync(self):
+        self.client.force_login(self.usuario)
+        self.client.post(
+            reverse("detalle_ticket", args=[self.ticket.id]),
+            {"comment_form_submit": "1", "text": "Sigue sin encender"},
+        )
+        self.ticket = Ticket.objects.get(pk=self.ticket.pk)
+        update_ticket(self.ticket, self.tecnico, {"assignee": self.tecnico, "status": "progreso"})
+        prioridad = Prioridad.objects.get(clave="media")
+        prioridad.nombre = "Normal"
+        prioridad.save()
+
+        fila = TicketListado.objects.get(ticket=self.ticket)
+        self.assertEqual(fila.total_comentarios, 1)
+        self.assertEqual(fila.tecnico_nombre, "tecnico")
+        self.assertEqual(fila.get_estado_display(), "En Progreso")
+        self.assertEqual(fila.prioridad_nombre, "Normal")
+        self.assertEqual(fila.solicitante_nombre, "usuario")
+        self.assertGreaterEqual(fila.ultima_actividad, self.ticket.comments.get().created_at)
+
+    def test_rebuild_restores_missing_rows_and_lists_read_one_table(self):
+        TicketListado.objects.all().delete()
+        self.assertEqual(reconstruir_listado(tamano_lote=1), 1)
+        self.assertEqual(TicketListado.objects.get().titulo, "Proyector")
+
+        self.client.force_login(self.tecnico)
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(reverse("home_tickets"))
+        self.assertEqual([t.id for t in respuesta.context["tickets"]], [self.ticket.id])
+        listado = [q["sql"] for q in ctx.captured_queries if '"soporte_ticketlistado"."titulo"' in q["sql"]]
+        self.assertEqual(len(listado), 1)
+        self.assertNotIn("JOIN", listado[0])
+
+
+class CatalogosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.usuario = _crear_usuario("usuario")
+        self.client.force_login(self.usuario)
+
+    def _consultas_catalogo(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(reverse("crear_ticket")).status_code, 200)
+        return [
+            q["sql"] for q in ctx.captured_queries
+            if re.search(r'FROM "(soporte_prioridad|soporte_area)"', q["sql"])
+        ]
+
+    def test_forms_read_catalogs_from_memory_until_a_change(self):
+        self._consultas_catalogo()
+        self.assertEqual(self._consultas_catalogo(), [])
+
+        Prioridad.objects.create(clave="urgente", nombre="Urgente", minutos_resolucion=30, orden=0)
+        self.assertEqual(len(self._consultas_catalogo()), 2)
+        self.assertEqual(catalogos.prioridades()[0].clave, "urgente")
+
+    def test_version_published_by_another_worker_forces_reload(self):
+        area = Area.objects.order_by("orden").first()
+        form = TicketForm(
+            data={"titulo": "Red", "descripcion": "Sin red", "area_funcional": area.pk, "prioridad": ""},
+            user=self.usuario,
+        )
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["prioridad"], catalogos.prioridades()[0])
+
+        catalogos.obtener_catalogos()
+        Area.objects.filter(pk=area.pk).update(nombre="Renombrada")
+        self.assertNotEqual(catalogos.areas()[0].nombre, "Renombrada")
+        catalogos.invalidar_catalogos()
+        self.assertIn("Renombrada", [a.nombre for a in catalogos.areas()])
+
+
+class TicketsJsonTests(TestCase):
+    def setUp(self):
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.tickets = [
+            _crear_ticket(self.tecnico, titulo=f"Ticket {i}")
+            for i in range(3)
+        ]
+        self.client.force_login(self.tecnico)
+
+    def test_projects_requested_fields_and_follows_cursors(self):
+        url = reverse("tickets_json")
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.client.get(url, {"fields": "id,titulo", "limite": 2, "sort": "fecha_creacion"}).json()
+        self.assertEqual(datos["results"], [{"id": t.id, "titulo": t.titulo} for t in self.tickets[:2]])
+        listado = [q["sql"] for q in ctx.captured_queries if "soporte_ticketlistado" in q["sql"]]
+        self.assertEqual(len(listado), 1)
+        self.assertNotIn("area_nombre", listado[0])
+
+        siguiente = self.client.get(
+            url, {"fields": "id", "limite": 2, "sort": "fecha_creacion", "cursor": datos["cursor_siguiente"]}
+        ).json()
+        self.assertEqual(siguiente["results"], [{"id": self.tickets[2].id}])
+        self.assertEqual(self.client.get(url, {"fields": "id,descripcion"}).status_code, 400)
+
+    def test_etag_allows_revalidation_until_the_page_changes(self):
+        url = reverse("tickets_json")
+        respuesta = self.client.get(url)
+        etag = respuesta["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        update_ticket(self.tickets[0], self.tecnico, {"status": "progreso"})
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta["ETag"], etag)
+
+
+class BusquedaAproximadaTests(TestCase):
+    def setUp(self):
+        self.solicitante = _crear_usuario("solicitante")
+        otro = _crear_usuario("otro")
+        for titulo, usuario in (
+            ("Impresora atascada en contabilidad", self.solicitante),
+            ("Impresión de facturas lenta", self.solicitante),
+            ("Correo sin sincronizar", self.solicitante),
+            ("Impresora sin tóner", otro),
+        ):
+            _crear_ticket(usuario, titulo=titulo)
+        self.client.force_login(self.solicitante)
+
+    def test_typos_match_and_results_are_ranked_within_scope(self):
+        resultados = self.client.get(reverse("sugerencias_tickets"), {"q": "imprsora"}).json()["results"]
+        self.assertEqual([fila["titulo"] for fila in resultados], ["Impresora atascada en contabilidad"])
+        self.assertGreaterEqual(resultados[0]["similitud"], 0.6)
+
+        cambiado = Ticket.objects.get(titulo="Correo sin sincronizar")
+        cambiado.titulo = "Impresora de recepción"
+        cambiado.save()
+        resultados = self.client.get(reverse("sugerencias_tickets"), {"q": "impresora recep"}).json()["results"]
+        self.assertEqual(resultados[0]["titulo"], "Impresora de recepción")
+
+    def test_scope_applies_before_the_candidate_window(self):
+        otro = get_user_model().objects.get(username="otro")
+        Ticket.objects.bulk_create([
+            Ticket(
+                titulo="Impresora rota",
+                descripcion="Detalle",
+                solicitante=otro,
+                prioridad=Prioridad.objects.get(clave="media"),
+                area_funcional=Area.objects.order_by("orden").first(),
+            )
+            for _ in range(60)
+        ])
+        reconstruir_listado()
+        propio = Ticket.objects.get(titulo="Impresora atascada en contabilidad")
+        propio.titulo = "Impresora del piso tres, junto a la escalera"
+        propio.save()
+
+        alcance = TicketListado.objects.filter(solicitante=self.solicitante)
+        resultados = buscar_aproximado(alcance, "imprsora", limite=5)
+        self.assertEqual([fila["ticket_id"] for fila in resultados], [propio.pk])
+
+    def test_candidates_come_from_one_ranked_pass_over_the_trigram_index(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("El plan corresponde al índice FTS5 de SQLite.")
+        with CaptureQueriesContext(connection) as ctx:
+            buscar_aproximado(TicketListado.objects.all(), "imprsora")
+        sql = ctx.captured_queries[-1]["sql"]
+        self.assertEqual(sql.count("MATCH"), 1)
+        self.assertIn("LIMIT", sql)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = " ".join(str(fila[-1]) for fila in cursor.fetchall())
+        self.assertIn("VIRTUAL TABLE INDEX", plan)
+        self.assertNotIn("CORRELATED", plan)
+
+
+class DetalleTicketConsultasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.ticket = _crear_ticket(self.tecnico, titulo="Ticket largo", tecnico_asignado=self.tecnico)
+        self.client.force_login(self.tecnico)
+
+    def _agregar_actividad(self, cantidad):
+        Comment.objects.bulk_create(
+            [Comment(ticket=self.ticket, author=self.tecnico, text=f"Comentario {i}") for i in range(cantidad)]
+        )
+        TicketHistory.objects.bulk_create(
+            [
+                TicketHistory(ticket=self.ticket, actor=self.tecnico, action=TicketHistory.Action.COMMENT, new_value="c")
+                for _ in range(cantidad)
+            ]
+        )
+
+    def test_query_budget_does_not_grow_with_ticket_activity(self):
+        url = reverse("detalle_ticket", args=[self.ticket.id])
+        catalogos.obtener_catalogos()
+        self._agregar_actividad(2)
+        # Sesión, usuario, ticket con sus relaciones, comentarios, historial y adjuntos.
+        with self.assertNumQueries(6):
+            self.client.get(url)
+
+        self._agregar_actividad(80)
+        with self.assertNumQueries(6):
+            respuesta = self.client.get(url)
+        self.assertEqual(len(respuesta.context["comments"]), views.LIMITE_COMENTARIOS_DETALLE)
+        self.assertTrue(respuesta.context["historial_truncado"])
+
+        completo = self.client.get(url, {"completo": "1"})
+        self.assertEqual(len(completo.context["comments"]), 82)
+
+
+class NotificacionesStreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = _crear_usuario("usuario")
+
+    @mock.patch.object(views, "INTERVALO_AVISOS", 0)
+    async def test_stream_pushes_new_notifications_on_version_change(self):
+        await self.async_client.aforce_login(self.usuario)
+        respuesta = await self.async_client.get(reverse("notificaciones_stream"))
+        self.assertEqual(respuesta["Content-Type"], "text/event-stream")
+        eventos = aiter(respuesta.streaming_content)
+        self.assertTrue((await anext(eventos)).startswith(b"retry:"))
+        self.assertIn(b'"count": 0', await anext(eventos))
+
+        await sync_to_async(create_notification)("ticket_commented", self.usuario, "Nuevo comentario", "/ticket/1/")
+        evento = await anext(eventos)
+        self.assertIn(b"event: notificaciones", evento)
+        self.assertIn(b'"count": 1', evento)
+        self.assertIn("Nuevo comentario".encode(), evento)
+        await eventos.aclose()
+
+    def test_wsgi_requests_fall_back_to_polling(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(reverse("notificaciones_stream")).status_code, 204)
+        self.assertEqual(self.client.get(reverse("notificaciones_unread")).json()["count"], 0)
+
+
+class ResumenNotificacionesTests(TestCase):
+    def setUp(self):
+        self.usuario = _crear_usuario("usuario")
+        self.otro = _crear_usuario("otro")
+        self.client.force_login(self.usuario)
+
+    def _no_leidas(self, usuario):
+        return ResumenNotificaciones.objects.get(user=usuario).no_leidas
+
+    def test_counter_follows_creation_and_reads_without_counting(self):
+        for i in range(3):
+            create_notification("ticket_commented", [self.usuario, self.otro], f"Aviso {i}", "/tickets/")
+        self.assertEqual(self._no_leidas(self.usuario), 3)
+
+        with CaptureQueriesContext(connection) as ctx:
+            datos = self.client.get(reverse("notificaciones_unread")).json()
+        self.assertEqual(datos["count"], 3)
+        self.assertFalse([q for q in ctx.captured_queries if "COUNT(" in q["sql"]])
+
+        notif = Notification.objects.filter(user=self.usuario).first()
+        self.client.get(reverse("detalle_ticket", args=[999]), {"notif_id": notif.id})
+        self.assertEqual(self._no_leidas(self.usuario), 2)
+
+        self.client.post(reverse("marcar_notificaciones_leidas"))
+        self.assertEqual(self._no_leidas(self.usuario), 0)
+        self.assertEqual(self._no_leidas(self.otro), 3)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        create_notification("ticket_commented", self.usuario, "Aviso", "/tickets/")
+        ResumenNotificaciones.objects.filter(user=self.usuario).update(no_leidas=7)
+        self.assertEqual(reconcile_unread_counts(), 1)
+        self.assertEqual(self._no_leidas(self.usuario), 1)
+
+    def test_unread_endpoint_answers_304_from_the_cached_version(self):
+        cache.clear()
+        url = reverse("notificaciones_unread")
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as ctx:
+            respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertFalse([q for q in ctx.captured_queries if "soporte_" in q["sql"]])
+
+        create_notification("ticket_commented", self.usuario, "Aviso", "/tickets/")
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["count"], 1)
+        self.assertNotEqual(respuesta["ETag"], etag)
+
+    def test_version_written_through_another_cache_handle_reaches_the_unread_endpoint(self):
+        # Las notificaciones de tickets nuevos se crean en el qcluster: la
+        # versión que publica ese proceso, con su propia conexión a la caché
+        # compartida, tiene que invalidar el ETag del web.
+        with tempfile.TemporaryDirectory() as directorio, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directorio},
+        }):
+            url = reverse("notificaciones_unread")
+            etag = self.client.get(url)["ETag"]
+            otra_conexion = caches.create_connection("default")
+            otra_conexion.set(clave_version_avisos(self.usuario.pk), "version-del-qcluster", None)
+            respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta["ETag"], '"version-del-qcluster"')
+
+    def test_benchmark_uses_the_unread_index_and_rolls_back(self):
+        salida = StringIO()
+        call_command("benchmark_notificaciones", cantidad=200, repeticiones=1, stdout=salida)
+        if connection.vendor == "sqlite":
+            self.assertIn("USING INDEX notif_no_leidas_fecha", salida.getvalue())
+        self.assertFalse(Notification.objects.filter(type="benchmark").exists())
+        self.assertEqual(get_user_model().objects.filter(username__startswith="benchmark-").count(), 0)
+
+
+class NotificacionesDifundidasTests(TestCase):
+    def setUp(self):
+        self.autor = _crear_usuario("autor", is_staff=True)
+        self.tecnico = _crear_usuario("tecnico", is_staff=True)
+        self.solicitante = _crear_usuario("solicitante")
+        self.client.force_login(self.tecnico)
+
+    def _no_leidas(self, usuario):
+        return ResumenNotificaciones.objects.filter(user=usuario).values_list("no_leidas", flat=True).first() or 0
+
+    def test_broadcast_is_one_row_merged_into_each_staff_inbox(self):
+        create_notification("ticket_assigned", self.tecnico, "Asignado", "/ticket/1/")
+        create_broadcast("ticket_created", "Nuevo ticket", "/ticket/2/", actor=self.autor)
+
+        datos = self.client.get(reverse("notificaciones_unread")).json()
+        self.assertEqual(datos["count"], 2)
+        self.assertEqual([n["message"] for n in datos["notifications"]], ["Nuevo ticket", "Asignado"])
+        self.assertIn("difusion_id=", datos["notifications"][0]["url"])
+        self.assertEqual(self._no_leidas(self.autor), 0)
+        self.assertEqual(self._no_leidas(self.solicitante), 0)
+        self.assertEqual(Notification.objects.filter(type="ticket_created").count(), 0)
+
+    def test_reconcile_counts_broadcasts_without_a_query_per_user(self):
+        User = get_user_model()
+        grupo = Group.objects.create(name="Supervisores")
+        self.solicitante.groups.add(grupo)
+        create_broadcast("ticket_created", "Leída", "/ticket/1/", actor=self.autor)
+        create_broadcast("ticket_created", "Excepción", "/ticket/2/")
+        create_broadcast("ticket_created", "Pendiente", "/ticket/3/", actor=self.autor)
+        create_broadcast("ticket_created", "Del rol", "/ticket/4/", group=grupo)
+        leida, excepcion = NotificacionDifundida.objects.filter(message__in=["Leída", "Excepción"]).order_by("id")
+        CursorNotificaciones.objects.update_or_create(user=self.tecnico, defaults={"difundidas_leidas_hasta": leida.id})
+        DifundidaLeida.objects.create(user=self.tecnico, notificacion=excepcion)
+        ResumenNotificaciones.objects.update(no_leidas=99)
+
+        with CaptureQueriesContext(connection) as pocos:
+            self.assertEqual(reconcile_unread_counts(), 3)
+        self.assertEqual(
+            [self._no_leidas(u) for u in (self.autor, self.tecnico, self.solicitante)], [1, 1, 1]
+        )
+
+        for indice in range(5):
+            _crear_usuario(f"personal{indice}", is_staff=True)
+        CursorNotificaciones.objects.filter(user__username__startswith="personal").update(difundidas_leidas_hasta=0)
+        ResumenNotificaciones.objects.update(no_leidas=99)
+        with self.assertNumQueries(len(pocos)):
+            self.assertEqual(reconcile_unread_counts(), 8)
+        self.assertEqual(self._no_leidas(User.objects.get(username="personal0")), 3)
+
+    def test_reads_advance_the_cursor_and_leave_no_exceptions(self):
+        primera = create_broadcast("ticket_created", "Primera", "/ticket/1/")
+        segunda = create_broadcast("ticket_created", "Segunda", "/ticket/2/")
+        tercera = create_broadcast("ticket_created", "Tercera", "/ticket/3/")
+
+        self.client.get(reverse("detalle_ticket", args=[999]), {"difusion_id": segunda.id})
+        self.assertTrue(DifundidaLeida.objects.filter(user=self.tecnico, notificacion=segunda).exists())
+        self.client.get(reverse("detalle_ticket", args=[999]), {"difusion_id": primera.id})
+        cursor = CursorNotificaciones.objects.get(user=self.tecnico)
+        self.assertEqual(cursor.difundidas_leidas_hasta, segunda.id)
+        self.assertFalse(DifundidaLeida.objects.filter(user=self.tecnico).exists())
+        self.assertEqual(self._no_leidas(self.tecnico), 1)
+
+        lista = self.client.get(reverse("lista_notificaciones")).context["notifications"]
+        self.assertEqual([(item["obj"].message, item["obj"].is_read) for item in lista], [
+            ("Tercera", False), ("Segunda", True), ("Primera", True),
+        ])
+
+        self.client.post(reverse("marcar_notificaciones_leidas"))
+        self.assertEqual(CursorNotificaciones.objects.get(user=self.tecnico).difundidas_leidas_hasta, tercera.id)
+        self.assertEqual(self._no_leidas(self.tecnico), 0)
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+    def test_promotion_to_staff_starts_the_cursor_at_the_latest_broadcast(self):
+        anterior = create_broadcast("ticket_created", "Anterior", "/ticket/1/")
+        self.solicitante.is_staff = True
+        self.solicitante.save()
+        self.assertEqual(
+            CursorNotificaciones.objects.get(user=self.solicitante).difundidas_leidas_hasta, anterior.id
+        )
+        self.assertEqual(self._no_leidas(self.solicitante), 0)
+
+        create_broadcast("ticket_created", "Posterior", "/ticket/2/")
+        self.client.force_login(self.solicitante)
+        datos = self.client.get(reverse("notificaciones_unread")).json()
+        self.assertEqual((datos["count"], self._no_leidas(self.solicitante)), (1, 1))
+        self.assertEqual([n["message"] for n in datos["notifications"]], ["Posterior"])
+
+        self.solicitante.is_staff = False
+        self.solicitante.save()
+        self.assertEqual(self._no_leidas(self.solicitante), 0)
+        self.assertEqual(reconcile_unread_counts(), 0)
+
+
+class RetencionNotificacionesTests(TestCase):
+    def setUp(self):
+        self.usuario = _crear_usuario("usuario", is_staff=True)
+        self.client.force_login(self.usuario)
+
+    def test_old_read_notifications_are_archived_in_batches(self):
+        for i in range(5):
+            create_notification("ticket_commented", self.usuario, f"Aviso {i}", "/tickets/")
+        antiguas = list(Notification.objects.order_by("id").values_list("id", flat=True)[:4])
+        Notification.objects.filter(id__in=antiguas).update(created_at=timezone.now() - timedelta(days=400))
+        Notification.objects.filter(id__in=antiguas[:3]).update(is_read=True)
+        ResumenNotificaciones.objects.filter(user=self.usuario).update(no_leidas=2)
+
+        self.assertEqual(archivar_notificaciones(dias=180, tamano_lote=2), 3)
+
+        self.assertEqual(Notification.objects.filter(user=self.usuario).count(), 2)
+        archivo = ArchivoNotificaciones.objects.get(user=self.usuario, type="ticket_commented")
+        self.assertEqual(archivo.cantidad, 3)
+        self.assertEqual(archivo.mes.day, 1)
+        self.assertEqual(ResumenNotificaciones.objects.get(user=self.usuario).no_leidas, 2)
+
+    def test_list_pages_merge_personal_and_broadcast_notifications(self):
+        for i in range(25):
+            create_notification("ticket_commented", self.usuario, f"Aviso {i}", "/tickets/")
+        create_broadcast("ticket_created", "Difundida", "/tickets/")
+        url = reverse("lista_notificaciones")
+
+        primera = self.client.get(url).context
+        self.assertEqual(len(primera["notifications"]), 20)
+        self.assertEqual(primera["notifications"][0]["obj"].message, "Difundida")
+        segunda = self.client.get(url, {"despues": primera["cursor_siguiente"]}).context
+        self.assertIsNone(segunda["cursor_siguiente"])
+
+        mensajes = [item["obj"].message for item in primera["notifications"] + segunda["notifications"]]
+        self.assertEqual(mensajes, ["Difundida"] + [f"Aviso {i}" for i in reversed(range(25))])
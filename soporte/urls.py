@@ -7,10 +7,15 @@ urlpatterns = [
     # Vistas de Navegación Principal
     path("dashboard-principal/", views.dashboard, name="dashboard_principal"),
     path("tickets/", views.home, name="home_tickets"),
+    path("tickets/facetas/", views.facetas_tickets, name="facetas_tickets"),
+    path("tickets/json/", views.tickets_json, name="tickets_json"),
+    path("tickets/sugerencias/", views.sugerencias_tickets, name="sugerencias_tickets"),
     path("crear/", views.crear_ticket, name="crear_ticket"),
     path('salir/', views.salir, name="salir"),
     path('notificaciones/unread/', views.notificaciones_unread, name='notificaciones_unread'),
+    path('notificaciones/stream/', views.notificaciones_stream, name='notificaciones_stream'),
     path('notificaciones/', views.lista_notificaciones, name='lista_notificaciones'),
+    path('notificaciones/marcar-leidas/', views.marcar_notificaciones_leidas, name='marcar_notificaciones_leidas'),
 
     # Gestión de Tickets
     path("ticket/<int:ticket_id>/", views.detalle_ticket, name="detalle_ticket"),
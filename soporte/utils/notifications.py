@@ -1,18 +1,45 @@
-"""Utilidades para crear y distribuir notificaciones del sistema."""
+"""Utilidades para crear y distribuir notificaciones del sistema.
+
+Hay dos clases de notificaciones:
+
+* Personales (``Notification``): una fila por destinatario, con ``is_read``.
+* Difundidas (``NotificacionDifundida``): una sola fila para toda una
+  audiencia (el personal de soporte o un rol). Lo leído se registra con un
+  cursor por usuario (``CursorNotificaciones``): todo id menor o igual está
+  leído. Por encima del cursor, cada lectura suelta es una fila
+  ``DifundidaLeida``. El cursor avanza en cuanto esas filas forman un
+  tramo continuo, así que quedan pocas.
+
+``ResumenNotificaciones.no_leidas`` cuenta ambas clases.
+"""
 
 from __future__ import annotations
 
+from collections import Counter, defaultdict
 from typing import Sequence
 
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import (
+    Case, Count, Exists, F, IntegerField, Max, OuterRef, Q, QuerySet, Subquery, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest
 from django.utils import timezone
 from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-from soporte.models import Notification
+from soporte.avisos import avisar_cambio_notificaciones
+from soporte.models import (
+    CursorNotificaciones,
+    DifundidaLeida,
+    Notification,
+    NotificacionDifundida,
+    ResumenNotificaciones,
+)
 
 User = get_user_model()
 
+NOTIFICATION_BATCH_SIZE = 500
+
 
 def get_staff_notifiable_users() -> Sequence[User]:
     """Devuelve los usuarios de soporte (técnicos o administradores)."""
@@ -23,11 +50,31 @@ def get_staff_notifiable_users() -> Sequence[User]:
 def _normalize_recipients(recipients):
     if recipients is None:
         return []
-    if isinstance(recipients, (list, tuple, set)):
+    if isinstance(recipients, (list, tuple, set, QuerySet)):
         return list(recipients)
     return [recipients]
 
 
+def _add_unread(counts: dict[int, int]) -> None:
+    """Suma ``counts[user_id]`` al contador de no leídas de cada usuario (negativo resta)."""
+
+    counts = {user_id: delta for user_id, delta in counts.items() if delta}
+    if not counts:
+        return
+    ResumenNotificaciones.objects.bulk_create(
+        [ResumenNotificaciones(user_id=user_id) for user_id in counts],
+        ignore_conflicts=True,
+    )
+    # Un UPDATE por cada delta distinto; casi siempre es uno solo.
+    by_delta = defaultdict(list)
+    for user_id, delta in counts.items():
+        by_delta[delta].append(user_id)
+    for delta, user_ids in by_delta.items():
+        ResumenNotificaciones.objects.filter(user_id__in=user_ids).update(
+            no_leidas=Greatest(F("no_leidas") + delta, Value(0))
+        )
+
+
 def create_notification(notification_type: str, recipients, message: str, url: str, actor=None) -> None:
     """Crea notificaciones para uno o varios destinatarios."""
 
@@ -35,6 +82,14 @@ def create_notification(notification_type: str, recipients, message: str, url: s
     if not users:
         return
 
+    with transaction.atomic():
+        _create_notifications(users, notification_type, message, url, actor)
+    # bulk_create no emite post_save: se avisa a los streams explícitamente.
+    avisar_cambio_notificaciones(user.pk for user in users)
+
+
+def _create_notifications(users, notification_type, message, url, actor) -> None:
+    _add_unread(Counter(user.pk for user in users))
     Notification.objects.bulk_create(
         [
             Notification(
@@ -46,19 +101,334 @@ def create_notification(notification_type: str, recipients, message: str, url: s
                 created_at=timezone.now(),
             )
             for user in users
-        ]
+        ],
+        batch_size=NOTIFICATION_BATCH_SIZE,
+    )
+
+
+def _audience_user_ids(audience, group=None, actor=None) -> list[int]:
+    if audience == NotificacionDifundida.Audiencia.PERSONAL:
+        users = get_staff_notifiable_users()
+    else:
+        users = User.objects.filter(groups=group)
+    if actor is not None:
+        users = users.exclude(pk=actor.pk)
+    return list(users.values_list("pk", flat=True))
+
+
+def create_broadcast(
+    notification_type: str,
+    message: str,
+    url: str,
+    actor=None,
+    group=None,
+) -> NotificacionDifundida:
+    """
+    Crea una notificación difundida para el personal de soporte o, con ``group``, para un rol.
+
+    Es una sola fila sin importar el tamaño de la audiencia. El actor no la
+    recibe.
+    """
+
+    audience = NotificacionDifundida.Audiencia.GRUPO if group else NotificacionDifundida.Audiencia.PERSONAL
+    with transaction.atomic():
+        broadcast = NotificacionDifundida.objects.create(
+            audiencia=audience,
+            grupo=group,
+            actor=actor,
+            type=notification_type,
+            message=message,
+            url=url,
+        )
+        user_ids = _audience_user_ids(audience, group, actor)
+        _add_unread({user_id: 1 for user_id in user_ids})
+    avisar_cambio_notificaciones(user_ids)
+    return broadcast
+
+
+def broadcasts_for(user) -> QuerySet:
+    """Notificaciones difundidas cuya audiencia incluye a ``user``, sin las que él mismo originó."""
+
+    audience = Q(audiencia=NotificacionDifundida.Audiencia.GRUPO, grupo__in=user.groups.values("pk"))
+    if user.is_staff or user.is_superuser:
+        audience |= Q(audiencia=NotificacionDifundida.Audiencia.PERSONAL)
+    return NotificacionDifundida.objects.filter(audience).exclude(actor=user)
+
+
+def _broadcast_cursor(user) -> int:
+    return (
+        CursorNotificaciones.objects.filter(user=user)
+        .values_list("difundidas_leidas_hasta", flat=True)
+        .first()
+        or 0
+    )
+
+
+def _unread_broadcasts(user, cursor=None) -> QuerySet:
+    cursor = _broadcast_cursor(user) if cursor is None else cursor
+    return broadcasts_for(user).filter(id__gt=cursor).exclude(
+        id__in=DifundidaLeida.objects.filter(user=user).values("notificacion_id")
+    )
+
+
+def _locked_cursor(user) -> CursorNotificaciones:
+    CursorNotificaciones.objects.get_or_create(user=user)
+    return CursorNotificaciones.objects.select_for_update().get(user=user)
+
+
+def _advance_cursor(user, cursor: CursorNotificaciones, up_to: int) -> None:
+    if up_to > cursor.difundidas_leidas_hasta:
+        cursor.difundidas_leidas_hasta = up_to
+        cursor.save(update_fields=["difundidas_leidas_hasta"])
+    DifundidaLeida.objects.filter(user=user, notificacion_id__lte=cursor.difundidas_leidas_hasta).delete()
+
+
+def mark_broadcast_as_read(user, broadcast_id: int) -> int:
+    """Marca como leída una notificación difundida para ``user``; devuelve 1 si cambió."""
+
+    with transaction.atomic():
+        if not broadcasts_for(user).filter(id=broadcast_id).exists():
+            return 0
+        cursor = _locked_cursor(user)
+        if broadcast_id <= cursor.difundidas_leidas_hasta:
+            return 0
+        _, created = DifundidaLeida.objects.get_or_create(user=user, notificacion_id=broadcast_id)
+        if not created:
+            return 0
+        _add_unread({user.pk: -1})
+        # El cursor sube hasta justo antes de la primera difundida aún sin leer.
+        first_unread = (
+            _unread_broadcasts(user, cursor.difundidas_leidas_hasta)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if first_unread is None:
+            first_unread = (broadcasts_for(user).aggregate(last=Max("id"))["last"] or 0) + 1
+        _advance_cursor(user, cursor, first_unread - 1)
+    avisar_cambio_notificaciones([user.pk])
+    return 1
+
+
+def recount_unread(user) -> None:
+    """Recalcula el contador de no leídas de ``user`` desde sus notificaciones y difundidas."""
+
+    with transaction.atomic():
+        unread = Notification.objects.filter(user=user, is_read=False).count() + _unread_broadcasts(user).count()
+        ResumenNotificaciones.objects.update_or_create(user=user, defaults={"no_leidas": unread})
+    avisar_cambio_notificaciones([user.pk])
+
+
+def reset_broadcast_cursor(user) -> None:
+    """
+    Da por leídas para ``user`` las difundidas existentes y recalcula su contador.
+
+    Se usa cuando el usuario pasa a formar parte del personal: como una cuenta
+    nueva, no hereda como pendientes las difusiones anteriores.
+    """
+
+    with transaction.atomic():
+        cursor = _locked_cursor(user)
+        _advance_cursor(user, cursor, NotificacionDifundida.objects.aggregate(last=Max("id"))["last"] or 0)
+        recount_unread(user)
+
+
+def mark_as_read(user, notification_ids) -> int:
+    """Marca como leídas las notificaciones indicadas de ``user``; devuelve cuántas cambiaron."""
+
+    with transaction.atomic():
+        updated = Notification.objects.filter(
+            user=user, id__in=notification_ids, is_read=False
+        ).update(is_read=True)
+        _add_unread({user.pk: -updated})
+    if updated:
+        avisar_cambio_notificaciones([user.pk])
+    return updated
+
+
+def mark_all_as_read(user) -> int:
+    """Marca como leídas todas las notificaciones de ``user``; devuelve cuántas cambiaron."""
+
+    with transaction.atomic():
+        updated = Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+        cursor = _locked_cursor(user)
+        unread = _unread_broadcasts(user, cursor.difundidas_leidas_hasta)
+        # Difundidas creadas en paralelo con id mayor quedan sin leer, como corresponde.
+        last = unread.aggregate(last=Max("id"))["last"]
+        if last is not None:
+            updated += unread.filter(id__lte=last).count()
+            _advance_cursor(user, cursor, last)
+        _add_unread({user.pk: -updated})
+    if updated:
+        avisar_cambio_notificaciones([user.pk])
+    return updated
+
+
+def unread_count(user) -> int:
+    """Notificaciones sin leer de ``user`` según su contador (sin COUNT sobre las notificaciones)."""
+
+    return (
+        ResumenNotificaciones.objects.filter(user=user).values_list("no_leidas", flat=True).first()
+        or 0
+    )
+
+
+def _pending_broadcasts(**audience) -> Coalesce:
+    """Difundidas sin leer del usuario de la consulta externa, como subconsulta COUNT."""
+
+    pending = (
+        NotificacionDifundida.objects.filter(
+            id__gt=Coalesce(OuterRef("cursor_notificaciones__difundidas_leidas_hasta"), 0), **audience
+        )
+        .exclude(actor=OuterRef("pk"))
+        .exclude(Exists(DifundidaLeida.objects.filter(user=OuterRef(OuterRef("pk")), notificacion=OuterRef("pk"))))
+        .order_by()
+        .values("audiencia")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    return Coalesce(Subquery(pending, output_field=IntegerField()), 0)
+
+
+def reconcile_unread_counts() -> int:
+    """
+    Recalcula los contadores de no leídas desde las notificaciones.
+
+    Corrige los que derivaron (por ejemplo, cambios hechos desde el admin) y
+    devuelve cuántos usuarios cambiaron.
+    """
+
+    actual = Counter(
+        dict(
+            Notification.objects.filter(is_read=False)
+            .values("user_id")
+            .annotate(total=Count("id"))
+            .order_by()
+            .values_list("user_id", "total")
+        )
+    )
+    # Una sola consulta: cada usuario de la audiencia con sus difundidas pendientes tras su cursor.
+    audience = (
+        User.objects.filter(
+            Q(is_staff=True) | Q(is_superuser=True) | Q(groups__notificaciones_difundidas__isnull=False)
+        )
+        .distinct()
+        .annotate(
+            broadcasts=_pending_broadcasts(audiencia=NotificacionDifundida.Audiencia.GRUPO, grupo__user=OuterRef("pk"))
+            + Case(
+                When(Q(is_staff=True) | Q(is_superuser=True),
+                     then=_pending_broadcasts(audiencia=NotificacionDifundida.Audiencia.PERSONAL)),
+                default=Value(0),
+            )
+        )
+        .filter(broadcasts__gt=0)
+        .values_list("pk", "broadcasts")
+    )
+    for user_id, unread in audience:
+        actual[user_id] += unread
+    with transaction.atomic():
+        ResumenNotificaciones.objects.bulk_create(
+            [ResumenNotificaciones(user_id=user_id) for user_id in actual],
+            ignore_conflicts=True,
+        )
+        fixed = []
+        for summary in ResumenNotificaciones.objects.select_for_update():
+            total = actual.get(summary.user_id, 0)
+            if summary.no_leidas != total:
+                summary.no_leidas = total
+                fixed.append(summary)
+        ResumenNotificaciones.objects.bulk_update(fixed, ["no_leidas"])
+    avisar_cambio_notificaciones(summary.user_id for summary in fixed)
+    return len(fixed)
+
+
+def unread_summary(user, limit: int = 10) -> dict:
+    """Cantidad de notificaciones sin leer y las más recientes, listas para JSON."""
+
+    personal = Notification.objects.filter(user=user, is_read=False).order_by("-created_at")[:limit]
+    broadcasts = _unread_broadcasts(user).order_by("-created_at")[:limit]
+    latest = sorted([*personal, *broadcasts], key=lambda notif: notif.created_at, reverse=True)[:limit]
+    return {
+        "count": unread_count(user),
+        "notifications": [
+            {
+                "id": notif.id,
+                "message": notif.message,
+                "url": notification_link(notif),
+                "created_at": notif.created_at.strftime("%d/%m/%Y %H:%M"),
+                "broadcast": isinstance(notif, NotificacionDifundida),
+            }
+            for notif in latest
+        ],
+    }
+
+
+def page_key(notification) -> tuple:
+    """Posición de una notificación en el listado: ``(created_at, clase, id)``, clase 1 = difundida."""
+
+    return (
+        notification.created_at,
+        int(isinstance(notification, NotificacionDifundida)),
+        notification.id,
+    )
+
+
+def _after_key(kind: int, key) -> Q:
+    """Filas de la clase ``kind`` que van después de ``key`` en orden descendente."""
+
+    created_at, key_kind, key_id = key
+    same_instant = Q(created_at=created_at, id__lt=key_id) if kind == key_kind else Q(created_at=created_at)
+    if kind > key_kind:
+        return Q(created_at__lt=created_at)
+    return Q(created_at__lt=created_at) | same_instant
+
+
+def notifications_for(user, limit: int = 20, after=None) -> tuple[list, tuple | None]:
+    """
+    Una página de notificaciones personales y difundidas de ``user``, de la más reciente a la más antigua.
+
+    ``after`` es el ``page_key`` de la última notificación de la página
+    anterior. Cada fuente aporta a lo sumo ``limit + 1`` filas por su índice,
+    sin importar cuánto historial tenga el usuario. Devuelve las notificaciones,
+    cada una con ``is_read`` (en las difundidas, calculado desde el cursor), y
+    el ``page_key`` para pedir la página siguiente, o ``None`` si no hay más.
+    """
+
+    personal = Notification.objects.filter(user=user)
+    broadcasts = broadcasts_for(user)
+    if after is not None:
+        personal = personal.filter(_after_key(0, after))
+        broadcasts = broadcasts.filter(_after_key(1, after))
+    broadcasts = list(broadcasts.order_by("-created_at", "-id")[:limit + 1])
+    if broadcasts:
+        cursor = _broadcast_cursor(user)
+        read_above_cursor = set(
+            DifundidaLeida.objects.filter(user=user, notificacion__in=broadcasts).values_list(
+                "notificacion_id", flat=True
+            )
+        )
+        for broadcast in broadcasts:
+            broadcast.is_read = broadcast.id <= cursor or broadcast.id in read_above_cursor
+    merged = sorted(
+        [*personal.order_by("-created_at", "-id")[:limit + 1], *broadcasts],
+        key=page_key,
+        reverse=True,
     )
+    page = merged[:limit]
+    next_key = page_key(page[-1]) if len(merged) > limit else None
+    return page, next_key
 
 
-def notification_link(notification: Notification) -> str:
+def notification_link(notification: Notification | NotificacionDifundida) -> str:
     """Devuelve la URL de la notificación con el parámetro para marcarla como leída."""
 
     if not notification.url:
         return ""
 
+    param = "difusion_id" if isinstance(notification, NotificacionDifundida) else "notif_id"
     split = urlsplit(notification.url)
     query = dict(parse_qsl(split.query))
-    query["notif_id"] = str(notification.id)
+    query[param] = str(notification.id)
     new_query = urlencode(query)
     return urlunsplit((split.scheme, split.netloc, split.path, new_query, split.fragment))
 
@@ -1,4 +1,5 @@
 import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
@@ -12,6 +13,14 @@ image_file_validator = FileExtensionValidator(
 )
 
 
+def time_zone_validator(value):
+    """Valida que el valor sea una zona horaria IANA conocida."""
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(_("Zona horaria desconocida: %(zona)s"), params={"zona": value})
+
+
 class StrongPasswordValidator:
     """Custom validator to enforce strong passwords with multiple character sets."""
 
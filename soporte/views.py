@@ -1,22 +1,31 @@
 # soporte/views.py
 
+import asyncio
+import copy
 import csv
+import hashlib
+import json
 import logging
 from collections import defaultdict
+from time import perf_counter
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib import messages # <--- IMPORTACIÓN AÑADIDA
 from django.contrib.auth import get_user_model, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.models import Group, Permission
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
 from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
-from django.db.models import Avg, Count, Max, ProtectedError, Q
-from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.db.models import Avg, Count, DateTimeField, F, IntegerField, Max, ProtectedError, Q
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 
 from .forms import (
     AreaForm,
@@ -28,16 +37,47 @@ from .forms import (
     UserCreateForm,
     UserUpdateForm,
 )
-from .models import Adjunto, Area, Comment, Notification, PerfilUsuario, Prioridad, Ticket, TicketHistory
-from .services import log_attachment, log_history, update_ticket
+from .models import (
+    Adjunto,
+    Area,
+    Comment,
+    PerfilUsuario,
+    Prioridad,
+    Ticket,
+    TicketHistory,
+    TicketListado,
+    TicketVersionConflict,
+)
+from . import catalogos
+from .asignacion import asignar_tecnico
+from .avisos import DURACION_STREAM_AVISOS, INTERVALO_AVISOS, LATIDO_AVISOS, aversion_avisos, version_avisos
+from .busqueda import buscar_tickets
+from .busqueda_aproximada import buscar_aproximado
+from .conteos import clave_conteo, obtener_conteo
+from .facetas import facetas_cacheadas, filtrar_tickets
+from .services import history_batch, log_attachment, log_history, update_ticket
+from .paginacion import (
+    PaginadorConConteo,
+    codificar_cursor,
+    contar_aproximado,
+    decodificar_cursor,
+    paginar_keyset,
+)
+from .posproceso import registrar_posproceso
+from .tasks import encolar_posproceso_ticket, encolar_recalculo_sla
 from .utils.permissions import (
     get_app_verbose_name,
     spanish_permission_label,
 )
 from .utils.notifications import (
+    create_broadcast,
     create_notification,
-    get_staff_notifiable_users,
+    mark_all_as_read,
+    mark_as_read,
+    mark_broadcast_as_read,
     notification_link,
+    notifications_for,
+    unread_summary,
 )
 
 # Importaciones para PDF
@@ -47,6 +87,40 @@ from django.template.loader import get_template
 logger = logging.getLogger(__name__)
 
 PAGE_SIZE_TICKETS = getattr(settings, "TICKETS_PER_PAGE", 6)
+LIMITE_JSON_TICKETS = 100
+LIMITE_SUGERENCIAS = 8
+PAGE_SIZE_NOTIFICACIONES = getattr(settings, "NOTIFICACIONES_POR_PAGINA", 20)
+# Valores de ``page_key``: fecha, clase (0 personal, 1 difundida) e id.
+CAMPOS_CURSOR_NOTIFICACIONES = [DateTimeField(), IntegerField(), IntegerField()]
+# Comentarios e historial que muestra el detalle de entrada; ``?completo=1`` los trae todos.
+LIMITE_COMENTARIOS_DETALLE = getattr(settings, "DETALLE_LIMITE_COMENTARIOS", 30)
+LIMITE_HISTORIAL_DETALLE = getattr(settings, "DETALLE_LIMITE_HISTORIAL", 30)
+
+# Nombre público en la API JSON -> columna de ``TicketListado``.
+CAMPOS_JSON_TICKETS = {
+    'id': 'ticket_id',
+    'titulo': 'titulo',
+    'estado': 'estado',
+    'prioridad': 'prioridad_clave',
+    'prioridad_nombre': 'prioridad_nombre',
+    'solicitante': 'solicitante_nombre',
+    'solicitante_critico': 'solicitante_critico',
+    'tecnico': 'tecnico_nombre',
+    'area': 'area_nombre',
+    'categoria': 'categoria',
+    'estado_sla': 'estado_sla',
+    'fecha_compromiso_respuesta': 'fecha_compromiso_respuesta',
+    'fecha_creacion': 'fecha_creacion',
+    'fecha_cierre': 'fecha_cierre',
+    'total_comentarios': 'total_comentarios',
+    'total_adjuntos': 'total_adjuntos',
+    'ultima_actividad': 'ultima_actividad',
+}
+CAMPOS_JSON_POR_DEFECTO = ['id', 'titulo', 'estado', 'prioridad', 'solicitante', 'tecnico', 'fecha_creacion']
+MENSAJE_CONFLICTO_TICKET = (
+    "Otra persona modificó el ticket mientras lo editabas. "
+    "Revisa los cambios actuales y vuelve a intentarlo."
+)
 User = get_user_model()
 
 
@@ -80,27 +154,44 @@ def es_personal_sla(user):
 
 def _obtener_ticket_autorizado(request, ticket_id):
     """Devuelve el ticket si el usuario tiene permisos para verlo."""
-    ticket = get_object_or_404(Ticket, id=ticket_id)
-    if not request.user.is_staff and ticket.solicitante != request.user:
+    ticket = get_object_or_404(
+        Ticket.objects.select_related('solicitante', 'tecnico_asignado', 'prioridad', 'area_funcional'),
+        id=ticket_id,
+    )
+    if not request.user.is_staff and ticket.solicitante_id != request.user.id:
         return None
     return ticket
 
 
+def _version_enviada(request):
+    """Versión del ticket que el usuario tenía en pantalla al enviar el formulario."""
+    try:
+        return int(request.POST.get('version'))
+    except (TypeError, ValueError):
+        return None
+
+
 def _comentarios_ticket(ticket, orden='-created_at'):
     """Retorna los comentarios de un ticket en el orden especificado."""
-    return Comment.objects.filter(ticket=ticket).order_by(orden)
+    return Comment.objects.filter(ticket=ticket).select_related('author').order_by(orden)
 
 
-def _mark_notification_as_read(request, notif_id):
-    if not notif_id:
-        return
+def _acotar(queryset, limite):
+    """Primeros ``limite`` elementos y si quedaron otros fuera (una sola consulta)."""
+    if limite is None:
+        return list(queryset), False
+    elementos = list(queryset[:limite + 1])
+    return elementos[:limite], len(elementos) > limite
+
+
+def _mark_notification_as_read(request, notif_id, difusion_id=None):
     try:
-        notif_obj = Notification.objects.get(id=notif_id, user=request.user)
-    except Notification.DoesNotExist:
+        if notif_id:
+            mark_as_read(request.user, [int(notif_id)])
+        if difusion_id:
+            mark_broadcast_as_read(request.user, int(difusion_id))
+    except ValueError:
         return
-    if not notif_obj.is_read:
-        notif_obj.is_read = True
-        notif_obj.save(update_fields=['is_read'])
     
 # --- VISTAS PRINCIPALES ---
 @login_required
@@ -116,100 +207,200 @@ def inicio(request):
 
 @login_required
 def notificaciones_unread(request):
-    qs = Notification.objects.filter(user=request.user, is_read=False)
-    recientes = qs.order_by('-created_at')[:10]
-    data = {
-        "count": qs.count(),
-        "notifications": [
-            {
-                "id": notif.id,
-                "message": notif.message,
-                "url": notification_link(notif),
-                "created_at": notif.created_at.strftime("%d/%m/%Y %H:%M"),
-            }
-            for notif in recientes
-        ],
-    }
-    return JsonResponse(data)
+    """
+    Resumen de notificaciones sin leer.
+
+    El ETag es la versión de las notificaciones del usuario en la caché: si el
+    cliente ya la tiene, se responde 304 sin consultar la base.
+    """
+    etag = f'"{version_avisos(request.user.pk)}"'
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = JsonResponse(unread_summary(request.user))
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+
+async def _eventos_notificaciones(user, ultima_version=None):
+    """
+    Eventos SSE con el resumen de notificaciones de ``user``.
+
+    En cada vuelta solo se lee la versión de sus notificaciones en la caché;
+    la base se consulta cuando esa versión cambia. Se envía un comentario de
+    latido cada ``LATIDO_AVISOS`` segundos para que los proxies no corten la
+    conexión, y el stream termina tras ``DURACION_STREAM_AVISOS`` segundos.
+    """
+    yield f"retry: {INTERVALO_AVISOS * 1000}\n\n"
+    inicio = ultimo_envio = perf_counter()
+    while perf_counter() - inicio < DURACION_STREAM_AVISOS:
+        version = await aversion_avisos(user.pk)
+        if version != ultima_version:
+            datos = await sync_to_async(unread_summary)(user)
+            ultima_version = version
+            ultimo_envio = perf_counter()
+            yield f"id: {version}\nevent: notificaciones\ndata: {json.dumps(datos)}\n\n"
+        elif perf_counter() - ultimo_envio >= LATIDO_AVISOS:
+            ultimo_envio = perf_counter()
+            yield ": latido\n\n"
+        await asyncio.sleep(INTERVALO_AVISOS)
+
+
+@login_required
+async def notificaciones_stream(request):
+    """
+    Stream SSE de notificaciones sin leer.
+
+    Requiere el servidor ASGI (``tickets/asgi.py``); bajo WSGI responde 204,
+    con lo que ``EventSource`` deja de reconectar y la página vuelve a
+    consultar ``notificaciones_unread`` periódicamente.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = await request.auser()
+    respuesta = StreamingHttpResponse(
+        _eventos_notificaciones(user, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream',
+    )
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
 
 
 @login_required
 def lista_notificaciones(request):
-    notifications_qs = Notification.objects.filter(user=request.user).order_by('-created_at')
+    despues = request.GET.get('despues')
+    if despues:
+        despues = decodificar_cursor(despues, CAMPOS_CURSOR_NOTIFICACIONES)
+    pagina, siguiente = notifications_for(request.user, limit=PAGE_SIZE_NOTIFICACIONES, after=despues or None)
     notifications = [
         {
             "obj": notif,
             "link": notification_link(notif),
         }
-        for notif in notifications_qs
+        for notif in pagina
     ]
-    context = {"notifications": notifications}
+    context = {
+        "notifications": notifications,
+        "cursor_siguiente": codificar_cursor(siguiente) if siguiente else None,
+        "es_primera_pagina": not despues,
+    }
     return render(request, "soporte/notificaciones_list.html", context)
 
+
 @login_required
-def home(request):
-    tickets_list = Ticket.objects.all()
+def marcar_notificaciones_leidas(request):
+    if request.method == 'POST':
+        mark_all_as_read(request.user)
+    return redirect('lista_notificaciones')
+
+ORDEN_LISTADO = {
+    'prioridad': F('prioridad_orden'),
+    'estado': F('estado'),
+    'solicitante': F('solicitante_nombre'),
+    'tecnico': F('tecnico_nombre'),
+    'fecha_creacion': F('fecha_creacion'),
+}
+
+
+def _filtros_listado(request):
+    """Alcance del usuario, filtros de la URL y clave de alcance para los conteos."""
+    alcance = TicketListado.objects.all()
     if not request.user.is_staff:
-        tickets_list = tickets_list.filter(solicitante=request.user)
+        alcance = alcance.filter(solicitante=request.user)
+    filtros = {
+        'estado': request.GET.get('estado'),
+        'prioridad': request.GET.get('prioridad'),
+        'tecnico': request.GET.get('tecnico') if request.user.is_staff else None,
+        'search': request.GET.get('search') or request.GET.get('q'),
+    }
+    alcance_conteo = 'staff' if request.user.is_staff else f'usuario:{request.user.pk}'
+    return alcance, filtros, alcance_conteo
+
+
+def _tickets_listado(request):
+    """Tickets filtrados del listado y su orden como lista de ``(expresión, descendente)``."""
+    alcance, filtros, _ = _filtros_listado(request)
+    tickets = filtrar_tickets(alcance, filtros, excluir=('search',))
+    if filtros['search']:
+        tickets = buscar_tickets(tickets, filtros['search'])
+
+    sort = request.GET.get('sort')
+    direction = request.GET.get('dir', 'asc')
+    # El id final desempata y hace que los cursores de la paginación por
+    # keyset sean estables.
+    orden = [(F('solicitante_critico'), True)]
+    if sort in ORDEN_LISTADO:
+        orden.append((ORDEN_LISTADO[sort], direction == 'desc'))
+        orden.append((F('fecha_creacion'), True))
+    elif filtros['search']:
+        orden.extend([(F('relevancia'), True), (F('fecha_creacion'), True)])
+    else:
+        orden.extend([(F('prioridad_orden'), False), (F('fecha_creacion'), True)])
+    orden.append((F('ticket_id'), True))
+    return tickets, orden
+
+
+@login_required
+def home(request):
+    alcance, filtros, alcance_conteo = _filtros_listado(request)
+    tickets, orden = _tickets_listado(request)
     estado_filter = request.GET.get('estado')
-    if estado_filter:
-        tickets_list = tickets_list.filter(estado=estado_filter)
     prioridad_filter = request.GET.get('prioridad')
-    if prioridad_filter:
-        tickets_list = tickets_list.filter(prioridad__clave=prioridad_filter)
     tecnico_filter = request.GET.get('tecnico')
-    if request.user.is_staff and tecnico_filter:
-        tickets_list = tickets_list.filter(tecnico_asignado__username=tecnico_filter)
-    search_query = request.GET.get('search') or request.GET.get('q')
-    if search_query:
-        tickets_list = tickets_list.filter(Q(titulo__icontains=search_query) | Q(descripcion__icontains=search_query))
-    tickets = tickets_list.select_related('prioridad', 'solicitante', 'tecnico_asignado', 'area_funcional')
-
+    search_query = filtros['search']
     sort = request.GET.get('sort')
     direction = request.GET.get('dir', 'asc')
-    sort_map = {
-        'prioridad': 'prioridad__orden',
-        'estado': 'estado',
-        'solicitante': 'solicitante__username',
-        'tecnico': 'tecnico_asignado__username',
-        'fecha_creacion': 'fecha_creacion',
-    }
 
-    order_by_fields = ['-solicitante_critico']
-    if sort in sort_map:
-        order_field = sort_map[sort]
-        if direction == 'desc':
-            order_field = '-' + order_field
-        order_by_fields.append(order_field)
-        order_by_fields.append('-fecha_creacion')
-    else:
-        order_by_fields.extend(['prioridad__orden', '-fecha_creacion'])
-
-    tickets = tickets.order_by(*order_by_fields)
+    params = request.GET.copy()
+    for param in ['page', 'cursor', 'antes']:
+        params.pop(param, None)
+    preserve_qs = params.urlencode()
 
-    page = request.GET.get('page', 1)
-    paginator = Paginator(tickets, PAGE_SIZE_TICKETS)
-    try:
-        page_obj = paginator.page(page)
-    except PageNotAnInteger:
-        page_obj = paginator.page(1)
-    except EmptyPage:
-        page_obj = paginator.page(paginator.num_pages or 1)
+    facetas = ('estado', 'prioridad', 'tecnico') if request.user.is_staff else ('estado', 'prioridad')
+
+    page = request.GET.get('page')
+    keyset = page is None
+    if keyset:
+        page_obj = paginar_keyset(
+            tickets,
+            orden,
+            PAGE_SIZE_TICKETS,
+            despues=request.GET.get('cursor'),
+            antes=request.GET.get('antes'),
+        )
+        total_tickets, total_exacto = obtener_conteo(
+            clave_conteo('home_aproximado', alcance_conteo, filtros),
+            lambda: contar_aproximado(tickets),
+        )
+        paginator = None
+    else:
+        # Modo por número de página, conservado para enlaces existentes (?page=N).
+        tickets = tickets.order_by(*[expr.desc() if desc else expr.asc() for expr, desc in orden])
+        conteo = obtener_conteo(
+            clave_conteo('home', alcance_conteo, filtros),
+            tickets.count,
+        )
+        paginator = PaginadorConConteo(tickets, PAGE_SIZE_TICKETS, conteo)
+        try:
+            page_obj = paginator.page(page)
+        except PageNotAnInteger:
+            page_obj = paginator.page(1)
+        except EmptyPage:
+            page_obj = paginator.page(paginator.num_pages or 1)
+        total_tickets, total_exacto = paginator.count, True
 
     base_querydict = request.GET.copy()
-    for param in ['sort', 'dir']:
+    for param in ['sort', 'dir', 'page', 'cursor', 'antes']:
         if param in base_querydict:
             base_querydict.pop(param)
     base_query = base_querydict.urlencode()
 
-    params = request.GET.copy()
-    params.pop('page', None)
-    preserve_qs = params.urlencode()
     context = {
         "tickets": page_obj.object_list,
         "estados": Ticket.ESTADO_CHOICES,
-        "prioridades": Prioridad.objects.order_by("orden", "nombre"),
-        "tecnicos": User.objects.filter(is_staff=True),
+        "prioridades": catalogos.prioridades(),
+        "tecnicos": catalogos.usuarios_staff(),
         "selected_estado": estado_filter,
         "selected_prioridad": prioridad_filter,
         "selected_tecnico": tecnico_filter,
@@ -221,28 +412,115 @@ def home(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "is_paginated": page_obj.has_other_pages(),
+        "keyset": keyset,
+        "facetas": facetas_cacheadas(alcance, alcance_conteo, filtros, facetas),
+        "total_tickets": total_tickets,
+        "total_exacto": total_exacto,
         "preserve_qs": preserve_qs,
     }
     return render(request, "soporte/home.html", context)
 
+@login_required
+def facetas_tickets(request):
+    """Conteos por estado, prioridad y técnico para los filtros activos del listado."""
+    alcance, filtros, alcance_conteo = _filtros_listado(request)
+    facetas = ('estado', 'prioridad', 'tecnico') if request.user.is_staff else ('estado', 'prioridad')
+    return JsonResponse(facetas_cacheadas(alcance, alcance_conteo, filtros, facetas))
+
+@login_required
+def tickets_json(request):
+    """
+    Listado de tickets en JSON con los mismos filtros y orden que ``home``.
+
+    ``fields`` elige las columnas (separadas por coma), ``limite`` el tamaño de
+    página y ``cursor``/``antes`` navegan como en el listado. El ETag es un
+    resumen de la página proyectada, así que el cliente puede revalidar con
+    ``If-None-Match`` y recibir un 304.
+    """
+    campos = [campo.strip() for campo in request.GET.get('fields', '').split(',') if campo.strip()]
+    campos = campos or CAMPOS_JSON_POR_DEFECTO
+    desconocidos = [campo for campo in campos if campo not in CAMPOS_JSON_TICKETS]
+    if desconocidos:
+        return JsonResponse({'error': f"Campos desconocidos: {', '.join(desconocidos)}"}, status=400)
+    try:
+        limite = min(max(int(request.GET.get('limite', PAGE_SIZE_TICKETS)), 1), LIMITE_JSON_TICKETS)
+    except ValueError:
+        limite = PAGE_SIZE_TICKETS
+
+    tickets, orden = _tickets_listado(request)
+    columnas = {CAMPOS_JSON_TICKETS[campo] for campo in campos}
+    pagina = paginar_keyset(
+        tickets.values(*columnas),
+        orden,
+        limite,
+        despues=request.GET.get('cursor'),
+        antes=request.GET.get('antes'),
+    )
+    contenido = json.dumps(
+        {
+            'results': [
+                {campo: fila[CAMPOS_JSON_TICKETS[campo]] for campo in campos}
+                for fila in pagina
+            ],
+            'cursor_siguiente': pagina.cursor_siguiente,
+            'cursor_anterior': pagina.cursor_anterior,
+        },
+        cls=DjangoJSONEncoder,
+    )
+    etag = f'"{hashlib.sha256(contenido.encode()).hexdigest()[:32]}"'
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(contenido, content_type='application/json')
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+@login_required
+def sugerencias_tickets(request):
+    """
+    Sugerencias de tickets mientras se escribe, tolerantes a errores de tipeo.
+
+    ``q`` es el texto buscado; se respetan el alcance del usuario y los
+    filtros de estado, prioridad y técnico del listado.
+    """
+    alcance, filtros, _ = _filtros_listado(request)
+    tickets = filtrar_tickets(alcance, filtros, excluir=('search',))
+    resultados = buscar_aproximado(
+        tickets,
+        request.GET.get('q', ''),
+        limite=LIMITE_SUGERENCIAS,
+        campos=('ticket_id', 'titulo', 'estado'),
+    )
+    return JsonResponse({
+        'results': [
+            {
+                'id': fila['ticket_id'],
+                'titulo': fila['titulo'],
+                'estado': fila['estado'],
+                'similitud': fila['similitud'],
+                'url': reverse('detalle_ticket', args=[fila['ticket_id']]),
+            }
+            for fila in resultados
+        ]
+    })
+
 @login_required
 def detalle_ticket(request, ticket_id):
-    _mark_notification_as_read(request, request.GET.get('notif_id'))
+    _mark_notification_as_read(request, request.GET.get('notif_id'), request.GET.get('difusion_id'))
     ticket = _obtener_ticket_autorizado(request, ticket_id)
     if ticket is None:
         return redirect('home_tickets')
-    comments = _comentarios_ticket(ticket)
     form_acciones = TechTicketForm(instance=ticket)
     comment_form = CommentForm()
-    historial = ticket.historial.select_related('actor').all()
     sla_deadline = getattr(ticket, 'fecha_compromiso_respuesta', None)
     sla_time_left = sla_deadline - timezone.now() if sla_deadline else None
-    adjuntos = ticket.adjuntos.all() if hasattr(ticket, 'adjuntos') else []
     if request.method == "POST":
         if 'tech_form_submit' in request.POST:
             if not request.user.is_staff:
                 return HttpResponseForbidden()
-            form_acciones = TechTicketForm(request.POST, instance=ticket)
+            # El formulario trabaja sobre una copia: así update_ticket compara
+            # contra los valores originales y registra el historial correcto.
+            form_acciones = TechTicketForm(request.POST, instance=copy.copy(ticket))
             if form_acciones.is_valid():
                 estado_anterior = ticket.estado
                 tecnico_anterior = ticket.tecnico_asignado
@@ -255,7 +533,11 @@ def detalle_ticket(request, ticket_id):
                 if 'tecnico_asignado' in cleaned:
                     changes['assignee'] = cleaned.get('tecnico_asignado')
                 comment = request.POST.get('comentario', '').strip() or None
-                update_ticket(ticket, request.user, changes, comment)
+                try:
+                    update_ticket(ticket, request.user, changes, comment, expected_version=_version_enviada(request))
+                except TicketVersionConflict:
+                    messages.error(request, MENSAJE_CONFLICTO_TICKET)
+                    return redirect('detalle_ticket', ticket_id=ticket.id)
                 messages.success(request, "Ticket actualizado.")
                 detalle_url = reverse('detalle_ticket', args=[ticket.id])
                 if ticket.estado != estado_anterior:
@@ -277,7 +559,11 @@ def detalle_ticket(request, ticket_id):
                 return redirect('detalle_ticket', ticket_id=ticket.id)
         elif 'cerrar_ticket_submit' in request.POST and request.user.is_staff:
             estado_anterior = ticket.estado
-            update_ticket(ticket, request.user, {'status': 'cerrado'})
+            try:
+                update_ticket(ticket, request.user, {'status': 'cerrado'}, expected_version=_version_enviada(request))
+            except TicketVersionConflict:
+                messages.error(request, MENSAJE_CONFLICTO_TICKET)
+                return redirect('detalle_ticket', ticket_id=ticket.id)
             messages.success(request, "Ticket actualizado.")
             detalle_url = reverse('detalle_ticket', args=[ticket.id])
             if ticket.estado != estado_anterior:
@@ -295,38 +581,42 @@ def detalle_ticket(request, ticket_id):
                 new_comment = comment_form.save(commit=False)
                 new_comment.ticket = ticket
                 new_comment.author = request.user
-                new_comment.save()
-                update_ticket(ticket, request.user, {}, comment=new_comment.text)
-                if new_comment.adjunto:
-                    log_attachment(ticket, request.user, new_comment.adjunto)
+                with history_batch() as historial:
+                    new_comment.save()
+                    update_ticket(ticket, request.user, {}, comment=new_comment.text, batch=historial)
+                    if new_comment.adjunto:
+                        log_attachment(ticket, request.user, new_comment.adjunto, batch=historial)
                 detalle_url = reverse('detalle_ticket', args=[ticket.id])
+                mensaje = f"{request.user.username} comentó el ticket #{ticket.id}: {ticket.titulo}"
                 if request.user.is_staff:
                     destinatarios = [ticket.solicitante] if ticket.solicitante != request.user else []
+                    create_notification('ticket_commented', destinatarios, mensaje, detalle_url, actor=request.user)
+                elif ticket.tecnico_asignado and ticket.tecnico_asignado != request.user:
+                    create_notification(
+                        'ticket_commented', ticket.tecnico_asignado, mensaje, detalle_url, actor=request.user
+                    )
                 else:
-                    destinatarios = []
-                    if ticket.tecnico_asignado and ticket.tecnico_asignado != request.user:
-                        destinatarios.append(ticket.tecnico_asignado)
-                    else:
-                        destinatarios.extend(
-                            [
-                                user
-                                for user in get_staff_notifiable_users()
-                                if user != request.user
-                            ]
-                        )
-                create_notification(
-                    'ticket_commented',
-                    destinatarios,
-                    f"{request.user.username} comentó el ticket #{ticket.id}: {ticket.titulo}",
-                    detalle_url,
-                    actor=request.user,
-                )
+                    # Sin técnico asignado avisa a todo el personal con una sola fila.
+                    create_broadcast('ticket_commented', mensaje, detalle_url, actor=request.user)
                 return redirect('detalle_ticket', ticket_id=ticket.id)
+    # Comentarios e historial se acotan para que el costo de la página no
+    # crezca con la vida del ticket.
+    completo = request.GET.get('completo') == '1'
+    comments, comentarios_truncados = _acotar(
+        _comentarios_ticket(ticket), None if completo else LIMITE_COMENTARIOS_DETALLE
+    )
+    historial, historial_truncado = _acotar(
+        ticket.historial.select_related('actor').order_by('-created_at', '-id'),
+        None if completo else LIMITE_HISTORIAL_DETALLE,
+    )
+    adjuntos = ticket.adjuntos.select_related('subido_por').order_by('fecha_subida')
     context = {
         'ticket': ticket, 'comments': comments,
+        'comentarios_truncados': comentarios_truncados,
         'comment_form': comment_form,
         'form_acciones': form_acciones,
         'historial': historial,
+        'historial_truncado': historial_truncado,
         'adjuntos': adjuntos,
         'sla_deadline': sla_deadline,
         'sla_time_left': sla_time_left,
@@ -370,68 +660,53 @@ def crear_ticket(request):
             except (AttributeError, PerfilUsuario.DoesNotExist):
                 ticket.solicitante_critico = False
             ticket.estado = 'abierto'
-            tecnico_disponible = User.objects.filter(is_staff=True).order_by('?').first()
-            if tecnico_disponible:
-                ticket.tecnico_asignado = tecnico_disponible
-            ticket.save()
-            log_history(
-                ticket,
-                request.user,
-                TicketHistory.Action.CREATED,
-                'ticket',
-                new=f"Ticket #{ticket.id} creado",
-            )
-            log_history(
-                ticket,
-                request.user,
-                TicketHistory.Action.STATUS,
-                'estado',
-                new=ticket.get_estado_display(),
-            )
-            if ticket.prioridad:
+            inicio = perf_counter()
+            with history_batch() as historial:
+                asignar_tecnico(ticket)
+                ticket.save()
                 log_history(
                     ticket,
                     request.user,
-                    TicketHistory.Action.PRIORITY,
-                    'prioridad',
-                    new=getattr(ticket.prioridad, 'nombre', ticket.prioridad),
+                    TicketHistory.Action.CREATED,
+                    'ticket',
+                    new=f"Ticket #{ticket.id} creado",
+                    batch=historial,
                 )
-            if ticket.tecnico_asignado:
                 log_history(
                     ticket,
                     request.user,
-                    TicketHistory.Action.ASSIGNEE,
-                    'tecnico_asignado',
-                    new=getattr(ticket.tecnico_asignado, 'username', ticket.tecnico_asignado),
+                    TicketHistory.Action.STATUS,
+                    'estado',
+                    new=ticket.get_estado_display(),
+                    batch=historial,
                 )
-            archivo_adjunto = form.cleaned_data.get('adjunto')
-            if archivo_adjunto:
-                adjunto = Adjunto.objects.create(ticket=ticket, archivo=archivo_adjunto, subido_por=request.user)
-                log_attachment(ticket, request.user, adjunto.archivo)
-            detalle_url = reverse('detalle_ticket', args=[ticket.id])
-            staff_users = [u for u in get_staff_notifiable_users() if u != request.user]
-            create_notification(
-                'ticket_created',
-                staff_users,
-                f"Se ha levantado un nuevo ticket #{ticket.id}: {ticket.titulo}",
-                detalle_url,
-                actor=request.user,
-            )
-            create_notification(
-                'ticket_created',
-                request.user,
-                f"Tu ticket #{ticket.id} fue creado correctamente.",
-                detalle_url,
-                actor=request.user,
-            )
-            if tecnico_disponible:
-                create_notification(
-                    'ticket_assigned',
-                    tecnico_disponible,
-                    f"Se te asignó el ticket #{ticket.id}: {ticket.titulo}",
-                    detalle_url,
-                    actor=request.user,
+                if ticket.prioridad:
+                    log_history(
+                        ticket,
+                        request.user,
+                        TicketHistory.Action.PRIORITY,
+                        'prioridad',
+                        new=getattr(ticket.prioridad, 'nombre', ticket.prioridad),
+                        batch=historial,
+                    )
+                if ticket.tecnico_asignado:
+                    log_history(
+                        ticket,
+                        request.user,
+                        TicketHistory.Action.ASSIGNEE,
+                        'tecnico_asignado',
+                        new=getattr(ticket.tecnico_asignado, 'username', ticket.tecnico_asignado),
+                        batch=historial,
+                    )
+                archivo_adjunto = form.cleaned_data.get('adjunto')
+                if archivo_adjunto:
+                    adjunto = Adjunto.objects.create(ticket=ticket, archivo=archivo_adjunto, subido_por=request.user)
+                    log_attachment(ticket, request.user, adjunto.archivo, batch=historial)
+                historial.flush()
+                posproceso = registrar_posproceso(
+                    ticket, request.user, round((perf_counter() - inicio) * 1000, 1)
                 )
+                encolar_posproceso_ticket(posproceso)
             return redirect('home_tickets')
     else:
         form = TicketForm(user=request.user)
@@ -441,7 +716,7 @@ def crear_ticket(request):
 def editar_ticket(request, ticket_id):
     ticket = get_object_or_404(Ticket, id=ticket_id, solicitante=request.user)
     if request.method == "POST":
-        form = TicketForm(request.POST, instance=ticket)
+        form = TicketForm(request.POST, instance=copy.copy(ticket))
         if form.is_valid():
             cleaned = form.cleaned_data
             changes = {
@@ -451,20 +726,33 @@ def editar_ticket(request, ticket_id):
                 'area': cleaned.get('area_funcional'),
                 'priority': cleaned.get('prioridad'),
             }
-            update_ticket(ticket, request.user, changes)
+            try:
+                update_ticket(ticket, request.user, changes, expected_version=_version_enviada(request))
+            except TicketVersionConflict:
+                messages.error(request, MENSAJE_CONFLICTO_TICKET)
+                return redirect('editar_ticket', ticket_id=ticket.id)
             return redirect('detalle_ticket', ticket_id=ticket.id)
     else:
         form = TicketForm(instance=ticket)
-    return render(request, "soporte/editar_ticket.html", {"form": form})
+    return render(request, "soporte/editar_ticket.html", {"form": form, "ticket": ticket})
 
 @login_required
 def dashboard(request):
     if not request.user.is_staff:
         return redirect('crear_ticket')
-    total_tickets = Ticket.objects.count()
-    tickets_abiertos = Ticket.objects.filter(estado='abierto').count()
-    tickets_en_progreso = Ticket.objects.filter(estado='progreso').count()
-    tickets_cerrados = Ticket.objects.filter(estado__in=['resuelto', 'cerrado']).count()
+    conteos = obtener_conteo(
+        clave_conteo('dashboard', 'staff'),
+        lambda: Ticket.objects.aggregate(
+            total=Count('id'),
+            abiertos=Count('id', filter=Q(estado='abierto')),
+            en_progreso=Count('id', filter=Q(estado='progreso')),
+            cerrados=Count('id', filter=Q(estado__in=['resuelto', 'cerrado'])),
+        ),
+    )
+    total_tickets = conteos['total']
+    tickets_abiertos = conteos['abiertos']
+    tickets_en_progreso = conteos['en_progreso']
+    tickets_cerrados = conteos['cerrados']
 
     tickets_resueltos = Ticket.objects.filter(
         estado__in=['resuelto', 'cerrado'],
@@ -492,11 +780,7 @@ def dashboard(request):
         .annotate(total=Count('id'))
         .order_by('estado_sla')
     )
-    tickets_recientes = (
-        Ticket.objects.select_related('prioridad', 'solicitante', 'area_funcional')
-        .all()
-        .order_by('-fecha_creacion')[:5]
-    )
+    tickets_recientes = TicketListado.objects.order_by('-fecha_creacion')[:5]
     tickets_por_estado = list(Ticket.objects.values('estado').annotate(total=Count('estado')))
     tickets_por_prioridad_qs = (
         Ticket.objects.values('prioridad__nombre', 'prioridad__clave')
@@ -572,6 +856,8 @@ def editar_prioridad_sla(request, prioridad_id):
         form = PrioridadForm(request.POST, instance=prioridad)
         if form.is_valid():
             prioridad_actualizada = form.save()
+            if 'minutos_resolucion' in form.changed_data:
+                encolar_recalculo_sla([prioridad_actualizada.id])
             messages.success(
                 request,
                 f"Prioridad '{prioridad_actualizada.nombre}' actualizada correctamente.",
@@ -943,13 +1229,14 @@ def exportar_tickets_csv(request):
     response.write(u'\ufeff'.encode('utf8'))
     writer = csv.writer(response)
     writer.writerow(['ID', 'Título', 'Descripción', 'Solicitante', 'Técnico', 'Estado', 'Prioridad', 'Categoría', 'Tipo', 'Área', 'Creación', 'Resolución'])
-    for ticket in Ticket.objects.all().order_by('-fecha_creacion'):
+    filas = TicketListado.objects.annotate(descripcion=F('ticket__descripcion')).order_by('-fecha_creacion')
+    for ticket in filas.iterator():
         writer.writerow([
-            ticket.id, ticket.titulo, ticket.descripcion, ticket.solicitante.username,
-            ticket.tecnico_asignado.username if ticket.tecnico_asignado else '-',
-            ticket.get_estado_display(), ticket.prioridad.nombre,
+            ticket.ticket_id, ticket.titulo, ticket.descripcion, ticket.solicitante_nombre,
+            ticket.tecnico_nombre or '-',
+            ticket.get_estado_display(), ticket.prioridad_nombre,
             ticket.get_categoria_display(), ticket.get_tipo_ticket_display(),
-            ticket.area_funcional.nombre,
+            ticket.area_nombre,
             ticket.fecha_creacion.strftime('%Y-%m-%d %H:%M'),
             str(ticket.tiempo_resolucion).split('.')[0] if ticket.tiempo_resolucion else '-'
         ])
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -84,6 +85,29 @@ DATABASES = {
 }
 
 
+# Cache
+# La caché guarda las versiones compartidas (calendario laboral, catálogos,
+# conteos y avisos de notificaciones), que escriben tanto los workers web como
+# el qcluster de django_q. Con más de un proceso debe ser Redis: define
+# REDIS_URL. Sin ella se usa memoria local, válida solo para un único proceso
+# en desarrollo (runserver); soporte.apps se niega a arrancar sin Redis con
+# DEBUG desactivado o al lanzar qcluster.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -147,6 +171,9 @@ LOGOUT_REDIRECT_URL = 'login'
 
 TICKETS_PER_PAGE = 6
 
+# Si está activo, la carga de cada técnico pondera sus tickets abiertos por el orden de la prioridad.
+TICKETS_ASIGNACION_PONDERADA = True
+
 Q_CLUSTER = {
     'name': 'DjangORM',
     'workers': 4,
@@ -157,7 +184,29 @@ Q_CLUSTER = {
     'orm': 'default',
     # Para la verificación del SLA, la lógica se ejecutará cada hora (3600 segundos)
     # Sin embargo, el clúster revisa si hay tareas pendientes cada 60 segundos.
+    # La tarea programada es soporte.tasks.barrido_sla (ver migración 0017).
 }
 
+# Conteos de tickets cacheados (listado y dashboard): duración en segundos y
+# modo stale-while-revalidate (se sirve el último valor mientras uno solo recalcula).
+TICKETS_CONTEOS_DURACION = 600
+TICKETS_CONTEOS_SWR = True
+
+# Avisos diferidos tras crear un ticket: intentos máximos y espera base (segundos) entre reintentos.
+TICKETS_POSPROCESO_REINTENTOS = 5
+TICKETS_POSPROCESO_ESPERA = 60
+# Enviar también un correo al técnico asignado a un ticket nuevo.
+TICKETS_CORREO_ASIGNACION = False
+
+# Cantidad máxima de tickets que se actualizan por sentencia en los procesos masivos de SLA.
+SLA_TAMANO_LOTE = 1000
+
+# Retención de notificaciones (tarea diaria soporte.tasks.retencion_notificaciones, ver
+# migración 0031): las leídas con más de estos días se eliminan por lotes y, si está
+# activo, se resumen antes por usuario, mes y tipo en ArchivoNotificaciones.
+NOTIFICACIONES_RETENCION_DIAS = 180
+NOTIFICACIONES_ARCHIVAR = True
+NOTIFICACIONES_TAMANO_LOTE = 1000
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file